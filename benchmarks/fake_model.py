@@ -0,0 +1,54 @@
+import asyncio
+
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+CALCULATOR = """def add(a: float, b: float) -> float:
+    return a + b
+
+
+if __name__ == "__main__":
+    print(add(1, 2))
+"""
+
+TEST_CALCULATOR = """from calculator import add
+
+
+def test_add():
+    assert add(1, 2) == 3
+"""
+
+# One builder tool call per turn, then a final answer
+DEFAULT_SCRIPT = (
+    ("get_frameworks", {}),
+    ("create_agent_workdir", {"agent_name": "calculator"}),
+    ("write_code", {"file_path": "calculator.py", "code": CALCULATOR}),
+    ("write_test_code", {"file_path": "test_calculator.py", "code": TEST_CALCULATOR}),
+)
+
+
+def scripted_model(
+    script: tuple[tuple[str, dict], ...] = DEFAULT_SCRIPT, latency: float = 0.0
+) -> FunctionModel:
+    """
+    Deterministic stand-in for the LLM.
+
+    Structured results (the refined prompt) are answered directly; the
+    builder gets the tool calls of `script` one turn at a time, then a final
+    text. Every response takes `latency` seconds, like a network call.
+    """
+
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        if latency:
+            await asyncio.sleep(latency)
+        if info.result_tools:
+            args = {"original": "calculator", "optimized": "Build a calculator agent"}
+            return ModelResponse(parts=[ToolCallPart(info.result_tools[0].name, args)])
+        # Every turn adds a response and the request with its tool returns
+        turn = (len(messages) - 1) // 2
+        if turn < len(script):
+            name, args = script[turn]
+            return ModelResponse(parts=[ToolCallPart(name, args)])
+        return ModelResponse(parts=[TextPart("Agent created successfully.")])
+
+    return FunctionModel(respond, model_name="scripted")
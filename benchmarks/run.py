@@ -0,0 +1,225 @@
+"""
+Offline benchmarks of a meta_loop sweep and its hot paths; no model API is called.
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --compare before.json --output after.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import httpx
+import pydantic
+
+from benchmarks.fake_model import DEFAULT_SCRIPT, scripted_model
+from meta_loop import ast_parser
+from meta_loop.agent import ProbeDeps, builder, iter_probes
+from meta_loop.box_client import AsyncSandbox
+from meta_loop.eval import evaluate_run_result
+from meta_loop.scheduler import ProbeScheduler
+from meta_loop.utils import enqueue_logging
+
+PROBE_COUNTS = (1, 16, 64, 256)
+SECTIONS = ("sweep", "evaluate", "ast_parser", "test_machine")
+
+
+async def bench_sweep(
+    probe_count: int, latency: float = 0.05, max_in_flight: int = 8
+) -> dict:
+    """Wall-clock of a sweep of `probe_count` probes against the scripted model."""
+    scheduler = ProbeScheduler(max_in_flight)
+    llm = scripted_model(latency=latency)
+    failed = 0
+    # Probes write their agents to the working directory and print progress
+    with tempfile.TemporaryDirectory() as workdir, contextlib.chdir(workdir):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            async for probe in iter_probes("calculator", probe_count, scheduler, llm):
+                failed += probe.error is not None
+            seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "probes_per_sec": probe_count / seconds,
+        "failed": failed,
+    }
+
+
+async def bench_evaluate(iterations: int = 2000, turns: int = 5) -> dict:
+    """`evaluate_run_result` over a real trace of `turns` rounds of the default script."""
+    with tempfile.TemporaryDirectory() as workdir, contextlib.chdir(workdir):
+        result = await builder().run(
+            "Build a calculator agent",
+            model=scripted_model(DEFAULT_SCRIPT * turns),
+            deps=ProbeDeps("bench"),
+        )
+    max_tools = len(builder()._function_tools)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        evaluate_run_result(result, max_tools=max_tools)
+    seconds = time.perf_counter() - start
+    return {
+        "traces_per_sec": iterations / seconds,
+        "messages": len(result.all_messages()),
+    }
+
+
+def bench_ast_parser(path: str) -> dict:
+    """Definitions extracted from every file under `path`, cold and from the cache."""
+    files = sum(1 for _ in ast_parser.iter_python_files(path))
+    ast_parser._file_cache.clear()
+    start = time.perf_counter()
+    ast_parser.extract_definitions_with_signatures(path)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    ast_parser.extract_definitions_with_signatures(path)
+    warm = time.perf_counter() - start
+    return {
+        "files": files,
+        "files_per_sec": files / cold,
+        "cached_files_per_sec": files / warm,
+    }
+
+
+async def bench_test_machine(requests: int = 200, concurrency: int = 16) -> dict:
+    """Requests per second the test machine serves, in process over ASGI."""
+    from meta_loop.test_machine.app import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with AsyncSandbox("http://bench", transport=transport) as sandbox:
+        workspace = await sandbox.upload_files(
+            {
+                "main.py": b"print('ok')\n",
+                "test_main.py": b"def test_ok():\n    assert True\n",
+            }
+        )
+        agent_id = workspace["agent_id"]
+        slots = asyncio.Semaphore(concurrency)
+
+        async def rate(call) -> float:
+            async def one():
+                async with slots:
+                    await call()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(requests)))
+            return requests / (time.perf_counter() - start)
+
+        return {
+            "blobs_missing_rps": await rate(
+                lambda: sandbox.client.post("/blobs/missing/", json={"hashes": []})
+            ),
+            "execute_rps": await rate(
+                lambda: sandbox.execute_code(agent_id, "main.py")
+            ),
+            "test_rps": await rate(lambda: sandbox.run_tests(agent_id, no_cache=True)),
+            "cached_test_rps": await rate(lambda: sandbox.run_tests(agent_id)),
+        }
+
+
+def environment() -> dict:
+    commit = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+    ).stdout.strip()
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.time(),
+    }
+
+
+async def run_benchmarks(args) -> dict:
+    results = {}
+    if "sweep" in args.only:
+        results["sweep"] = {
+            str(n): await bench_sweep(n, args.latency, args.max_in_flight)
+            for n in args.probe_counts
+        }
+    if "evaluate" in args.only:
+        results["evaluate"] = await bench_evaluate(args.eval_iterations)
+    if "ast_parser" in args.only:
+        results["ast_parser"] = bench_ast_parser(args.ast_path)
+    if "test_machine" in args.only:
+        results["test_machine"] = await bench_test_machine(
+            args.requests, args.concurrency
+        )
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict) -> str:
+    """Table of every metric of both runs and their ratio (current / baseline)."""
+    before = flatten(baseline["results"])
+    after = flatten(current["results"])
+    lines = [f"{'metric':<40} {'baseline':>12} {'current':>12} {'ratio':>7}"]
+    for metric in sorted(before.keys() & after.keys()):
+        ratio = after[metric] / before[metric] if before[metric] else float("nan")
+        lines.append(
+            f"{metric:<40} {before[metric]:>12.3f} {after[metric]:>12.3f} {ratio:>7.2f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, default=SECTIONS)
+    parser.add_argument(
+        "--probe-counts", nargs="+", type=int, default=list(PROBE_COUNTS)
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Seconds per model response"
+    )
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--eval-iterations", type=int, default=2000)
+    parser.add_argument(
+        "--ast-path",
+        default=os.path.dirname(pydantic.__file__),
+        help="Tree parsed by the ast_parser benchmark (default: the pydantic package)",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Tool call logs would otherwise be written synchronously to the terminal
+    enqueue_logging(open(os.devnull, "w"), replace_default=True)
+    report = {
+        "environment": environment(),
+        "config": {
+            k: v for k, v in vars(args).items() if k not in ("output", "compare")
+        },
+        "results": asyncio.run(run_benchmarks(args)),
+    }
+    print(json.dumps(report["results"], indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
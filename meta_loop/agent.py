@@ -1,14 +1,45 @@
 import asyncio
 import os
 import subprocess
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Any
 
 from pydantic import BaseModel
-from pydantic_ai import Agent, RunContext
+from pydantic_ai import Agent, RunContext, capture_run_messages
+from pydantic_ai.messages import ModelMessagesTypeAdapter
+from pydantic_ai.models import Model
 from pydantic_ai.models.openai import OpenAIModel
 
 from meta_loop import primitives
-from meta_loop.eval import evaluate_run_result
-from meta_loop.utils import verbose_decorator
+from meta_loop.cache import CachedModel, DiskCache, cache_scope
+from meta_loop.dataset_eval import (
+    Candidate,
+    DatasetReport,
+    Runner,
+    command_runner,
+    evaluate_dataset,
+)
+from meta_loop.eval import summarize_messages
+from meta_loop.executor import EvalExecutor
+from meta_loop.instructions import ENTRY_POINT_PROMPT
+from meta_loop.kb_index import format_chunks, load_knowledge_base
+from meta_loop.ledger import Ledger
+from meta_loop.live import LiveEvaluator
+from meta_loop.result_cache import ResultCache, default_result_cache
+from meta_loop.scheduler import REFINE, RUN, ProbeScheduler, current_stage
+from meta_loop.search import ProbePrunedError, SuccessiveHalving
+from meta_loop.tracing import TracedModel, Tracer, trace
+from meta_loop.utils import (
+    enqueue_logging,
+    list_markdown_files,
+    read_file,
+    run_command,
+    verbose_decorator,
+    write_file,
+)
 
 # Initialize the model
 model = OpenAIModel(
@@ -23,9 +54,64 @@ class Prompt(BaseModel):
     optimized: str
 
 
-async def prompt_refiner(prompt: str) -> Prompt:
-    agent_creator = Agent(model, result_type=Prompt)
-    result = await agent_creator.run(f"Refine prompt: {prompt}")
+# Seconds before a tool's child process is killed
+TOOL_TIMEOUTS = {
+    "run_pytest_test_code": 300.0,
+    "evaluate_code": 60.0,
+    "run_pre_commit": 300.0,
+}
+
+
+@dataclass
+class ProbeDeps:
+    """Per-probe state handed to the shared builder agent's tools."""
+
+    revision: str
+    sandbox_dir: str = "sandbox"
+    timeouts: dict[str, float] = field(default_factory=lambda: dict(TOOL_TIMEOUTS))
+    # Memo of pytest outcomes; None runs the tests every time
+    results: ResultCache | None = field(default_factory=default_result_cache)
+    # Set by `create_agent_workdir`: sandbox_dir/revision/agent_name
+    agent_dir: str | None = None
+
+
+# Prefixed to pytest output answered from the memo
+CACHED_NOTE = "[cached: no file changed since the last run]\n"
+
+
+def agent_tree(deps: ProbeDeps, path: str) -> str | None:
+    """
+    The `sandbox_dir/revision/agent_name` directory holding `path`.
+
+    Everything a test there imports or reads lives in this tree; None for
+    paths outside the probe's sandbox.
+    """
+    probe_dir = os.path.abspath(os.path.join(deps.sandbox_dir, deps.revision))
+    relative = os.path.relpath(os.path.abspath(path), probe_dir)
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return None
+    parts = relative.split(os.sep)
+    return probe_dir if len(parts) == 1 else os.path.join(probe_dir, parts[0])
+
+
+def pytest_report(returncode: int, stdout: str, stderr: str) -> str:
+    """What `run_pytest_test_code` tells the model about a run."""
+    if returncode:
+        return f"Pytest failed with return code {returncode}: {stderr}"
+    return stdout
+
+
+# Shared by every probe; the model can be swapped per run
+refiner = Agent(model, result_type=Prompt)
+
+
+async def prompt_refiner(prompt: str, refiner_model: Model = model) -> Prompt:
+    with trace("refine") as span:
+        result = await refiner.run(f"Refine prompt: {prompt}", model=refiner_model)
+        usage = result.usage()
+        span.set(
+            request_tokens=usage.request_tokens, response_tokens=usage.response_tokens
+        )
     print(result.data)
     return result.data
 
@@ -35,70 +121,91 @@ async def researcher(instruction: str, t: primitives.Trial):
     print(prompt)
 
 
-def builder(revision: str):
-    agent_creator = Agent(model)
+@cache
+def builder(entry_point: bool = False) -> Agent[ProbeDeps]:
+    """
+    Build the agent and its tools once; probes pass their state as deps.
+
+    With `entry_point`, the agent is told to write the `main.py` a test
+    dataset is run through.
+    """
+    agent_creator = Agent(
+        model,
+        deps_type=ProbeDeps,
+        system_prompt=ENTRY_POINT_PROMPT if entry_point else (),
+    )
 
     # Tool to list available frameworks
     @agent_creator.tool
     @verbose_decorator
-    def get_frameworks(ctx: RunContext[str]):
+    async def get_frameworks(ctx: RunContext[ProbeDeps]):
         """List all framework directories in 'kb'."""
-        if not os.path.exists("kb"):
-            return []
-        return [f for f in os.listdir("kb") if os.path.isdir(os.path.join("kb", f))]
+        kb = await asyncio.to_thread(load_knowledge_base, "kb")
+        return kb.frameworks
 
     @agent_creator.tool
     @verbose_decorator
-    def get_allowed_tools(ctx: RunContext[str]):
+    async def get_allowed_tools(ctx: RunContext[ProbeDeps]):
         """List all framework directories in 'kb'."""
-        if not os.path.exists("kb"):
-            return []
-        return [f for f in os.listdir("kb") if os.path.isdir(os.path.join("kb", f))]
+        kb = await asyncio.to_thread(load_knowledge_base, "kb")
+        return kb.frameworks
 
     @agent_creator.tool
     @verbose_decorator
-    def authorize_tool_usage(ctx: RunContext[str]):
+    async def authorize_tool_usage(ctx: RunContext[ProbeDeps]):
         """List all framework directories in 'kb'."""
-        if not os.path.exists("kb"):
-            return []
-        return [f for f in os.listdir("kb") if os.path.isdir(os.path.join("kb", f))]
+        kb = await asyncio.to_thread(load_knowledge_base, "kb")
+        return kb.frameworks
 
     # Tool to list markdown files in a directory
     @agent_creator.tool
     @verbose_decorator
-    def list_documentation_files(
-        ctx: RunContext[str], directory_path: str
+    async def list_documentation_files(
+        ctx: RunContext[ProbeDeps], directory_path: str
     ) -> list[str]:
         """List all .md and .mdx files in the specified directory."""
-        if not os.path.exists(directory_path):
-            return []
-        return [
-            os.path.join(directory_path, f)
-            for f in os.listdir(directory_path)
-            if f.endswith(".md") or f.endswith(".mdx")
-        ]
+        parent, framework = os.path.split(os.path.normpath(directory_path))
+        if parent == "kb":
+            kb = await asyncio.to_thread(load_knowledge_base, "kb")
+            if framework in kb.frameworks:
+                return kb.files(framework)
+        return await asyncio.to_thread(list_markdown_files, directory_path)
 
     # Tool to read a file's content
     @agent_creator.tool
     @verbose_decorator
-    def read_documentation_file(ctx: RunContext[str], file_path: str) -> str:
+    async def read_documentation_file(
+        ctx: RunContext[ProbeDeps], file_path: str
+    ) -> str:
         """Read the content of a file if it exists."""
         if not os.path.exists(file_path):
             return f"No such file {file_path}"
         try:
-            with open(file_path) as f:
-                return f.read()
+            return await asyncio.to_thread(read_file, file_path)
         except Exception as e:
             return f"Error reading file {file_path}: {str(e)}"
 
+    # Tool to search the documentation index
+    @agent_creator.tool
+    @verbose_decorator
+    async def search_documentation(
+        ctx: RunContext[ProbeDeps], query: str, framework: str = "*", k: int = 5
+    ) -> str:
+        """Search the 'kb' documentation and return the best matching sections."""
+        kb = await asyncio.to_thread(load_knowledge_base, "kb")
+        # Scoring and reading the sections are blocking work
+        chunks = await asyncio.to_thread(kb.search, query, framework, k)
+        if not chunks:
+            return f"No documentation found for {query}"
+        return await asyncio.to_thread(format_chunks, chunks)
+
     # Tool to write code to a file
     @agent_creator.tool
     @verbose_decorator
-    def write_code(ctx: RunContext[str], file_path: str, code: str):
+    async def write_code(ctx: RunContext[ProbeDeps], file_path: str, code: str):
         """Write the provided code to a file."""
         try:
-            with open(file_path, "w") as f:
-                f.write(code)
+            await asyncio.to_thread(write_file, file_path, code)
             return f"Code written to {file_path}"
         except Exception as e:
             return f"Error writing to file {file_path}: {str(e)}"
@@ -106,22 +213,22 @@ def builder(revision: str):
     # Tool to write test code to a file
     @agent_creator.tool
     @verbose_decorator
-    def write_test_code(ctx: RunContext[str], file_path: str, code: str):
+    async def write_test_code(ctx: RunContext[ProbeDeps], file_path: str, code: str):
         """Write the provided test code to a file."""
         try:
-            with open(file_path, "w") as f:
-                f.write(code)
+            await asyncio.to_thread(write_file, file_path, code)
             return f"Test code written to {file_path}"
         except Exception as e:
             return f"Error writing to file {file_path}: {str(e)}"
 
     @agent_creator.tool
     @verbose_decorator
-    def create_agent_workdir(ctx: RunContext[str], agent_name: str):
+    def create_agent_workdir(ctx: RunContext[ProbeDeps], agent_name: str):
         """Create a directory for the agent and return its path."""
-        agent_dir = os.path.join("sandbox", revision, agent_name)
+        agent_dir = os.path.join(ctx.deps.sandbox_dir, ctx.deps.revision, agent_name)
         try:
             os.makedirs(agent_dir, exist_ok=True)
+            ctx.deps.agent_dir = agent_dir
             return agent_dir
         except Exception as e:
             return f"Error creating directory {agent_dir}: {str(e)}"
@@ -129,34 +236,58 @@ def builder(revision: str):
     # Tool to run pytest on a test file
     @agent_creator.tool
     @verbose_decorator
-    def run_pytest_test_code(ctx: RunContext[str], file_path: str):
-        """Run pytest on the specified test file and return the output."""
+    async def run_pytest_test_code(
+        ctx: RunContext[ProbeDeps], file_path: str, no_cache: bool = False
+    ):
+        """
+        Run pytest on the specified test file and return the output.
+
+        The outcome is reused while no file in the agent's directory changed;
+        set `no_cache` to run the tests again anyway.
+        """
+        results = ctx.deps.results
+        root = agent_tree(ctx.deps, file_path)
+        key = None
+        if results is not None and root is not None and os.path.isfile(file_path):
+            target = os.path.abspath(file_path)
+            key = await asyncio.to_thread(results.key, root, target)
+            if not no_cache and (cached := await asyncio.to_thread(results.get, key)):
+                return CACHED_NOTE + pytest_report(**cached)
         try:
-            result = subprocess.run(
-                ["pytest", file_path], capture_output=True, check=True
+            result = await run_command(
+                ["pytest", file_path],
+                timeout=ctx.deps.timeouts["run_pytest_test_code"],
             )
-            return result.stdout.decode("utf-8")
-        except subprocess.CalledProcessError as e:
-            return f"Pytest failed with return code {e.returncode}: {e.stderr.decode('utf-8')}"
+        except subprocess.TimeoutExpired as e:
+            return f"Pytest timed out after {e.timeout} seconds."
         except FileNotFoundError:
             return "Pytest is not installed or not found in PATH."
         except Exception as e:
             return f"Error running pytest: {str(e)}"
+        stdout = result.stdout.decode("utf-8")
+        stderr = result.stderr.decode("utf-8")
+        if key is not None:
+            await asyncio.to_thread(results.set, key, result.returncode, stdout, stderr)
+        return pytest_report(result.returncode, stdout, stderr)
 
     # Tool to evaluate code by executing it
     @agent_creator.tool
     @verbose_decorator
-    def evaluate_code(ctx: RunContext[str], file_path: str):
+    async def evaluate_code(ctx: RunContext[ProbeDeps], file_path: str):
         """Execute the code in the file and return any errors or success message."""
         if not os.path.exists(file_path):
             return f"No such file {file_path}"
         try:
-            result = subprocess.run(
-                ["python", file_path], capture_output=True, check=True
+            result = await run_command(
+                ["python", file_path],
+                timeout=ctx.deps.timeouts["evaluate_code"],
+                check=True,
             )
             return result.stdout.decode("utf-8")
         except subprocess.CalledProcessError as e:
             return f"Code execution failed: {e.stderr.decode('utf-8')}"
+        except subprocess.TimeoutExpired as e:
+            return f"Code execution timed out after {e.timeout} seconds."
         except FileNotFoundError:
             return "Python interpreter not found."
         except Exception as e:
@@ -164,15 +295,19 @@ def builder(revision: str):
 
     @agent_creator.tool
     @verbose_decorator
-    def run_pre_commit(ctx: RunContext[str]):
+    async def run_pre_commit(ctx: RunContext[ProbeDeps]):
         """Run pre-commit checks on the code."""
         try:
-            result = subprocess.run(
-                ["pre-commit", "run", "--all-files"], capture_output=True, check=True
+            result = await run_command(
+                ["pre-commit", "run", "--all-files"],
+                timeout=ctx.deps.timeouts["run_pre_commit"],
+                check=True,
             )
             return result.stdout.decode("utf-8")
         except subprocess.CalledProcessError as e:
             return f"Pre-commit failed: {e.stderr.decode('utf-8')}"
+        except subprocess.TimeoutExpired as e:
+            return f"Pre-commit timed out after {e.timeout} seconds."
         except FileNotFoundError:
             return "Pre-commit is not installed or not found in PATH."
         except Exception as e:
@@ -186,12 +321,185 @@ def revision_generator(n: int):
         yield f"v{i}"
 
 
+@dataclass
+class ProbeResult:
+    revision: str
+    prompt: Prompt | None = None
+    result: Any = None
+    error: Exception | None = None
+    metrics: tuple | None = None
+    pruned: bool = False
+    # Directory of the agent the probe wrote, if it created one
+    agent_dir: str | None = None
+    # Components of the score, see `TraceSummary.breakdown`
+    breakdown: dict[str, float] | None = None
+    # Message trace, as far as the run got if it was pruned or failed
+    messages: list | None = None
+
+
+async def run_live(
+    agent_creator: Agent,
+    prompt: str,
+    llm: Model,
+    revision: str,
+    live: LiveEvaluator,
+    search: SuccessiveHalving | None = None,
+    deps: ProbeDeps | None = None,
+):
+    """
+    Run the agent node by node, feeding every new message to the live evaluator.
+
+    With `search`, the running score is reported after every tool cycle.
+    """
+    live.start(revision)
+    async with agent_creator.iter(
+        prompt, model=llm, deps=deps or ProbeDeps(revision)
+    ) as agent_run:
+        async for node in agent_run:
+            if Agent.is_call_tools_node(node):
+                live.add_message(revision, node.model_response)
+            elif Agent.is_model_request_node(node):
+                # The request carries the tool returns of the cycle that just ran
+                score = live.add_message(revision, node.request)
+                # Rungs count every tool call; only the score caps them at 10
+                cycles = live.summaries[revision].tool_calls
+                if search is not None and not search.report(revision, cycles, score):
+                    raise ProbePrunedError(
+                        f"Probe {revision} pruned after {cycles} tool calls"
+                    )
+    return agent_run.result
+
+
+async def run_probe(
+    revision: str,
+    instruction: str,
+    llm: Model,
+    search: SuccessiveHalving | None = None,
+    live: LiveEvaluator | None = None,
+    entry_point: bool = False,
+) -> ProbeResult:
+    """Refine, run and evaluate one probe; each stage starts as soon as the previous one is done."""
+    probe = ProbeResult(revision)
+    deps = ProbeDeps(revision)
+    # Probes send the same refine request; each must get its own answer
+    cache_scope.set(revision)
+    agent_creator = builder(entry_point)
+    max_tools = len(agent_creator._function_tools)
+    if live is None and search is not None:
+        live = LiveEvaluator()
+    if live is not None:
+        # Scores must be relative to the tools the builder actually has
+        live.max_tools = max_tools
+
+    def run():
+        if live is None:
+            return agent_creator.run(probe.prompt.optimized, model=llm, deps=deps)
+        return run_live(
+            agent_creator, probe.prompt.optimized, llm, revision, live, search, deps
+        )
+
+    run_messages = []
+    with trace("probe", revision):
+        try:
+            # Slots are taken per model request, so tools never hold one
+            current_stage.set((revision, "refine", REFINE))
+            probe.prompt = await prompt_refiner(instruction, llm)
+            current_stage.set((revision, "run", RUN))
+            with capture_run_messages() as run_messages:
+                probe.result = await run()
+            with trace("evaluate", revision) as span:
+                messages = probe.messages = probe.result.all_messages()
+                if live is None:
+                    summary = summarize_messages(messages)
+                    probe.metrics = summary.evaluate(probe.result.data, max_tools)
+                else:
+                    summary = live.summaries[revision]
+                    probe.metrics = live.finish(revision, probe.result.data)
+                probe.breakdown = summary.breakdown(probe.result.data, max_tools)
+                span.set(messages=len(messages))
+        except ProbePrunedError as e:
+            probe.pruned = True
+            probe.error = e
+        except Exception as e:
+            probe.error = e
+        probe.agent_dir = deps.agent_dir
+        if probe.result is None and run_messages:
+            # Score what the run did before it stopped
+            probe.messages = list(run_messages)
+            summary = live.summaries.get(revision) if live is not None else None
+            summary = summary or summarize_messages(probe.messages)
+            probe.metrics = summary.evaluate(max_tools=max_tools)
+            probe.breakdown = summary.breakdown(max_tools=max_tools)
+    return probe
+
+
+async def iter_probes(
+    instruction: str,
+    probe_count: int = 16,
+    scheduler: ProbeScheduler | None = None,
+    llm: Model | None = None,
+    search: SuccessiveHalving | None = None,
+    cache: DiskCache | None = None,
+    live: LiveEvaluator | None = None,
+    entry_point: bool = False,
+) -> AsyncIterator[ProbeResult]:
+    """Run probes as independent pipelines and yield each one as it finishes."""
+    scheduler = scheduler or ProbeScheduler()
+    # Traced inside the rate limiter so "model" spans are pure model latency
+    llm = scheduler.throttle(TracedModel(llm or model))
+    if cache is not None:
+        # Cache outside the rate limiter so hits never wait for a token
+        llm = CachedModel(llm, cache)
+    tasks = [
+        asyncio.create_task(
+            run_probe(revision, instruction, llm, search, live, entry_point)
+        )
+        for revision in revision_generator(n=probe_count)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Wait for the cancellations so no task is destroyed while pending
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def evaluate_probes(
+    probes: list[ProbeResult],
+    test_dataset: list[tuple[Any, Any]],
+    runner: Runner | None = None,
+    max_workers: int = 8,
+    cache: DiskCache | None = None,
+) -> dict[str, DatasetReport]:
+    """Run the agents written by the successful probes over the test dataset."""
+    candidates = []
+    for probe in probes:
+        if probe.error is None and probe.agent_dir and os.path.isdir(probe.agent_dir):
+            candidates.append(Candidate(probe.revision, probe.agent_dir))
+    return await evaluate_dataset(
+        candidates, test_dataset, runner or command_runner(), max_workers, cache
+    )
+
+
 def build_agent(
     instruction,
     probe_count: int = 16,
     framework="*",
     eval_fn=None,
     test_dataset=None,
+    max_in_flight: int = 8,
+    requests_per_second: float | None = None,
+    search: SuccessiveHalving | None = None,
+    cache_dir: str | None = None,
+    live: LiveEvaluator | None = None,
+    dataset_runner: Runner | None = None,
+    eval_timeout: float | None = 60.0,
+    trace_path: str | None = None,
+    llm: Model | None = None,
+    ledger_path: str | None = None,
+    background_logging: bool = False,
     **kwargs,
 ):
     """
@@ -201,37 +509,115 @@ def build_agent(
         instruction (str): The initial instruction for the agents.
         probe_count (int): Number of agent instances to create (default: 16).
         framework (str): Framework filter (default: "*").
-        eval_fn (callable, optional): Custom evaluation function.
-        test_dataset (Any, optional): Dataset for testing.
+        eval_fn (callable, optional): Custom evaluation function of a Trial, run in a process pool (or threads when marked `io_bound`).
+        test_dataset (Any, optional): (input, expected) pairs every generated agent is run on.
+        max_in_flight (int): Maximum number of model requests in flight (default: 8).
+        requests_per_second (float, optional): Rate limit per model endpoint.
+        search (SuccessiveHalving, optional): Cancel the weakest probes after each rung of tool calls.
+        cache_dir (str, optional): Directory of the on-disk LLM response cache.
+        live (LiveEvaluator, optional): Score probes while they run and cut off looping or slow ones.
+        dataset_runner (Runner, optional): Runs a generated agent on one input (default: `python main.py`).
+        eval_timeout (float, optional): Seconds allowed per eval_fn call (default: 60).
+        trace_path (str, optional): JSONL file the spans of the sweep are written to.
+        llm (Model, optional): Model of the probes (default: deepseek-chat).
+        ledger_path (str, optional): SQLite file every probe, score and trace is recorded in.
+        background_logging (bool): Write tool logs to stderr from a background thread instead of loguru's default handler (default: False).
         **kwargs: Additional keyword arguments.
     """
 
+    if background_logging:
+        enqueue_logging(replace_default=True)
+    tracer = Tracer(trace_path)
+    ledger = Ledger(ledger_path) if ledger_path else None
+
     async def main():
-        # Create agent instances for each revision
-        generations = [
-            builder(revision) for revision in revision_generator(n=probe_count)
-        ]
-
-        # Parallelize prompt refinements
-        refinement_tasks = [prompt_refiner(instruction) for _ in range(probe_count)]
-        refined_prompts = await asyncio.gather(*refinement_tasks)
-
-        # Create tasks for running agents with refined prompts
-        coroutines = []
-        for agent_creator, refined in zip(generations, refined_prompts):
-            task = asyncio.create_task(agent_creator.run(refined.optimized))
-            coroutines.append(task)
-
-        # Gather results, capturing exceptions
-        results = await asyncio.gather(*coroutines, return_exceptions=True)
-        for result in results:
-            if isinstance(result, Exception):
-                print(f"Task failed with exception: {result}")
+        scheduler = ProbeScheduler(max_in_flight, requests_per_second)
+        cache = DiskCache(cache_dir) if cache_dir else None
+        probes = []
+        if ledger is not None:
+            config = {"probe_count": probe_count, "framework": framework}
+            sweep_id = ledger.start_sweep(instruction, config)
+        # Results known once the sweep is over, by revision
+        later = defaultdict(dict)
+        async for probe in iter_probes(
+            instruction,
+            probe_count,
+            scheduler,
+            llm,
+            search=search,
+            cache=cache,
+            live=live,
+            entry_point=bool(test_dataset),
+        ):
+            if probe.pruned:
+                print(f"Probe {probe.revision} stopped early: {probe.error}")
+            elif probe.error is not None:
+                print(f"Probe {probe.revision} failed with exception: {probe.error}")
             else:
-                print(f"Task succeeded: {result}")
-
-        # Evaluate the results
-        metrics = evaluate_run_result(results)
-        print(metrics)
-
-    return asyncio.run(main())
+                print(f"Probe {probe.revision} succeeded: {probe.result}")
+                print(probe.metrics)
+            probes.append(probe)
+            if ledger is not None:
+                ledger.record_probe(
+                    sweep_id,
+                    probe.revision,
+                    probe.prompt.optimized if probe.prompt else None,
+                    probe.metrics,
+                    probe.error,
+                    probe.pruned,
+                    probe.messages,
+                    probe.breakdown,
+                )
+
+        # Rate limit wait, queue wait and execution per probe, to size the limits
+        timings = scheduler.report()
+        print(timings)
+        for revision, timing in timings.items():
+            later[revision].update(timing)
+        if live is not None:
+            print(live.leaderboard())
+
+        if eval_fn is not None:
+            finished = [p for p in probes if p.error is None]
+            trials = [
+                primitives.Trial(
+                    p.prompt.optimized,
+                    p.result.data,
+                    ModelMessagesTypeAdapter.dump_python(
+                        p.result.all_messages(), mode="json"
+                    ),
+                )
+                for p in finished
+            ]
+            with EvalExecutor(eval_fn, timeout=eval_timeout) as executor:
+                scores = await executor.map(trials)
+            for probe, score in zip(finished, scores):
+                print(f"Probe {probe.revision} eval_fn score: {score}")
+                later[probe.revision]["eval_score"] = score
+
+        if test_dataset:
+            reports = await evaluate_probes(
+                probes, test_dataset, dataset_runner, max_in_flight, cache
+            )
+            for name, report in reports.items():
+                print(
+                    f"Probe {name}: accuracy {report.accuracy:.2f}, "
+                    f"p50 {report.p50}s, p95 {report.p95}s"
+                )
+                later[name].update(
+                    accuracy=report.accuracy, p50=report.p50, p95=report.p95
+                )
+
+        if ledger is not None:
+            ledger.update_probes(sweep_id, later)
+            ledger.finish_sweep(sweep_id)
+
+        # Where the time went: refinement, model, tools, evaluation
+        print(tracer.format_summary())
+
+    with tracer:
+        try:
+            return asyncio.run(main())
+        finally:
+            if ledger is not None:
+                ledger.close()
@@ -1,11 +1,15 @@
 import ast
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from loguru import logger
 
 
 def get_function_signature(node):
     """Extract function signature from a FunctionDef node."""
     params = []
-    for arg in node.args.args:
+    # Defaults cover positional-only and regular parameters together
+    for arg in node.args.posonlyargs + node.args.args:
         param = arg.arg
         if arg.annotation:
             param += f": {ast.unparse(arg.annotation)}"
@@ -36,28 +40,132 @@ def get_class_signature(node):
     return node.name
 
 
-def extract_definitions_with_signatures(repo_path):
-    functions = []
-    classes = []
+# Per-file results keyed on path, validated against (mtime, size)
+_file_cache: dict[str, tuple[int, int, list[tuple] | None]] = {}
+
+# Below this many files to parse, a process pool costs more than it saves
+PARALLEL_THRESHOLD = 32
+
+
+def iter_definition_nodes(body, parent=None):
+    """
+    Yield (node, parent_qualname) for module- and class-level definitions.
+
+    Nested functions are skipped.
+    """
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield node, parent
+        elif isinstance(node, ast.ClassDef):
+            yield node, parent
+            qualname = f"{parent}.{node.name}" if parent else node.name
+            yield from iter_definition_nodes(node.body, qualname)
+
+
+def definition_record(node, parent):
+    """
+    Describe one definition as a plain tuple, cheap to pickle:
+    (kind, signature, qualname, lineno, end_lineno, is_async, decorators, parent).
+    """
+    if isinstance(node, ast.ClassDef):
+        kind, sig = "class", get_class_signature(node)
+    else:
+        kind, sig = ("method" if parent else "function"), get_function_signature(node)
+    return (
+        kind,
+        sig,
+        f"{parent}.{node.name}" if parent else node.name,
+        node.lineno,
+        node.end_lineno,
+        isinstance(node, ast.AsyncFunctionDef),
+        tuple(ast.unparse(d) for d in node.decorator_list),
+        parent,
+    )
+
+
+def parse_file(file_path):
+    """Return the definition records of one file, or None on a syntax error."""
+    with open(file_path, encoding="utf-8") as f:
+        code = f.read()
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    return [
+        definition_record(node, parent)
+        for node, parent in iter_definition_nodes(tree.body)
+    ]
+
+
+def iter_python_files(repo_path):
     for root, _, files in os.walk(repo_path):
+        if "tests" in root:
+            continue
         for file in files:
             if file.endswith(".py"):
-                if "tests" in root:
-                    continue
-                file_path = os.path.join(root, file)
-                with open(file_path, encoding="utf-8") as f:
-                    try:
-                        code = f.read()
-                        tree = ast.parse(code)
-                        for node in ast.walk(tree):
-                            if isinstance(node, ast.FunctionDef):
-                                sig = get_function_signature(node)
-                                functions.append((sig, file_path))
-                            elif isinstance(node, ast.ClassDef):
-                                sig = get_class_signature(node)
-                                classes.append((sig, file_path))
-                    except SyntaxError:
-                        print(f"Skipping {file_path} due to syntax error")
+                yield os.path.join(root, file)
+
+
+def iter_records(repo_path, workers=None):
+    """
+    Yield (file_path, record) for every definition under repo_path.
+
+    Unchanged files are served from the per-file cache; the rest are parsed
+    in a process pool when there are enough of them, and their definitions
+    are yielded as each file is done.
+    """
+    stale = []
+    for file_path in iter_python_files(repo_path):
+        stat = os.stat(file_path)
+        cached = _file_cache.get(file_path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            yield from _with_path(cached[2], file_path)
+        else:
+            stale.append((file_path, stat.st_mtime_ns, stat.st_size))
+    if not stale:
+        return
+
+    paths = [file_path for file_path, _, _ in stale]
+    if len(stale) < PARALLEL_THRESHOLD or workers == 1:
+        results = map(parse_file, paths)
+        yield from _store(stale, results)
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as pool:
+            chunksize = max(1, len(paths) // (4 * workers))
+            yield from _store(stale, pool.map(parse_file, paths, chunksize=chunksize))
+
+
+def _store(stale, results):
+    for (file_path, mtime, size), records in zip(stale, results):
+        _file_cache[file_path] = (mtime, size, records)
+        if records is None:
+            # Reported once per parse; cached hits skip the file silently
+            logger.warning(f"Skipping {file_path} due to syntax error")
+        yield from _with_path(records, file_path)
+
+
+def _with_path(records, file_path):
+    if records is None:
+        return
+    for record in records:
+        yield file_path, record
+
+
+def iter_definitions(repo_path, workers=None):
+    """Yield (kind, signature, file_path); kind is "function", "method" or "class"."""
+    for file_path, record in iter_records(repo_path, workers):
+        yield record[0], record[1], file_path
+
+
+def extract_definitions_with_signatures(repo_path, workers=None):
+    functions = []
+    classes = []
+    for kind, sig, file_path in iter_definitions(repo_path, workers):
+        if kind == "class":
+            classes.append((sig, file_path))
+        else:
+            functions.append((sig, file_path))
     return functions, classes
 
 
@@ -1,30 +1,243 @@
+import asyncio
+import hashlib
+import importlib.util
+import json
+import time
+from collections.abc import AsyncIterator, Iterator
+
 import httpx
 
 
+def _hashes(files: dict[str, bytes]) -> dict[str, str]:
+    return {name: hashlib.sha256(data).hexdigest() for name, data in files.items()}
+
+
 class Sandbox:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, max_retries: int = 3):
         self.client = httpx.Client(base_url=base_url)
         self.agent_id = None
+        self.max_retries = max_retries
 
-    def upload_files(self, files: dict):
-        response = self.client.post("/upload/", files=files)
+    def _post(self, url: str, **kwargs) -> httpx.Response:
+        # The server answers 429 with Retry-After while its job queue is full
+        for _ in range(self.max_retries):
+            response = self.client.post(url, **kwargs)
+            if response.status_code != 429:
+                break
+            time.sleep(float(response.headers.get("Retry-After", 1)))
+        else:
+            response = self.client.post(url, **kwargs)
         response.raise_for_status()
+        return response
+
+    def upload_files(self, files: dict):
+        response = self._post("/upload/", files=files)
         data = response.json()
         self.agent_id = data["agent_id"]
         return data
 
-    def execute_code(self, filename: str):
+    def sync_files(self, files: dict[str, bytes]):
+        """
+        Create a workspace from {filename: content}, uploading only the
+        contents the server does not have yet.
+        """
+        hashes = _hashes(files)
+        contents = {hashes[name]: data for name, data in files.items()}
+        response = self._post("/blobs/missing/", json={"hashes": list(hashes.values())})
+        missing = response.json()["missing"]
+        for attempt in range(self.max_retries + 1):
+            if missing:
+                uploads = [("files", (digest, contents[digest])) for digest in missing]
+                self._post("/blobs/", files=uploads)
+            try:
+                data = self._post("/workspaces/", json={"files": hashes}).json()
+                break
+            except httpx.HTTPStatusError as e:
+                # 409: blobs were pruned since the check; send them again
+                if e.response.status_code != 409 or attempt == self.max_retries:
+                    raise
+                missing = e.response.json()["detail"]["missing"]
+        self.agent_id = data["agent_id"]
+        return data
+
+    def _require_agent(self):
         if not self.agent_id:
             raise ValueError("Agent ID is not set. Please upload files first.")
-        response = self.client.post(
-            f"/execute/?agent_id={self.agent_id}&filename={filename}"
+
+    def execute_code(self, filename: str):
+        self._require_agent()
+        response = self._post(f"/execute/?agent_id={self.agent_id}&filename={filename}")
+        return response.json()
+
+    def run_tests(self, no_cache: bool = False):
+        """Run pytest; `no_cache` runs it even if no file changed since the last run."""
+        self._require_agent()
+        params = {"agent_id": self.agent_id, "no_cache": no_cache}
+        return self._post("/test/", params=params).json()
+
+    def submit_execute(self, filename: str) -> str:
+        """Queue `python filename` and return the job id."""
+        self._require_agent()
+        url = f"/jobs/execute/?agent_id={self.agent_id}&filename={filename}"
+        return self._post(url).json()["job_id"]
+
+    def submit_tests(self) -> str:
+        """Queue a pytest run and return the job id."""
+        self._require_agent()
+        return self._post(f"/jobs/test/?agent_id={self.agent_id}").json()["job_id"]
+
+    def _stream(self, url: str) -> Iterator[dict]:
+        with self.client.stream("POST", url, timeout=None) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def stream_execute(self, filename: str) -> Iterator[dict]:
+        """
+        Run `python filename` and yield its output while it runs.
+
+        Yields {"stream": "stdout" | "stderr", "data": ...} chunks, then
+        {"event": "exit", "returncode": ...} or {"event": "error", ...};
+        {"event": "truncated"} marks that the output cap was hit.
+        """
+        self._require_agent()
+        return self._stream(
+            f"/stream/execute/?agent_id={self.agent_id}&filename={filename}"
         )
+
+    def stream_tests(self) -> Iterator[dict]:
+        """Run pytest and yield its output while it runs, as `stream_execute`."""
+        self._require_agent()
+        return self._stream(f"/stream/test/?agent_id={self.agent_id}")
+
+    def poll(self, job_id: str) -> dict:
+        response = self.client.get(f"/jobs/{job_id}")
         response.raise_for_status()
         return response.json()
 
-    def run_tests(self):
-        if not self.agent_id:
-            raise ValueError("Agent ID is not set. Please upload files first.")
-        response = self.client.post(f"/test/?agent_id={self.agent_id}")
+    def wait(self, job_id: str, interval: float = 0.2) -> dict:
+        """Poll a job until it is done or failed."""
+        while (job := self.poll(job_id))["status"] in ("queued", "running"):
+            time.sleep(interval)
+        return job
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (`pip install httpx[http2]`)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class AsyncSandbox:
+    """
+    Async sandbox client meant to be shared by all probes.
+
+    One `httpx.AsyncClient` keeps a pool of keep-alive connections (HTTP/2
+    when `h2` is installed), and agent ids are passed per call instead of
+    being stored, so concurrent probes never step on each other.
+
+    Args:
+        base_url (str): Address of the test machine.
+        max_connections (int): Size of the connection pool (default 100).
+        max_retries (int): Retries of requests answered with 429 (default 3).
+        transport (httpx.AsyncBaseTransport, optional): e.g. `httpx.ASGITransport(app=app)` to talk to an in-process app.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 100,
+        max_retries: int = 3,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=transport is None and http2_available(),
+            limits=httpx.Limits(max_connections=max_connections),
+            timeout=None,
+            transport=transport,
+        )
+        self.max_retries = max_retries
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _post(self, url: str, **kwargs) -> httpx.Response:
+        for _ in range(self.max_retries):
+            response = await self.client.post(url, **kwargs)
+            if response.status_code != 429:
+                break
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+        else:
+            response = await self.client.post(url, **kwargs)
         response.raise_for_status()
+        return response
+
+    async def upload_files(self, files: dict[str, bytes]) -> dict:
+        """Upload {filename: content}; returns the agent id and file info."""
+        uploads = [("files", (name, data)) for name, data in files.items()]
+        return (await self._post("/upload/", files=uploads)).json()
+
+    async def sync_files(self, files: dict[str, bytes]) -> dict:
+        """As `upload_files`, sending only contents the server does not have."""
+        hashes = _hashes(files)
+        contents = {hashes[name]: data for name, data in files.items()}
+        response = await self._post(
+            "/blobs/missing/", json={"hashes": list(hashes.values())}
+        )
+        missing = response.json()["missing"]
+        for attempt in range(self.max_retries + 1):
+            if missing:
+                uploads = [("files", (digest, contents[digest])) for digest in missing]
+                await self._post("/blobs/", files=uploads)
+            try:
+                response = await self._post("/workspaces/", json={"files": hashes})
+                return response.json()
+            except httpx.HTTPStatusError as e:
+                # 409: blobs were pruned since the check; send them again
+                if e.response.status_code != 409 or attempt == self.max_retries:
+                    raise
+                missing = e.response.json()["detail"]["missing"]
+
+    async def execute_code(self, agent_id: str, filename: str) -> dict:
+        params = {"agent_id": agent_id, "filename": filename}
+        return (await self._post("/execute/", params=params)).json()
+
+    async def run_tests(self, agent_id: str, no_cache: bool = False) -> dict:
+        params = {"agent_id": agent_id, "no_cache": no_cache}
+        return (await self._post("/test/", params=params)).json()
+
+    async def upload_and_test(
+        self, files: dict[str, bytes], no_cache: bool = False
+    ) -> dict:
+        """Upload files and run their tests in one request."""
+        uploads = [("files", (name, data)) for name, data in files.items()]
+        response = await self._post(
+            "/upload-and-test/", files=uploads, params={"no_cache": no_cache}
+        )
         return response.json()
+
+    async def run_tests_batch(
+        self, agent_ids: list[str], no_cache: bool = False
+    ) -> dict[str, dict]:
+        """Run the tests of many agents in one request; results by agent id."""
+        response = await self._post(
+            "/batch/test/", json={"agent_ids": agent_ids, "no_cache": no_cache}
+        )
+        return response.json()["results"]
+
+    async def stream_tests(self, agent_id: str) -> AsyncIterator[dict]:
+        """Run pytest and yield its NDJSON events while it runs."""
+        async with self.client.stream(
+            "POST", "/stream/test/", params={"agent_id": agent_id}
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
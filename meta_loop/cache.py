@@ -0,0 +1,201 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from pydantic import TypeAdapter
+from pydantic_ai.messages import ModelMessagesTypeAdapter, ModelResponse
+from pydantic_ai.models import Model
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.usage import Usage
+
+ModelResponseTypeAdapter = TypeAdapter(ModelResponse)
+
+# Set to the probe's revision while it runs, so identical requests of
+# different probes (e.g. the shared refine prompt) get their own answers
+cache_scope: ContextVar[str | None] = ContextVar("meta_loop_cache_scope", default=None)
+
+
+class DiskCache:
+    """
+    Content-addressed on-disk cache with size-bounded LRU eviction.
+
+    Entries live in `<directory>/<key[:2]>/<key>`. Recency is kept in memory,
+    seeded from the file mtimes (bumped on every hit) when the directory is
+    first scanned; the least recently used files are removed once the total
+    size goes over `max_bytes`. Safe to use from several threads.
+
+    Args:
+        directory (str): Where entries are stored.
+        max_bytes (int): Size bound of the cache (default: 512 MiB).
+        ttl (float, optional): Seconds after which an entry expires.
+    """
+
+    def __init__(
+        self, directory: str, max_bytes: int = 512 * 1024**2, ttl: float | None = None
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # Sizes by path, least recently used first
+        self._sizes: OrderedDict[str, int] | None = None
+        self._total = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts) -> str:
+        """Hash JSON-serializable parts into a cache key."""
+        payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _index(self) -> OrderedDict[str, int]:
+        """The size index; call with the lock held."""
+        if self._sizes is None:
+            entries = []
+            for root, _, files in os.walk(self.directory):
+                for file in files:
+                    if not file.startswith("."):
+                        path = os.path.join(root, file)
+                        try:
+                            stat = os.stat(path)
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_mtime, path, stat.st_size))
+            entries.sort()
+            self._sizes = OrderedDict((path, size) for _, path, size in entries)
+            self._total = sum(self._sizes.values())
+        return self._sizes
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                created, _, value = f.read().partition(b"\n")
+        except FileNotFoundError:
+            return None
+        if self.ttl is not None and time.time() - float(created) > self.ttl:
+            self.delete(key)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another thread since the read; the value is still good
+            return value
+        with self._lock:
+            sizes = self._index()
+            if path in sizes:
+                sizes.move_to_end(path)
+        return value
+
+    def set(self, key: str, value: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".")
+        with os.fdopen(fd, "wb") as f:
+            f.write(f"{time.time()}\n".encode())
+            f.write(value)
+        os.replace(tmp, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            sizes = self._index()
+            self._total += size - sizes.pop(path, 0)
+            sizes[path] = size
+            victims = self._evict()
+        for victim in victims:
+            try:
+                os.remove(victim)
+            except FileNotFoundError:
+                pass
+
+    def delete(self, key: str):
+        path = self._path(key)
+        with self._lock:
+            self._total -= self._index().pop(path, 0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> list[str]:
+        """Drop least recently used entries from the index until it fits."""
+        sizes = self._index()
+        victims = []
+        while self._total > self.max_bytes and sizes:
+            path, size = sizes.popitem(last=False)
+            self._total -= size
+            victims.append(path)
+        return victims
+
+
+def _strip_timestamps(value):
+    if isinstance(value, dict):
+        return {k: _strip_timestamps(v) for k, v in value.items() if k != "timestamp"}
+    if isinstance(value, list):
+        return [_strip_timestamps(v) for v in value]
+    return value
+
+
+class CachedModel(WrapperModel):
+    """
+    Model which answers repeated requests from a DiskCache.
+
+    Requests are keyed by `cache_scope`, model name, messages (without
+    timestamps), settings and the tool/result schemas. Concurrent identical
+    requests of one scope share one call.
+    """
+
+    def __init__(self, wrapped: Model, cache: DiskCache):
+        super().__init__(wrapped)
+        self.cache = cache
+        self._pending: dict[str, asyncio.Future] = {}
+
+    def request_key(self, messages, model_settings, model_request_parameters) -> str:
+        return self.cache.key(
+            cache_scope.get(),
+            self.wrapped.system,
+            self.wrapped.model_name,
+            _strip_timestamps(
+                ModelMessagesTypeAdapter.dump_python(messages, mode="json")
+            ),
+            model_settings,
+            dataclasses.asdict(model_request_parameters),
+        )
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        key = self.request_key(messages, model_settings, model_request_parameters)
+        # The cache does blocking file I/O, and its first use scans the directory
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return ModelResponseTypeAdapter.validate_json(cached), Usage()
+        while key in self._pending:
+            pending = self._pending[key]
+            await asyncio.wait([pending])
+            if not pending.cancelled():
+                return pending.result(), Usage()
+
+        pending = self._pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            response, usage = await self.wrapped.request(
+                messages, model_settings, model_request_parameters
+            )
+            await asyncio.to_thread(
+                self.cache.set, key, ModelResponseTypeAdapter.dump_json(response)
+            )
+            pending.set_result(response)
+            return response, usage
+        except BaseException:
+            # Waiters retry the request themselves
+            pending.cancel()
+            raise
+        finally:
+            del self._pending[key]
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from meta_loop.cache import DiskCache
+from meta_loop.utils import hash_tree, run_command
+
+
+@dataclass
+class Candidate:
+    """A generated agent, identified by the content of its directory."""
+
+    name: str
+    path: str
+
+    def fingerprint(self) -> str:
+        """sha256 over the relative paths and contents of the agent's files."""
+        return hash_tree(self.path)
+
+
+@dataclass
+class PairResult:
+    input: Any
+    expected: Any
+    output: Any = None
+    latency: float | None = None
+    score: float = 0.0
+    cached: bool = False
+    error: str | None = None
+
+
+@dataclass
+class DatasetReport:
+    """Results of one candidate over the whole dataset."""
+
+    candidate: str
+    results: list[PairResult] = field(default_factory=list)
+
+    @property
+    def accuracy(self) -> float:
+        if not self.results:
+            return 0.0
+        return sum(r.score for r in self.results) / len(self.results)
+
+    def latency_percentile(self, q: float) -> float | None:
+        latencies = [r.latency for r in self.results if r.latency is not None]
+        return float(np.percentile(latencies, q)) if latencies else None
+
+    @property
+    def p50(self) -> float | None:
+        return self.latency_percentile(50)
+
+    @property
+    def p95(self) -> float | None:
+        return self.latency_percentile(95)
+
+
+Runner = Callable[[Candidate, Any], Awaitable[Any]]
+
+
+def command_runner(entry: str = "main.py", timeout: float | None = 60.0) -> Runner:
+    """
+    Run `python <entry>` in the candidate directory with the input on stdin.
+
+    The agent's answer is its stdout, parsed as JSON when possible.
+    """
+
+    async def run(candidate: Candidate, value: Any) -> Any:
+        payload = value if isinstance(value, str) else json.dumps(value)
+        result = await run_command(
+            ["python", entry],
+            timeout=timeout,
+            check=True,
+            cwd=candidate.path,
+            input=payload.encode("utf-8"),
+        )
+        output = result.stdout.decode("utf-8").strip()
+        try:
+            return json.loads(output)
+        except json.JSONDecodeError:
+            return output
+
+    return run
+
+
+def default_score(output: Any, expected: Any, tolerance: float = 0.1) -> float:
+    """1.0 for a match: numbers within `tolerance`, anything else by equality."""
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        try:
+            return float(abs(float(output) - expected) <= tolerance)
+        except (TypeError, ValueError):
+            return 0.0
+    return float(output == expected)
+
+
+async def evaluate_dataset(
+    candidates: list[Candidate],
+    pairs: list[tuple[Any, Any]],
+    runner: Runner,
+    max_workers: int = 8,
+    cache: DiskCache | None = None,
+    score_fn: Callable[[Any, Any], float] = default_score,
+) -> dict[str, DatasetReport]:
+    """
+    Run every candidate on every (input, expected) pair.
+
+    At most `max_workers` runs are in flight. Outputs are memoized in `cache`
+    under (candidate fingerprint, input), so an unchanged candidate only
+    runs the pairs it has not seen; failed runs are not memoized.
+
+    Args:
+        candidates (List[Candidate]): Agents to evaluate.
+        pairs (List[Tuple[Any, Any]]): Dataset, e.g. from `meta_loop.dataset`.
+        runner (Runner): Coroutine function running one candidate on one input.
+        max_workers (int): Maximum number of concurrent runs (default 8).
+        cache (DiskCache, optional): Memo of outputs and latencies.
+        score_fn (callable): Score of an output against the expected value (default: default_score).
+
+    Returns:
+        dict: DatasetReport by candidate name.
+    """
+    slots = asyncio.Semaphore(max_workers)
+    fingerprints = await asyncio.gather(
+        *(asyncio.to_thread(c.fingerprint) for c in candidates)
+    )
+
+    def lookup(fingerprint: str) -> list[bytes | None]:
+        if cache is None:
+            return [None] * len(pairs)
+        return [cache.get(DiskCache.key("dataset", fingerprint, v)) for v, _ in pairs]
+
+    # One thread hop per candidate, so the runs still start in dataset order
+    memos = await asyncio.gather(*(asyncio.to_thread(lookup, f) for f in fingerprints))
+
+    async def run_pair(
+        candidate: Candidate, fingerprint: str, pair, cached: bytes | None
+    ) -> PairResult:
+        value, expected = pair
+        result = PairResult(value, expected)
+        key = DiskCache.key("dataset", fingerprint, value)
+        if cached is not None:
+            entry = json.loads(cached)
+            result.output, result.latency = entry["output"], entry["latency"]
+            result.cached = True
+        else:
+            async with slots:
+                start = time.perf_counter()
+                try:
+                    result.output = await runner(candidate, value)
+                except Exception as e:
+                    result.error = f"{type(e).__name__}: {e}"
+                    return result
+                result.latency = time.perf_counter() - start
+            if cache is not None:
+                entry = {"output": result.output, "latency": result.latency}
+                value = json.dumps(entry, default=str).encode("utf-8")
+                await asyncio.to_thread(cache.set, key, value)
+        result.score = score_fn(result.output, expected)
+        return result
+
+    per_candidate = await asyncio.gather(
+        *(
+            asyncio.gather(
+                *(run_pair(candidate, fingerprint, p, m) for p, m in zip(pairs, memo))
+            )
+            for candidate, fingerprint, memo in zip(candidates, fingerprints, memos)
+        )
+    )
+    return {
+        candidate.name: DatasetReport(candidate.name, list(results))
+        for candidate, results in zip(candidates, per_candidate)
+    }
@@ -1,6 +1,9 @@
+from collections import deque
 from datetime import datetime
 from typing import Any
 
+import numpy as np
+
 
 def heuristic_function(
     number_of_cycles: int,
@@ -80,6 +83,106 @@ def heuristic_function(
     return round(max(0, min(10, total_score)), 2)
 
 
+def heuristic_function_batch(
+    number_of_cycles: np.ndarray,
+    coverage: np.ndarray,
+    max_tools: int | np.ndarray,
+    max_repeats: np.ndarray,
+    success_rate: np.ndarray,
+    duration: np.ndarray | None = None,
+    max_duration: float = 120.0,
+    output_quality: np.ndarray | float = 1.0,
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    Vectorized `heuristic_function` over columnar arrays of runs.
+
+    Scores match the scalar function exactly: the components are computed
+    with the same operations in the same order, and the final rounding uses
+    Python's `round`.
+
+    Args:
+        number_of_cycles (np.ndarray): Tool calls per run (1 to 10).
+        coverage (np.ndarray): Unique tools used per run.
+        max_tools (int | np.ndarray): Total number of available tools.
+        max_repeats (np.ndarray): Usage count of the most used tool per run.
+        success_rate (np.ndarray): Proportion of successful tool calls (0 to 1).
+        duration (np.ndarray, optional): Execution time in seconds; NaN where unknown.
+        max_duration (float): Maximum expected duration in seconds (default 120).
+        output_quality (np.ndarray | float): Quality of final output (0 to 1, default 1).
+
+    Returns:
+        tuple: (scores, breakdown) where breakdown maps each component name to its array.
+    """
+    cycles = np.asarray(number_of_cycles, dtype=np.float64)
+    coverage = np.asarray(coverage, dtype=np.float64)
+    max_tools = np.broadcast_to(np.asarray(max_tools, dtype=np.float64), cycles.shape)
+    max_repeats = np.asarray(max_repeats, dtype=np.float64)
+    success_rate = np.asarray(success_rate, dtype=np.float64)
+    if duration is None:
+        duration = np.full(cycles.shape, np.nan)
+    duration = np.asarray(duration, dtype=np.float64)
+    output_quality = np.broadcast_to(
+        np.asarray(output_quality, dtype=np.float64), cycles.shape
+    )
+
+    def check(invalid, message):
+        if np.any(invalid):
+            index = int(np.flatnonzero(invalid)[0])
+            raise ValueError(f"Run {index}: {message}")
+
+    check((cycles < 1) | (cycles > 10), "Number of cycles must be between 1 and 10.")
+    check(
+        (coverage < 1) | (coverage > max_tools),
+        "Coverage must be between 1 and max_tools.",
+    )
+    check(coverage > cycles, "Coverage cannot exceed the number of cycles.")
+    check(max_tools < 1, "max_tools must be at least 1.")
+    check(
+        (success_rate < 0) | (success_rate > 1),
+        "Success rate must be between 0 and 1.",
+    )
+    check(duration < 0, "Duration cannot be negative.")
+
+    cycle_score = np.where(
+        (cycles >= 5) & (cycles <= 7),
+        2.5,
+        np.where(
+            cycles < 5,
+            (cycles - 1) * (2.5 / 4),
+            2.5 - (cycles - 7) * (2.5 / 3),
+        ),
+    )
+    coverage_score = (coverage / max_tools) * 2.5
+    repetition_penalty = np.minimum(1.0, (max_repeats / cycles) * 2)
+    success_score = success_rate * 2.5
+    time_score = np.where(
+        np.isnan(duration),
+        2.5,
+        np.maximum(0, 2.5 * (1 - duration / max_duration)),
+    )
+    quality_bonus = output_quality * 0.5
+
+    total_score = (
+        cycle_score
+        + coverage_score
+        - repetition_penalty
+        + success_score
+        + time_score
+        + quality_bonus
+    )
+    clipped = np.maximum(0, np.minimum(10, total_score))
+    scores = np.array([round(x, 2) for x in clipped.tolist()], dtype=np.float64)
+    breakdown = {
+        "cycle_score": cycle_score,
+        "coverage_score": coverage_score,
+        "repetition_penalty": repetition_penalty,
+        "success_score": success_score,
+        "time_score": time_score,
+        "quality_bonus": quality_bonus,
+    }
+    return scores, breakdown
+
+
 def evaluate_run_result(
     run_result: Any, max_tools: int = 7
 ) -> tuple[float, int, int, dict[str, int]]:
@@ -87,78 +190,234 @@ def evaluate_run_result(
     Evaluate a RunResult-like object with enhanced metrics.
 
     Args:
-        run_result (Any): Object with '_all_messages' attribute.
+        run_result (Any): Object with '_all_messages' attribute or 'all_messages()' method.
         max_tools (int): Total number of available tools (default 7).
 
     Returns:
         tuple: (score, number_of_cycles, coverage, tool_usage)
     """
-    if not hasattr(run_result, "_all_messages"):
+    if hasattr(run_result, "_all_messages"):
+        messages = run_result._all_messages
+    elif hasattr(run_result, "all_messages"):
+        messages = run_result.all_messages()
+    else:
         raise ValueError("RunResult object must have '_all_messages' attribute.")
+    return evaluate_messages(messages, getattr(run_result, "data", None), max_tools)
 
-    # Extract tool calls and returns
-    tool_calls = []
-    tool_returns = []
-    timestamps = []
-    for message in run_result._all_messages:
-        if hasattr(message, "parts"):
-            for part in message.parts:
-                if hasattr(part, "part_kind"):
-                    if part.part_kind == "tool-call" and hasattr(part, "tool_name"):
-                        tool_calls.append(part)
-                    elif part.part_kind == "tool-return" and hasattr(part, "content"):
-                        tool_returns.append(part)
-                if hasattr(part, "timestamp"):
-                    timestamps.append(part.timestamp)
-
-    number_of_cycles = len(tool_calls)
-    if number_of_cycles == 0:
-        return 0.0, 0, 0, {}
-
-    # Tool usage and coverage
-    tool_usage: dict[str, int] = {}
-    for tool_call in tool_calls:
-        tool_name = tool_call.tool_name
-        tool_usage[tool_name] = tool_usage.get(tool_name, 0) + 1
-    coverage = len(tool_usage)
-
-    # Success rate: Check tool returns for errors
-    success_count = sum(
-        1
-        for ret in tool_returns
-        if ret.content and "error" not in str(ret.content).lower()
-    )
-    success_rate = success_count / len(tool_returns) if tool_returns else 1.0
-
-    # Duration: From first to last timestamp (if available)
-    duration = None
-    if timestamps and len(timestamps) > 1:
-        duration = (timestamps[-1] - timestamps[0]).total_seconds()
-
-    # Output quality: Check if final data indicates success
-    output_quality = (
-        1.0
-        if hasattr(run_result, "data")
-        and "successfully" in str(run_result.data).lower()
-        else 0.5
+
+# Strings are lower-cased this many characters at a time
+ERROR_SCAN_CHUNK = 64 * 1024
+
+
+def _text_contains_error(text: str) -> bool:
+    if len(text) <= ERROR_SCAN_CHUNK:
+        return "error" in text.lower()
+    # Chunks overlap by len("error") - 1 so no match is split
+    for start in range(0, len(text), ERROR_SCAN_CHUNK):
+        if "error" in text[start : start + ERROR_SCAN_CHUNK + 4].lower():
+            return True
+    return False
+
+
+# Items of a list scanned as one joined string
+ERROR_SCAN_ITEMS = 256
+# Values that never print as "error"
+_SCALARS = (int, float, bool, type(None))
+
+
+def contains_error(content: Any) -> bool:
+    """
+    Look for "error" in tool-return content, case-insensitively.
+
+    Long strings are lower-cased in chunks. Dicts and lists are walked in
+    document order, their items scanned a batch at a time, rather than
+    printed whole with `str()`; the scan stops at the first hit. Other
+    objects are read as `str(content)` would show them: by `str()` at the
+    top level, by `repr()` when nested.
+    """
+    if type(content) not in (str, dict, list, tuple) and type(content) not in _SCALARS:
+        return _text_contains_error(str(content))
+    pending = deque([content])
+    while pending:
+        item = pending.popleft()
+        kind = type(item)
+        if kind is str:
+            if _text_contains_error(item):
+                return True
+        elif kind is dict:
+            pending.appendleft(list(item.values()))
+            pending.appendleft(list(item))
+        elif kind is list or kind is tuple:
+            if len(item) <= 16 and not all(type(x) is str for x in item):
+                # A few, possibly large, items: walk each of them
+                pending.extendleft(reversed(item))
+                continue
+            for start in range(0, len(item), ERROR_SCAN_ITEMS):
+                batch = item[start : start + ERROR_SCAN_ITEMS]
+                try:
+                    text = "\0".join(batch)
+                except TypeError:
+                    text = str(batch)
+                if _text_contains_error(text):
+                    return True
+        elif kind in _SCALARS:
+            continue
+        elif _text_contains_error(repr(item)):
+            return True
+    return False
+
+
+_MISSING = object()
+
+
+def _output_quality(data: Any) -> float:
+    """Check if the final data indicates success."""
+    return 1.0 if "successfully" in str(data).lower() else 0.5
+
+
+class TraceSummary:
+    """
+    Counts gathered from an agent trace in a single pass.
+
+    Parts are fed one at a time with `add_part`, so the summary can be built
+    from a finished message history or kept up to date while a run executes.
+    """
+
+    __slots__ = (
+        "tool_usage",
+        "tool_calls",
+        "tool_returns",
+        "successes",
+        "first_timestamp",
+        "last_timestamp",
+        "timestamps",
     )
 
-    # Cap cycles at 10
-    number_of_cycles = min(number_of_cycles, 10)
-
-    # Compute score
-    score = heuristic_function(
-        number_of_cycles,
-        coverage,
-        max_tools,
-        tool_usage,
-        success_rate,
-        duration,
-        max_duration=120.0,
-        output_quality=output_quality,
+    def __init__(self):
+        self.tool_usage: dict[str, int] = {}
+        self.tool_calls = 0
+        self.tool_returns = 0
+        self.successes = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.timestamps = 0
+
+    def add_message(self, message: Any):
+        self.add_parts(getattr(message, "parts", ()))
+
+    def add_part(self, part: Any):
+        self.add_parts((part,))
+
+    def add_parts(self, parts):
+        tool_usage = self.tool_usage
+        tool_calls, tool_returns = self.tool_calls, self.tool_returns
+        successes, timestamps = self.successes, self.timestamps
+        for part in parts:
+            kind = getattr(part, "part_kind", None)
+            if kind == "tool-call":
+                tool_name = getattr(part, "tool_name", _MISSING)
+                if tool_name is not _MISSING:
+                    tool_calls += 1
+                    tool_usage[tool_name] = tool_usage.get(tool_name, 0) + 1
+            elif kind == "tool-return":
+                content = getattr(part, "content", _MISSING)
+                if content is not _MISSING:
+                    tool_returns += 1
+                    if not content:
+                        pass
+                    elif type(content) is str and len(content) <= ERROR_SCAN_CHUNK:
+                        successes += "error" not in content.lower()
+                    elif not contains_error(content):
+                        successes += 1
+            timestamp = getattr(part, "timestamp", _MISSING)
+            if timestamp is not _MISSING:
+                if timestamps == 0:
+                    self.first_timestamp = timestamp
+                self.last_timestamp = timestamp
+                timestamps += 1
+        self.tool_calls, self.tool_returns = tool_calls, tool_returns
+        self.successes, self.timestamps = successes, timestamps
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.tool_returns if self.tool_returns else 1.0
+
+    @property
+    def duration(self) -> float | None:
+        if self.timestamps > 1:
+            return (self.last_timestamp - self.first_timestamp).total_seconds()
+        return None
+
+    def _capped(self, max_tools: int) -> tuple[int, int]:
+        """Cycles capped at 10, and coverage at the cycles and `max_tools`."""
+        number_of_cycles = min(self.tool_calls, 10)
+        coverage = min(len(self.tool_usage), number_of_cycles, max_tools)
+        return number_of_cycles, coverage
+
+    def evaluate(
+        self, data: Any = None, max_tools: int = 7
+    ) -> tuple[float, int, int, dict[str, int]]:
+        """Score the trace; see `evaluate_run_result` for the returned tuple."""
+        if self.tool_calls == 0:
+            return 0.0, 0, 0, {}
+
+        output_quality = _output_quality(data)
+
+        number_of_cycles, coverage = self._capped(max_tools)
+
+        score = heuristic_function(
+            number_of_cycles,
+            coverage,
+            max_tools,
+            self.tool_usage,
+            self.success_rate,
+            self.duration,
+            max_duration=120.0,
+            output_quality=output_quality,
+        )
+        return score, number_of_cycles, coverage, dict(self.tool_usage)
+
+    def breakdown(self, data: Any = None, max_tools: int = 7) -> dict[str, float]:
+        """The heuristic's components behind `evaluate`; empty without tool calls."""
+        if self.tool_calls == 0:
+            return {}
+        duration = self.duration
+        number_of_cycles, coverage = self._capped(max_tools)
+        _, components = heuristic_function_batch(
+            [number_of_cycles],
+            [coverage],
+            max_tools,
+            [max(self.tool_usage.values())],
+            [self.success_rate],
+            [np.nan if duration is None else duration],
+            output_quality=_output_quality(data),
+        )
+        return {name: float(values[0]) for name, values in components.items()}
+
+
+def summarize_messages(messages: list[Any]) -> "TraceSummary":
+    summary = TraceSummary()
+    summary.add_parts(
+        part for message in messages for part in getattr(message, "parts", ())
     )
+    return summary
+
+
+def evaluate_messages(
+    messages: list[Any], data: Any = None, max_tools: int = 7
+) -> tuple[float, int, int, dict[str, int]]:
+    """
+    Evaluate a (possibly unfinished) message history.
+
+    Args:
+        messages (List[Any]): Messages with 'parts'.
+        data (Any, optional): Final output of the run, if it has finished.
+        max_tools (int): Total number of available tools (default 7).
 
-    return score, number_of_cycles, coverage, tool_usage
+    Returns:
+        tuple: (score, number_of_cycles, coverage, tool_usage)
+    """
+    return summarize_messages(messages).evaluate(data, max_tools)
 
 
 def evaluate_map(results: list[Any], max_tools: int = 7):
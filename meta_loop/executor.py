@@ -0,0 +1,159 @@
+import asyncio
+import pickle
+import signal
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+# Extra seconds a batch may take on top of its per-call timeouts
+BATCH_GRACE = 5.0
+
+
+class EvalError(Exception):
+    """Raised by an eval function; carries the original error as text."""
+
+
+def io_bound(fn: Callable) -> Callable:
+    """Mark an eval function to run in threads instead of processes."""
+    fn.io_bound = True
+    return fn
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError
+
+
+def _call(fn: Callable, item: Any, timeout: float | None) -> tuple[bool, Any]:
+    """Call `fn(item)` and return (ok, value or error text), never raising."""
+    alarm = (
+        timeout is not None and threading.current_thread() is threading.main_thread()
+    )
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return True, fn(item)
+    except TimeoutError:
+        return False, None
+    except Exception as e:
+        # The exception itself may not pickle; its text always does
+        return False, f"{type(e).__name__}: {e}"
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def _call_batch(
+    fn: Callable, items: list[Any], timeout: float | None
+) -> list[tuple[bool, Any]]:
+    return [_call(fn, item, timeout) for item in items]
+
+
+def _picklable(fn: Callable) -> bool:
+    try:
+        pickle.dumps(fn)
+    except Exception:
+        return False
+    return True
+
+
+class EvalExecutor:
+    """
+    Run an eval function off the event loop.
+
+    CPU-bound functions run in a process pool, in batches of `batch_size`
+    items per task so the function and results are pickled once per batch.
+    Functions marked with `io_bound`, and those that cannot be pickled, run
+    one item per task in a thread pool.
+    A call running longer than `timeout` seconds gives a `TimeoutError`
+    result instead of stalling the sweep.
+
+    Args:
+        fn (callable): Eval function of one item.
+        max_workers (int, optional): Pool size (default: the pool's default).
+        batch_size (int): Items per process task (default 16).
+        timeout (float, optional): Seconds allowed per call.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[Any], Any],
+        max_workers: int | None = None,
+        batch_size: int = 16,
+        timeout: float | None = None,
+    ):
+        self.fn = fn
+        self.max_workers = max_workers
+        # Lambdas and closures cannot be sent to processes
+        self.io_bound = getattr(fn, "io_bound", False) or not _picklable(fn)
+        self.batch_size = 1 if self.io_bound else batch_size
+        self.timeout = timeout
+        self._pool: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            pool = ThreadPoolExecutor if self.io_bound else ProcessPoolExecutor
+            self._pool = pool(self.max_workers)
+            self._slots = asyncio.Semaphore(self._pool._max_workers)
+        return self._pool
+
+    async def _run_batch(self, items: list[Any]) -> list[Any]:
+        loop = asyncio.get_running_loop()
+        executor = self._executor()
+        deadline = None
+        if self.timeout is not None:
+            # Threads cannot be interrupted; processes get a safety margin
+            grace = 0 if self.io_bound else BATCH_GRACE
+            deadline = self.timeout * len(items) + grace
+        # The deadline starts once a worker is free, not in the pool's queue
+        slots = self._slots
+        await slots.acquire()
+        try:
+            future = loop.run_in_executor(
+                executor, _call_batch, self.fn, items, self.timeout
+            )
+        except BaseException:
+            slots.release()
+            raise
+        # A timed out thread keeps its worker until it returns
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            outcomes = await asyncio.wait_for(asyncio.shield(future), deadline)
+        except asyncio.TimeoutError:
+            return [TimeoutError(f"eval_fn exceeded {self.timeout}s")] * len(items)
+        return [value if ok else self._error(value) for ok, value in outcomes]
+
+    def _error(self, message: str | None) -> Exception:
+        if message is None:
+            return TimeoutError(f"eval_fn exceeded {self.timeout}s")
+        return EvalError(message)
+
+    async def map(self, items: Iterable[Any]) -> list[Any]:
+        """
+        Evaluate all items concurrently, in order.
+
+        Like `asyncio.gather(..., return_exceptions=True)`, failed calls give
+        an exception (`EvalError` or `TimeoutError`) in place of their result.
+        """
+        items = list(items)
+        batches = [
+            items[i : i + self.batch_size]
+            for i in range(0, len(items), self.batch_size)
+        ]
+        results = await asyncio.gather(*(self._run_batch(b) for b in batches))
+        return [result for batch in results for result in batch]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._slots = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
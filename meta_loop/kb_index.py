@@ -0,0 +1,270 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+TOKEN_RE = re.compile(r"[a-z0-9_]+")
+HEADING_RE = re.compile(r"^#{1,6}\s+(.*)$")
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class Chunk:
+    framework: str
+    path: str
+    heading: str
+    start: int
+    end: int
+    # Of the source file when it was indexed; None skips the staleness check
+    mtime: float | None = None
+    size: int | None = None
+
+    @property
+    def text(self) -> str:
+        """Read the section from its source file."""
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if self.size is not None and (stat.st_mtime, stat.st_size) != (
+                self.mtime,
+                self.size,
+            ):
+                # The offsets are stale: find the section again and let the
+                # next load re-index the file
+                _knowledge_bases.clear()
+                return self._relocate(f.read())
+            f.seek(self.start)
+            return f.read(self.end - self.start).decode("utf-8", "replace")
+
+    def _relocate(self, data: bytes) -> str:
+        for heading, start, end in chunk_markdown(data):
+            if heading == self.heading:
+                return data[start:end].decode("utf-8", "replace")
+        return ""
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def chunk_markdown(data: bytes) -> list[tuple[str, int, int]]:
+    """Split a markdown document into (heading, start, end) byte ranges."""
+    sections = []
+    heading, start, offset, in_code = "", 0, 0, False
+    for raw in data.splitlines(keepends=True):
+        line = raw.decode("utf-8", "replace")
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else HEADING_RE.match(line)
+        if match:
+            if offset > start:
+                sections.append((heading, start, offset))
+            heading, start = match.group(1).strip(), offset
+        offset += len(raw)
+    if data[start:].strip():
+        sections.append((heading, start, len(data)))
+    return sections
+
+
+def index_file(data: bytes) -> list[dict]:
+    """Chunk one file and count the terms of every chunk."""
+    entries = []
+    for heading, start, end in chunk_markdown(data):
+        text = data[start:end].decode("utf-8", "replace")
+        terms = Counter(tokenize(f"{heading}\n{text}"))
+        entries.append(
+            {"heading": heading, "start": start, "end": end, "terms": dict(terms)}
+        )
+    return entries
+
+
+def manifest_path(root: str) -> str:
+    """The manifest lives beside the kb directory, e.g. `kb.index.json`."""
+    return os.path.normpath(root) + ".index.json"
+
+
+def load_manifest(root: str) -> dict:
+    try:
+        with open(manifest_path(root), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"version": MANIFEST_VERSION, "frameworks": [], "files": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "frameworks": [], "files": {}}
+    return manifest
+
+
+def save_manifest(root: str, manifest: dict):
+    path = manifest_path(root)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".kb")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    # mkstemp creates the file 0600; the manifest is meant to be shared
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def refresh_manifest(root: str = "kb") -> dict:
+    """
+    Bring the manifest up to date with `root`.
+
+    Files whose mtime and size are unchanged are not read; files whose
+    content hash is unchanged are not re-chunked.
+    """
+    manifest = load_manifest(root)
+    old_files = manifest["files"]
+    files, frameworks, changed = {}, [], False
+    if os.path.isdir(root):
+        for framework in sorted(os.listdir(root)):
+            directory = os.path.join(root, framework)
+            if not os.path.isdir(directory):
+                continue
+            frameworks.append(framework)
+            for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+                if not (entry.name.endswith(".md") or entry.name.endswith(".mdx")):
+                    continue
+                stat = entry.stat()
+                key = f"{framework}/{entry.name}"
+                old = old_files.get(key)
+                if old and (old["mtime"], old["size"]) == (stat.st_mtime, stat.st_size):
+                    files[key] = old
+                    continue
+                with open(entry.path, "rb") as f:
+                    data = f.read()
+                sha256 = hashlib.sha256(data).hexdigest()
+                chunks = (
+                    old["chunks"]
+                    if old and old["sha256"] == sha256
+                    else index_file(data)
+                )
+                files[key] = {
+                    "mtime": stat.st_mtime,
+                    "size": stat.st_size,
+                    "sha256": sha256,
+                    "chunks": chunks,
+                }
+                changed = True
+    changed = changed or files.keys() != old_files.keys()
+    changed = changed or frameworks != manifest["frameworks"]
+    manifest.update(frameworks=frameworks, files=files)
+    if changed:
+        save_manifest(root, manifest)
+    return manifest
+
+
+class KnowledgeBase:
+    """
+    BM25 index over section-level chunks of `kb/<framework>/*.md(x)`.
+
+    Args:
+        chunks (List[Chunk]): Sections to index.
+        terms (List[Dict[str, int]]): Term frequencies of each chunk.
+        frameworks (List[str], optional): Framework directories (default: those of the chunks).
+        k1 (float): Term frequency saturation (default 1.5).
+        b (float): Length normalization (default 0.75).
+    """
+
+    def __init__(
+        self,
+        chunks: list[Chunk],
+        terms: list[dict[str, int]],
+        frameworks: list[str] | None = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.chunks = chunks
+        self.frameworks = frameworks or sorted({c.framework for c in chunks})
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        self.lengths: list[int] = []
+        for chunk_id, chunk_terms in enumerate(terms):
+            self.lengths.append(sum(chunk_terms.values()))
+            for term, tf in chunk_terms.items():
+                self.postings.setdefault(term, []).append((chunk_id, tf))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if chunks else 0.0
+
+    @classmethod
+    def from_directory(cls, root: str = "kb") -> "KnowledgeBase":
+        manifest = refresh_manifest(root)
+        chunks, terms = [], []
+        for key, entry in manifest["files"].items():
+            framework = key.split("/", 1)[0]
+            path = os.path.join(root, key)
+            for chunk in entry["chunks"]:
+                chunks.append(
+                    Chunk(
+                        framework,
+                        path,
+                        chunk["heading"],
+                        chunk["start"],
+                        chunk["end"],
+                        entry["mtime"],
+                        entry["size"],
+                    )
+                )
+                terms.append(chunk["terms"])
+        return cls(chunks, terms, manifest["frameworks"])
+
+    def files(self, framework: str) -> list[str]:
+        """Paths of the indexed documents of one framework."""
+        return list(
+            dict.fromkeys(c.path for c in self.chunks if c.framework == framework)
+        )
+
+    def search(self, query: str, framework: str = "*", k: int = 5) -> list[Chunk]:
+        """Return the `k` best matching chunks, optionally within one framework."""
+        n = len(self.chunks)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings:
+                norm = self.k1 * (
+                    1 - self.b + self.b * self.lengths[chunk_id] / self.avg_length
+                )
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (
+                    self.k1 + 1
+                ) / (tf + norm)
+        if framework not in ("*", "", None):
+            framework = framework.lower()
+            scores = {
+                chunk_id: score
+                for chunk_id, score in scores.items()
+                if self.chunks[chunk_id].framework.lower() == framework
+            }
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [self.chunks[chunk_id] for chunk_id, _ in best]
+
+
+_knowledge_bases: dict[str, KnowledgeBase] = {}
+_build_lock = threading.Lock()
+
+
+def load_knowledge_base(root: str = "kb") -> KnowledgeBase:
+    """Refresh the manifest and build the index once per process."""
+    kb = _knowledge_bases.get(root)
+    if kb is None:
+        # Concurrent first calls from worker threads wait for a single build
+        with _build_lock:
+            kb = _knowledge_bases.get(root)
+            if kb is None:
+                kb = _knowledge_bases[root] = KnowledgeBase.from_directory(root)
+    return kb
+
+
+def format_chunks(chunks: list[Chunk], max_chars: int = 1500) -> str:
+    snippets = []
+    for chunk in chunks:
+        text = chunk.text
+        if len(text) > max_chars:
+            text = text[:max_chars] + "\n[...truncated]"
+        snippets.append(f"### {chunk.path} > {chunk.heading}\n{text}")
+    return "\n\n".join(snippets)
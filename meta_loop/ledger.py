@@ -0,0 +1,301 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+from collections.abc import Iterator
+from typing import Any
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+
+# Probe rows buffered before they are written in one transaction
+BATCH_SIZE = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    id INTEGER PRIMARY KEY,
+    instruction TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS probes (
+    id INTEGER PRIMARY KEY,
+    sweep_id INTEGER NOT NULL REFERENCES sweeps(id),
+    revision TEXT NOT NULL,
+    prompt TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    score REAL,
+    cycles INTEGER,
+    coverage INTEGER,
+    tool_usage TEXT,
+    breakdown TEXT,
+    rate_wait REAL,
+    queue_wait REAL,
+    execution REAL,
+    eval_score TEXT,
+    accuracy REAL,
+    p50 REAL,
+    p95 REAL,
+    finished REAL NOT NULL,
+    UNIQUE (sweep_id, revision)
+);
+-- Kept apart so queries over probes never read the traces
+CREATE TABLE IF NOT EXISTS traces (
+    probe_id INTEGER PRIMARY KEY REFERENCES probes(id),
+    messages BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sweeps_instruction ON sweeps (instruction);
+CREATE INDEX IF NOT EXISTS probes_score ON probes (score);
+"""
+
+# Columns `update_probes` may set once a sweep's later stages are done
+UPDATABLE = (
+    "rate_wait",
+    "queue_wait",
+    "execution",
+    "eval_score",
+    "accuracy",
+    "p50",
+    "p95",
+)
+
+
+def dump_messages(messages: list[ModelMessage]) -> bytes:
+    """Compressed JSON of a message trace, as stored in the ledger."""
+    return zlib.compress(ModelMessagesTypeAdapter.dump_json(messages))
+
+
+def load_messages(blob: bytes) -> list[ModelMessage]:
+    return ModelMessagesTypeAdapter.validate_json(zlib.decompress(blob))
+
+
+class Ledger:
+    """
+    SQLite store of every sweep's probes, scores and traces.
+
+    Probes are buffered and written `batch_size` at a time in one
+    transaction; `flush` (or leaving the `with` block) writes the rest.
+    Traces are compressed and live in their own table, read only by `trace`.
+
+    Args:
+        path (str): Database file, created if missing.
+        batch_size (int): Probes buffered before a write (default: BATCH_SIZE).
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._pending: list[tuple[dict, bytes | None]] = []
+        self._lock = threading.Lock()
+
+    def start_sweep(self, instruction: str, config: dict | None = None) -> int:
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO sweeps (instruction, started, config) VALUES (?, ?, ?)",
+                (instruction, time.time(), json.dumps(config or {}, default=str)),
+            )
+        return cursor.lastrowid
+
+    def finish_sweep(self, sweep_id: int):
+        self.flush()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE sweeps SET finished = ? WHERE id = ?", (time.time(), sweep_id)
+            )
+
+    def record_probe(
+        self,
+        sweep_id: int,
+        revision: str,
+        prompt: str | None = None,
+        metrics: tuple | None = None,
+        error: Exception | None = None,
+        pruned: bool = False,
+        messages: list[ModelMessage] | None = None,
+        breakdown: dict[str, float] | None = None,
+    ):
+        """
+        Buffer one finished probe.
+
+        Args:
+            sweep_id (int): From `start_sweep`.
+            revision (str): The probe's revision.
+            prompt (str, optional): Its refined prompt.
+            metrics (tuple, optional): (score, cycles, coverage, tool_usage) of `evaluate_run_result`.
+            error (Exception, optional): Why the probe failed or was pruned.
+            pruned (bool): Whether the search stopped it early.
+            messages (List[ModelMessage], optional): Its message trace.
+            breakdown (dict, optional): The score's components, from `TraceSummary.breakdown`.
+        """
+        score = cycles = coverage = tool_usage = None
+        if metrics is not None:
+            score, cycles, coverage, usage = metrics
+            tool_usage = json.dumps(usage)
+        status = "pruned" if pruned else "failed" if error is not None else "ok"
+        row = {
+            "sweep_id": sweep_id,
+            "revision": revision,
+            "prompt": prompt,
+            "status": status,
+            "error": None if error is None else f"{type(error).__name__}: {error}",
+            "score": score,
+            "cycles": cycles,
+            "coverage": coverage,
+            "tool_usage": tool_usage,
+            "breakdown": None if breakdown is None else json.dumps(breakdown),
+            "finished": time.time(),
+        }
+        trace = None if messages is None else dump_messages(messages)
+        with self._lock:
+            self._pending.append((row, trace))
+            if len(self._pending) >= self.batch_size:
+                self._write()
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        if not self._pending:
+            return
+        columns = list(self._pending[0][0])
+        # A revision recorded again keeps its id, so its trace is never
+        # orphaned; results of later stages belong to the old outcome
+        assignments = [
+            f"{column} = excluded.{column}"
+            for column in columns
+            if column not in ("sweep_id", "revision")
+        ] + [f"{column} = NULL" for column in UPDATABLE]
+        upsert = (
+            f"INSERT INTO probes ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT (sweep_id, revision) DO UPDATE SET {', '.join(assignments)}"
+        )
+        select = "SELECT id FROM probes WHERE sweep_id = ? AND revision = ?"
+        with self.conn:
+            traces, stale = [], []
+            for row, trace in self._pending:
+                self.conn.execute(upsert, list(row.values()))
+                (probe_id,) = self.conn.execute(
+                    select, (row["sweep_id"], row["revision"])
+                ).fetchone()
+                if trace is None:
+                    stale.append((probe_id,))
+                else:
+                    traces.append((probe_id, trace))
+            self.conn.executemany("DELETE FROM traces WHERE probe_id = ?", stale)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO traces (probe_id, messages) VALUES (?, ?)",
+                traces,
+            )
+        self._pending.clear()
+
+    def update_probes(self, sweep_id: int, values: dict[str, dict[str, Any]]):
+        """
+        Set later results of a sweep's probes, by revision: timings, the
+        eval_fn score and dataset accuracy and latencies (see UPDATABLE).
+        """
+        self.flush()
+        updates = defaultdict(list)
+        for revision, fields in values.items():
+            unknown = fields.keys() - set(UPDATABLE)
+            if unknown:
+                raise ValueError(f"Cannot update {sorted(unknown)}")
+            for column, value in fields.items():
+                if column == "eval_score":
+                    value = json.dumps(value, default=str)
+                updates[column].append((value, sweep_id, revision))
+        with self._lock, self.conn:
+            for column, rows in updates.items():
+                self.conn.executemany(
+                    f"UPDATE probes SET {column} = ? "
+                    "WHERE sweep_id = ? AND revision = ?",
+                    rows,
+                )
+
+    def probes(self, sweep_id: int) -> Iterator[dict]:
+        """Rows of a sweep's probes, without their traces."""
+        self.flush()
+        query = "SELECT * FROM probes WHERE sweep_id = ? ORDER BY id"
+        # Read whole under the lock: writers share the connection
+        with self._lock:
+            rows = self.conn.execute(query, (sweep_id,)).fetchall()
+        for row in rows:
+            yield dict(row)
+
+    def trace(self, sweep_id: int, revision: str) -> list[ModelMessage] | None:
+        self.flush()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT messages FROM traces JOIN probes ON probes.id = traces.probe_id "
+                "WHERE sweep_id = ? AND revision = ?",
+                (sweep_id, revision),
+            ).fetchone()
+        return None if row is None else load_messages(row["messages"])
+
+    def best_per_instruction(self) -> list[dict]:
+        """The highest-scoring probe of every instruction, across all sweeps."""
+        self.flush()
+        query = """
+            SELECT instruction, sweep_id, revision, prompt, score FROM (
+                SELECT sweeps.instruction, probes.*, ROW_NUMBER() OVER (
+                    PARTITION BY sweeps.instruction ORDER BY probes.score DESC
+                ) AS rank
+                FROM probes JOIN sweeps ON sweeps.id = probes.sweep_id
+                WHERE probes.score IS NOT NULL
+            )
+            WHERE rank = 1
+            ORDER BY instruction
+        """
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(query)]
+
+    def breakdown_averages(self, instruction: str | None = None) -> dict[str, float]:
+        """Mean of every score component over the probes (of one instruction)."""
+        self.flush()
+        query = """
+            SELECT component.key AS name, AVG(component.value) AS mean
+            FROM probes
+            JOIN sweeps ON sweeps.id = probes.sweep_id,
+                json_each(probes.breakdown) AS component
+            WHERE probes.breakdown IS NOT NULL AND (? IS NULL OR instruction = ?)
+            GROUP BY component.key ORDER BY component.key
+        """
+        with self._lock:
+            rows = self.conn.execute(query, (instruction, instruction)).fetchall()
+        return {row["name"]: row["mean"] for row in rows}
+
+    def score_distribution(
+        self, instruction: str | None = None, bin_width: float = 1.0
+    ) -> list[tuple[float, int]]:
+        """(lower bound, probe count) of every non-empty score bin."""
+        self.flush()
+        query = """
+            SELECT CAST(score / ? AS INTEGER) AS bin, COUNT(*) AS n
+            FROM probes JOIN sweeps ON sweeps.id = probes.sweep_id
+            WHERE score IS NOT NULL AND (? IS NULL OR instruction = ?)
+            GROUP BY bin ORDER BY bin
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                query, (bin_width, instruction, instruction)
+            ).fetchall()
+        return [(row["bin"] * bin_width, row["n"]) for row in rows]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,90 @@
+import time
+from typing import Any
+
+from meta_loop.eval import TraceSummary
+from meta_loop.search import ProbePrunedError
+
+
+class ProbeCutoffError(ProbePrunedError):
+    """Raised inside a probe that loops on one tool or runs for too long."""
+
+
+class LiveEvaluator:
+    """
+    Running heuristic scores of probes, updated as their messages arrive.
+
+    Every message only touches the counters of its own probe, so the scores
+    and the leaderboard are always current while the runs execute.
+
+    Args:
+        max_tools (int): Total number of available tools (default 7); `run_probe` sets it to the builder's.
+        max_repeats (int, optional): Stop a probe once it calls one tool more often.
+        max_duration (float, optional): Stop a probe after this many seconds.
+    """
+
+    def __init__(
+        self,
+        max_tools: int = 7,
+        max_repeats: int | None = None,
+        max_duration: float | None = None,
+    ):
+        self.max_tools = max_tools
+        self.max_repeats = max_repeats
+        self.max_duration = max_duration
+        self.summaries: dict[str, TraceSummary] = {}
+        self.scores: dict[str, float] = {}
+        self.finished: set[str] = set()
+        self._started: dict[str, float] = {}
+
+    def start(self, probe: str) -> TraceSummary:
+        self.summaries[probe] = TraceSummary()
+        self.scores[probe] = 0.0
+        self.finished.discard(probe)
+        self._started[probe] = time.monotonic()
+        return self.summaries[probe]
+
+    def add_message(self, probe: str, message: Any) -> float:
+        """
+        Feed one new message of a probe and return its updated score.
+
+        Raises `ProbeCutoffError` when the probe exceeds `max_repeats` or
+        `max_duration`.
+        """
+        summary = self.summaries.get(probe) or self.start(probe)
+        summary.add_message(message)
+        self.scores[probe] = summary.evaluate(max_tools=self.max_tools)[0]
+
+        if self.max_repeats is not None:
+            for tool_name in _tool_names(message):
+                if summary.tool_usage[tool_name] > self.max_repeats:
+                    raise ProbeCutoffError(
+                        f"Probe {probe} called {tool_name} more than "
+                        f"{self.max_repeats} times"
+                    )
+        if self.max_duration is not None:
+            elapsed = time.monotonic() - self._started[probe]
+            if elapsed > self.max_duration:
+                raise ProbeCutoffError(
+                    f"Probe {probe} still running after {elapsed:.0f}s"
+                )
+        return self.scores[probe]
+
+    def finish(
+        self, probe: str, data: Any = None
+    ) -> tuple[float, int, int, dict[str, int]]:
+        """Final metrics of a completed probe, as `evaluate_run_result` returns them."""
+        metrics = self.summaries[probe].evaluate(data, self.max_tools)
+        self.scores[probe] = metrics[0]
+        self.finished.add(probe)
+        return metrics
+
+    def leaderboard(self, n: int | None = None) -> list[tuple[str, float]]:
+        """(probe, score) pairs, best first."""
+        ranked = sorted(self.scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+
+def _tool_names(message: Any):
+    for part in getattr(message, "parts", ()):
+        if getattr(part, "part_kind", None) == "tool-call":
+            yield part.tool_name
@@ -1,11 +1,14 @@
 class Trial:
     """
     State of experiment.
+
+    `stack` holds the probe's message trace, as JSON-compatible dicts.
     """
 
-    def __init__(self, prompt):
+    def __init__(self, prompt, output=None, stack=None):
         self.prompt = prompt
-        self.stack = []
+        self.output = output
+        self.stack = stack if stack is not None else []
 
     def run(self):
         return
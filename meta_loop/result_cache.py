@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+from functools import cache
+from importlib.metadata import distributions
+
+from meta_loop.cache import DiskCache
+from meta_loop.utils import hash_tree
+
+# Where pytest outcomes are memoized
+RESULT_CACHE_DIR = os.environ.get(
+    "META_LOOP_RESULT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "meta_loop_results"),
+)
+# Size bound of the memo; least recently used outcomes go first
+RESULT_CACHE_BYTES = int(os.environ.get("META_LOOP_RESULT_CACHE_BYTES", 64 * 1024**2))
+# Exit codes a rerun would give again: passed, failed, interrupted (e.g. a
+# collection error), usage error, no tests. Timeouts and crashes are not kept.
+CACHEABLE_CODES = frozenset({0, 1, 2, 4, 5})
+
+
+@cache
+def environment_fingerprint() -> str:
+    """Hash of the interpreter version and installed distributions, once per process."""
+    installed = sorted(
+        {f"{dist.metadata['Name']}=={dist.version}" for dist in distributions()}
+    )
+    return DiskCache.key(sys.version, installed)
+
+
+class ResultCache:
+    """
+    Memo of pytest outcomes keyed by everything the tests can see.
+
+    The key covers the files under the test root (see `hash_tree`), the
+    target within it and `environment_fingerprint()`, so a run is answered
+    from the memo only while none of them changed.
+
+    Args:
+        directory (str): Where outcomes are stored (default: RESULT_CACHE_DIR).
+        max_bytes (int): Size bound of the memo (default: RESULT_CACHE_BYTES).
+    """
+
+    def __init__(
+        self, directory: str = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_BYTES
+    ):
+        self.cache = DiskCache(directory, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, root: str, target: str | None = None) -> str:
+        """Key of `pytest target` (default: the whole of `root`) as `root` is now."""
+        relative = os.path.relpath(target or root, root)
+        return DiskCache.key(
+            "pytest", hash_tree(root), relative, environment_fingerprint()
+        )
+
+    def get(self, key: str) -> dict | None:
+        """The stored {"returncode", "stdout", "stderr"} of a run, if any."""
+        with self._lock:
+            value = self.cache.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, returncode: int, stdout: str, stderr: str) -> bool:
+        """Store a finished run; returns whether its exit code was worth keeping."""
+        if returncode not in CACHEABLE_CODES:
+            return False
+        entry = {"returncode": returncode, "stdout": stdout, "stderr": stderr}
+        with self._lock:
+            self.cache.set(key, json.dumps(entry).encode("utf-8"))
+        return True
+
+
+@cache
+def default_result_cache() -> ResultCache:
+    """The process-wide memo under RESULT_CACHE_DIR."""
+    return ResultCache()
@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from pydantic_ai.models import Model
+from pydantic_ai.models.wrapper import WrapperModel
+
+# Lower value is served first: a probe that already has a refined prompt
+# gets the next free slot before a new refinement starts.
+RUN = 0
+REFINE = 1
+
+# (probe, stage, priority) of the model requests made in this context
+current_stage: ContextVar[tuple[str, str, int] | None] = ContextVar(
+    "meta_loop_stage", default=None
+)
+
+
+@dataclass
+class StageTiming:
+    probe: str
+    stage: str
+    queue_wait: float
+    execution: float
+    # Waiting for a token of the endpoint's bucket, before the slot
+    rate_wait: float = 0.0
+
+
+class TokenBucket:
+    """
+    Token bucket limiting requests per second.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float, optional): Burst size (default: max(1, rate)).
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+def endpoint_key(model: Model) -> str:
+    """Identify the endpoint a model talks to, so probes share its bucket."""
+    client = getattr(model, "client", None)
+    base_url = getattr(client, "base_url", "")
+    return f"{model.system}:{base_url}:{model.model_name}"
+
+
+class ThrottledModel(WrapperModel):
+    """
+    Model which takes a token of its endpoint's bucket, then a scheduler
+    slot, for every request; tool calls in between hold neither.
+    """
+
+    def __init__(
+        self,
+        wrapped: Model,
+        scheduler: "ProbeScheduler",
+        bucket: TokenBucket | None = None,
+    ):
+        super().__init__(wrapped)
+        self.scheduler = scheduler
+        self.bucket = bucket
+
+    async def request(self, *args, **kwargs):
+        probe, stage, priority = current_stage.get() or ("", "request", RUN)
+
+        async def send():
+            return await self.wrapped.request(*args, **kwargs)
+
+        return await self.scheduler.submit(probe, stage, priority, send, self.bucket)
+
+
+class ProbeScheduler:
+    """
+    Limit the model requests in flight and order them by priority.
+
+    Requests go through `throttle`d models; the stage set in
+    `current_stage` decides their priority, so a probe that is running gets
+    the next free slot before a new refinement starts.
+
+    Args:
+        max_in_flight (int): Maximum number of model requests at once.
+        requests_per_second (float, optional): Rate limit per model endpoint.
+    """
+
+    def __init__(
+        self, max_in_flight: int = 8, requests_per_second: float | None = None
+    ):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.in_flight = 0
+        self.timings: list[StageTiming] = []
+        self.buckets: dict[str, TokenBucket] = {}
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def throttle(self, model: Model) -> Model:
+        """Wrap the model with the slots and its endpoint's token bucket."""
+        bucket = None
+        if self.requests_per_second is not None:
+            key = endpoint_key(model)
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket(self.requests_per_second)
+            bucket = self.buckets[key]
+        return ThrottledModel(model, self, bucket)
+
+    async def _acquire(self, priority: int):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The slot may have been handed over right before cancellation.
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                # Hand the slot over without decrementing in_flight.
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def submit(
+        self,
+        probe: str,
+        stage: str,
+        priority: int,
+        fn,
+        bucket: TokenBucket | None = None,
+    ):
+        """
+        Await a token of `bucket`, then a free slot, then run `fn()` and
+        record its timings.
+
+        Requests waiting on the rate limit hold no slot, so they never
+        keep a higher priority request from running.
+        """
+        limited = time.monotonic()
+        if bucket is not None:
+            await bucket.acquire()
+        queued = time.monotonic()
+        await self._acquire(priority)
+        started = time.monotonic()
+        try:
+            return await fn()
+        finally:
+            self._release()
+            self.timings.append(
+                StageTiming(
+                    probe,
+                    stage,
+                    started - queued,
+                    time.monotonic() - started,
+                    queued - limited,
+                )
+            )
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """
+        Total rate limit wait, queue wait and execution time of each probe's
+        requests, in seconds.
+        """
+        summary = defaultdict(
+            lambda: {"rate_wait": 0.0, "queue_wait": 0.0, "execution": 0.0}
+        )
+        for timing in self.timings:
+            summary[timing.probe]["rate_wait"] += timing.rate_wait
+            summary[timing.probe]["queue_wait"] += timing.queue_wait
+            summary[timing.probe]["execution"] += timing.execution
+        return dict(summary)
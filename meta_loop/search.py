@@ -0,0 +1,51 @@
+import math
+from collections import defaultdict
+
+
+class ProbePrunedError(Exception):
+    """Raised inside a probe that successive halving decided to stop."""
+
+
+class SuccessiveHalving:
+    """
+    Asynchronous successive halving over probes.
+
+    Every probe reports its partial score when it passes a rung (a number of
+    tool cycles). Once enough probes have reached a rung, a probe that lands
+    outside the top `keep` fraction of the scores seen there is stopped, so
+    the budget goes to the promising candidates.
+
+    Args:
+        rungs (tuple[int, ...]): Tool-cycle counts at which probes are compared (default: (3, 6)).
+        keep (float): Fraction of probes kept at each rung (default: 0.5).
+        min_reports (int): Scores needed at a rung before anything is cut (default: 2).
+    """
+
+    def __init__(
+        self, rungs: tuple[int, ...] = (3, 6), keep: float = 0.5, min_reports: int = 2
+    ):
+        if not 0 < keep <= 1:
+            raise ValueError("keep must be between 0 and 1.")
+        self.rungs = tuple(sorted(rungs))
+        self.keep = keep
+        self.min_reports = min_reports
+        self.scores: dict[int, list[float]] = defaultdict(list)
+        self.passed: dict[str, int] = defaultdict(int)
+        self.pruned: set[str] = set()
+
+    def report(self, probe: str, cycles: int, score: float) -> bool:
+        """Record a partial score; return False if the probe should stop."""
+        while self.passed[probe] < len(self.rungs):
+            rung = self.rungs[self.passed[probe]]
+            if cycles < rung:
+                break
+            self.passed[probe] += 1
+            scores = self.scores[rung]
+            scores.append(score)
+            if len(scores) < self.min_reports:
+                continue
+            kept = max(1, math.ceil(len(scores) * self.keep))
+            if score < sorted(scores, reverse=True)[kept - 1]:
+                self.pruned.add(probe)
+                return False
+        return True
@@ -0,0 +1,139 @@
+import bisect
+import json
+
+from meta_loop.ast_parser import iter_records
+
+FORMAT_VERSION = 1
+
+
+class Symbol:
+    """One definition found by the project scanner."""
+
+    __slots__ = (
+        "qualname",
+        "kind",
+        "signature",
+        "path",
+        "lineno",
+        "end_lineno",
+        "is_async",
+        "decorators",
+        "parent",
+    )
+
+    def __init__(
+        self,
+        qualname: str,
+        kind: str,
+        signature: str,
+        path: str,
+        lineno: int,
+        end_lineno: int,
+        is_async: bool = False,
+        decorators: tuple[str, ...] = (),
+        parent: str | None = None,
+    ):
+        self.qualname = qualname
+        self.kind = kind
+        self.signature = signature
+        self.path = path
+        self.lineno = lineno
+        self.end_lineno = end_lineno
+        self.is_async = is_async
+        self.decorators = tuple(decorators)
+        self.parent = parent
+
+    @property
+    def name(self) -> str:
+        return self.qualname.rpartition(".")[2]
+
+    def __eq__(self, other):
+        if not isinstance(other, Symbol):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __repr__(self):
+        return f"Symbol({self.kind} {self.qualname} [{self.path}:{self.lineno}])"
+
+
+class SymbolTable:
+    """
+    Symbol table with O(1) lookup by qualified or short name and prefix search.
+
+    Args:
+        symbols (Iterable[Symbol]): Symbols to index.
+    """
+
+    def __init__(self, symbols):
+        self.symbols: list[Symbol] = list(symbols)
+        self._by_name: dict[str, list[int]] = {}
+        for i, symbol in enumerate(self.symbols):
+            self._by_name.setdefault(symbol.qualname, []).append(i)
+            if symbol.name != symbol.qualname:
+                self._by_name.setdefault(symbol.name, []).append(i)
+        self._qualnames = sorted({symbol.qualname for symbol in self.symbols})
+
+    @classmethod
+    def from_project(cls, repo_path: str, workers: int | None = None):
+        """Scan a project with the cached ast_parser scanner."""
+        # Records are (kind, signature, qualname, lineno, end_lineno, ...)
+        return cls(
+            Symbol(record[2], record[0], record[1], path, *record[3:])
+            for path, record in iter_records(repo_path, workers)
+        )
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def lookup(self, name: str) -> list[Symbol]:
+        """Symbols whose qualified name or short name is `name`."""
+        return [self.symbols[i] for i in self._by_name.get(name, ())]
+
+    def prefix(self, prefix: str) -> list[Symbol]:
+        """Symbols whose qualified name starts with `prefix`, in name order."""
+        found = []
+        i = bisect.bisect_left(self._qualnames, prefix)
+        while i < len(self._qualnames) and self._qualnames[i].startswith(prefix):
+            found.extend(
+                self.symbols[j]
+                for j in self._by_name[self._qualnames[i]]
+                if self.symbols[j].qualname == self._qualnames[i]
+            )
+            i += 1
+        return found
+
+    def to_dict(self) -> dict:
+        """Columnar layout with every path stored once."""
+        paths: dict[str, int] = {}
+        columns = {field: [] for field in Symbol.__slots__}
+        for symbol in self.symbols:
+            for field in Symbol.__slots__:
+                value = getattr(symbol, field)
+                if field == "path":
+                    value = paths.setdefault(value, len(paths))
+                elif field == "decorators":
+                    value = list(value)
+                columns[field].append(value)
+        return {"version": FORMAT_VERSION, "paths": list(paths), "columns": columns}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SymbolTable":
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported symbol table version {data.get('version')}")
+        paths = data["paths"]
+        # A copy: the caller's dict keeps its path indices
+        columns = dict(data["columns"])
+        columns["path"] = [paths[i] for i in columns["path"]]
+        return cls(
+            Symbol(**dict(zip(Symbol.__slots__, values)))
+            for values in zip(*(columns[field] for field in Symbol.__slots__))
+        )
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "SymbolTable":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
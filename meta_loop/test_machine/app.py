@@ -1,46 +1,263 @@
+import asyncio
+import json
 import os
-import subprocess
-import tempfile
-from collections import defaultdict
-from uuid import uuid4
 
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from meta_loop.result_cache import default_result_cache
+from meta_loop.test_machine.jobs import Job, JobQueue, QueueFullError
+from meta_loop.test_machine.store import (
+    STORE_DIR,
+    BlobStore,
+    WorkspaceRegistry,
+    safe_join,
+)
 
 app = FastAPI()
 
-agent_to_files = defaultdict(str)
+blobs = BlobStore(os.path.join(STORE_DIR, "blobs"))
+workspaces = WorkspaceRegistry(blobs, os.path.join(STORE_DIR, "workspaces"))
+jobs = JobQueue()
+
+
+class HashesRequest(BaseModel):
+    hashes: list[str]
+
+
+class WorkspaceRequest(BaseModel):
+    files: dict[str, str]
+
+
+class BatchRequest(BaseModel):
+    agent_ids: list[str]
+    no_cache: bool = False
+
+
+def resolve(agent_id: str, filename: str | None = None) -> str | None:
+    """Path of a workspace, or of a file in it; None if there is no such thing."""
+    directory = workspaces.get(agent_id)
+    if directory is None:
+        return None
+    try:
+        path = directory if filename is None else safe_join(directory, filename)
+    except ValueError:
+        return None
+    return path if os.path.exists(path) else None
+
+
+def missing_blobs_error(missing: list[str]) -> HTTPException:
+    """Tells the client which blobs to upload before it retries."""
+    return HTTPException(
+        status_code=409, detail={"error": "Missing blobs", "missing": missing}
+    )
+
+
+def create_workspace(files: dict[str, str]) -> dict:
+    try:
+        agent_id, locations = workspaces.create(files)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    except FileNotFoundError:
+        # A blob was pruned after the client checked for it
+        raise missing_blobs_error(blobs.missing(list(files.values()))) from None
+    info = [
+        {"filename": filename, "location": locations[filename], "hash": digest}
+        for filename, digest in files.items()
+    ]
+    return {"agent_id": agent_id, "info": info}
 
 
 @app.post("/upload/")
 async def upload_code(files: list[UploadFile] = File(...)):
-    agent_id = f"agent_{uuid4()}"
-    temp_dir = tempfile.mkdtemp(prefix=f"agent_{agent_id}_")
-    file_infos = []
+    hashes = {}
     for file in files:
-        file_location = os.path.join(temp_dir, file.filename)
-        with open(file_location, "wb") as f:
-            f.write(await file.read())
-        file_infos.append({"filename": file.filename, "location": file_location})
-    agent_to_files[agent_id] = temp_dir
-    return {"agent_id": agent_id, "info": file_infos}
+        hashes[file.filename] = await asyncio.to_thread(blobs.put, await file.read())
+    return await asyncio.to_thread(create_workspace, hashes)
+
+
+@app.post("/blobs/missing/")
+async def missing_blobs(request: HashesRequest):
+    """Which of the given hashes the store does not have yet."""
+    try:
+        return {"missing": blobs.missing(request.hashes)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+
+
+@app.post("/blobs/")
+async def upload_blobs(files: list[UploadFile] = File(...)):
+    hashes = [await asyncio.to_thread(blobs.put, await file.read()) for file in files]
+    return {"hashes": hashes}
+
+
+@app.post("/workspaces/")
+async def create_workspace_from_hashes(request: WorkspaceRequest):
+    """Create a workspace from {filename: hash} of blobs already uploaded."""
+    try:
+        missing = blobs.missing(list(request.files.values()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    if missing:
+        raise missing_blobs_error(missing)
+    return await asyncio.to_thread(create_workspace, request.files)
+
+
+def submit(kind: str, target: str, agent_id: str, listener=None) -> Job:
+    try:
+        job = jobs.submit(kind, target, listener)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        ) from None
+    # Keep the workspace from being evicted while the job runs
+    workspaces.pin(agent_id)
+    job.future.add_done_callback(lambda _: workspaces.unpin(agent_id))
+    return job
+
+
+async def run(kind: str, target: str, agent_id: str) -> dict:
+    job = submit(kind, target, agent_id)
+    await asyncio.wrap_future(job.future)
+    if job.error is not None:
+        return {"error": job.error}
+    return {"stdout": job.stdout, "stderr": job.stderr, "returncode": job.returncode}
+
+
+async def run_tests_cached(directory: str, agent_id: str, no_cache: bool) -> dict:
+    """
+    Run an agent's tests, answering from the result memo while none of its
+    files changed; `no_cache` runs them anyway and refreshes the memo.
+    """
+    results = default_result_cache()
+    key = await asyncio.to_thread(results.key, directory)
+    if not no_cache:
+        cached = await asyncio.to_thread(results.get, key)
+        if cached is not None:
+            return {**cached, "cached": True}
+    outcome = await run("pytest", directory, agent_id)
+    if "returncode" in outcome:
+        await asyncio.to_thread(
+            results.set,
+            key,
+            outcome["returncode"],
+            outcome["stdout"],
+            outcome["stderr"],
+        )
+    return {**outcome, "cached": False}
 
 
 @app.post("/execute/")
 async def execute_code(agent_id: str, filename: str):
-    directory = agent_to_files[agent_id]
-    file_location = os.path.join(directory, filename)
-    if os.path.exists(file_location):
-        result = subprocess.run(
-            ["python", file_location], capture_output=True, text=True
-        )
-        return {"stdout": result.stdout, "stderr": result.stderr}
+    file_location = resolve(agent_id, filename)
+    if file_location is not None:
+        return await run("python", file_location, agent_id)
     return {"error": "File not found"}
 
 
 @app.post("/test/")
-async def run_tests(agent_id: str):
-    directory = agent_to_files[agent_id]
-    if os.path.exists(directory):
-        result = subprocess.run(["pytest", directory], capture_output=True, text=True)
-        return {"stdout": result.stdout, "stderr": result.stderr}
+async def run_tests(agent_id: str, no_cache: bool = False):
+    directory = resolve(agent_id)
+    if directory is not None:
+        return await run_tests_cached(directory, agent_id, no_cache)
     return {"error": "Test directory not found"}
+
+
+@app.post("/upload-and-test/")
+async def upload_and_test(files: list[UploadFile] = File(...), no_cache: bool = False):
+    """Upload an agent's files and run its tests in one round-trip."""
+    workspace = await upload_code(files)
+    agent_id = workspace["agent_id"]
+    outcome = await run_tests_cached(resolve(agent_id), agent_id, no_cache)
+    return {**workspace, **outcome}
+
+
+@app.post("/batch/test/")
+async def run_tests_batch(request: BatchRequest):
+    """Run the tests of many agents concurrently and return all results."""
+
+    async def one(agent_id: str) -> dict:
+        directory = resolve(agent_id)
+        if directory is None:
+            return {"error": "Test directory not found"}
+        try:
+            return await run_tests_cached(directory, agent_id, request.no_cache)
+        except HTTPException as e:
+            return {"error": e.detail, "retry_after": int(e.headers["Retry-After"])}
+
+    results = await asyncio.gather(*(one(agent_id) for agent_id in request.agent_ids))
+    return {"results": dict(zip(request.agent_ids, results))}
+
+
+@app.post("/jobs/execute/", status_code=202)
+async def submit_execute(agent_id: str, filename: str):
+    file_location = resolve(agent_id, filename)
+    if file_location is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return submit("python", file_location, agent_id).to_dict()
+
+
+@app.post("/jobs/test/", status_code=202)
+async def submit_tests(agent_id: str):
+    directory = resolve(agent_id)
+    if directory is None:
+        raise HTTPException(status_code=404, detail="Test directory not found")
+    return submit("pytest", directory, agent_id).to_dict()
+
+
+def ndjson(event: tuple) -> str:
+    name, value = event
+    if name in ("stdout", "stderr"):
+        line = {"stream": name, "data": value}
+    elif name == "exit":
+        line = {"event": "exit", "returncode": value}
+    elif name == "truncated":
+        line = {"event": "truncated", "limit": value}
+    else:
+        line = {"event": "error", "error": value}
+    return json.dumps(line) + "\n"
+
+
+def stream(kind: str, target: str, agent_id: str) -> StreamingResponse:
+    """Queue a job and stream its output as NDJSON while it runs."""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    submit(
+        kind,
+        target,
+        agent_id,
+        lambda e: loop.call_soon_threadsafe(events.put_nowait, e),
+    )
+
+    async def lines():
+        while (event := await events.get()) is not None:
+            yield ndjson(event)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/stream/execute/")
+async def stream_execute(agent_id: str, filename: str):
+    file_location = resolve(agent_id, filename)
+    if file_location is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return stream("python", file_location, agent_id)
+
+
+@app.post("/stream/test/")
+async def stream_tests(agent_id: str):
+    directory = resolve(agent_id)
+    if directory is None:
+        raise HTTPException(status_code=404, detail="Test directory not found")
+    return stream("pytest", directory, agent_id)
+
+
+@app.get("/jobs/{job_id}")
+async def poll_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -0,0 +1,221 @@
+import codecs
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+from meta_loop.test_machine.workers import WARM_WORKERS, stream_job
+
+# Jobs running at once
+MAX_CONCURRENT_JOBS = int(
+    os.environ.get("META_LOOP_MAX_CONCURRENT_JOBS", max(WARM_WORKERS, 1))
+)
+# Jobs waiting for a slot before submissions are refused
+MAX_QUEUED_JOBS = int(os.environ.get("META_LOOP_MAX_QUEUED_JOBS", 64))
+# Seconds a job may run before it is killed; 0 lets jobs run forever
+JOB_TIMEOUT = float(os.environ.get("META_LOOP_JOB_TIMEOUT", 600)) or None
+# Finished jobs kept for polling
+MAX_FINISHED_JOBS = 1000
+# Bytes of stdout and stderr kept per job; the rest is dropped
+MAX_OUTPUT_BYTES = int(os.environ.get("META_LOOP_MAX_OUTPUT_BYTES", 1024**2))
+TRUNCATION_MARKER = "\n[output truncated after {limit} bytes]\n"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    """
+    One queued run. Output is decoded as it arrives and kept up to
+    `max_output` bytes across both streams; each stream that lost output
+    ends with TRUNCATION_MARKER. `listener` receives every event from the
+    worker thread.
+    """
+
+    kind: str
+    target: str
+    job_id: str = field(default_factory=lambda: f"job_{uuid4()}")
+    status: str = "queued"
+    returncode: int | None = None
+    error: str | None = None
+    truncated: bool = False
+    max_output: int = MAX_OUTPUT_BYTES
+    listener: Callable[[tuple | None], None] | None = field(default=None, repr=False)
+    submitted: float = field(default_factory=time.monotonic)
+    started: float | None = None
+    finished: float | None = None
+    future: Future | None = field(default=None, repr=False)
+    output_bytes: int = 0
+    _clipped: set[str] = field(default_factory=set, repr=False)
+    _text: dict[str, list[str]] = field(
+        default_factory=lambda: {"stdout": [], "stderr": []}, repr=False
+    )
+    _decoders: dict = field(
+        default_factory=lambda: {
+            name: codecs.getincrementaldecoder("utf-8")("replace")
+            for name in ("stdout", "stderr")
+        },
+        repr=False,
+    )
+
+    @property
+    def stdout(self) -> str | None:
+        return self._output("stdout")
+
+    @property
+    def stderr(self) -> str | None:
+        return self._output("stderr")
+
+    def _output(self, name: str) -> str | None:
+        if self.started is None:
+            return None
+        text = "".join(self._text[name])
+        if name in self._clipped:
+            text += TRUNCATION_MARKER.format(limit=self.max_output)
+        return text
+
+    def capture(self, name: str, data: bytes):
+        """Keep a chunk of output within the size cap and publish it."""
+        remaining = self.max_output - self.output_bytes
+        kept = data[: max(remaining, 0)]
+        if kept:
+            self.output_bytes += len(kept)
+            text = self._decoders[name].decode(kept)
+            self._text[name].append(text)
+            self.publish((name, text))
+        if len(kept) < len(data):
+            self._clipped.add(name)
+            if not self.truncated:
+                self.truncated = True
+                self.publish(("truncated", self.max_output))
+
+    def publish(self, event: tuple | None):
+        if self.listener is None:
+            return
+        try:
+            self.listener(event)
+        except Exception:
+            # The consumer went away; the job still runs to completion
+            self.listener = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stdout": self.stdout,
+            "stderr": self.stderr,
+            "returncode": self.returncode,
+            "error": self.error,
+            "truncated": self.truncated,
+        }
+
+
+class JobQueue:
+    """
+    Runs `python`/`pytest` jobs in the background, `max_concurrent` at a time.
+
+    At most `max_queued` jobs wait for a slot; further submissions raise
+    `QueueFullError` with an estimate of when to retry.
+
+    Args:
+        max_concurrent (int): Jobs running at once (default: MAX_CONCURRENT_JOBS).
+        max_queued (int): Jobs waiting for a slot (default: MAX_QUEUED_JOBS).
+        timeout (float, optional): Seconds allowed per job (default: JOB_TIMEOUT).
+        max_output (int): Bytes of stdout and stderr kept per job (default: MAX_OUTPUT_BYTES).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_JOBS,
+        max_queued: int = MAX_QUEUED_JOBS,
+        timeout: float | None = JOB_TIMEOUT,
+        max_output: int = MAX_OUTPUT_BYTES,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_output = max_output
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self._active = 0
+        self._average_duration = 1.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_concurrent, "job")
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely free."""
+        waiting = max(self._active - self.max_concurrent + 1, 1)
+        return max(1, math.ceil(waiting * self._average_duration / self.max_concurrent))
+
+    def submit(
+        self,
+        kind: str,
+        target: str,
+        listener: Callable[[tuple | None], None] | None = None,
+    ) -> Job:
+        """
+        Queue a job. With `listener`, every output chunk is passed to it as
+        ("stdout" | "stderr", text), followed by ("truncated", limit) if the
+        output cap is hit, ("exit", returncode) or ("error", message), and
+        finally None.
+        """
+        job = Job(kind, target, max_output=self.max_output, listener=listener)
+        with self._lock:
+            if self._active >= self.max_concurrent + self.max_queued:
+                raise QueueFullError(self.retry_after())
+            self._active += 1
+            self.jobs[job.job_id] = job
+            self._forget_finished()
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def _run(self, job: Job) -> Job:
+        job.status = "running"
+        job.started = time.monotonic()
+        try:
+            for name, data in stream_job(job.kind, job.target, self.timeout):
+                if name == "exit":
+                    job.returncode = data
+                    job.publish(("exit", data))
+                else:
+                    job.capture(name, data)
+            job.status = "done"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+            job.publish(("error", job.error))
+        finally:
+            job.publish(None)
+            job.finished = time.monotonic()
+            with self._lock:
+                self._active -= 1
+                duration = job.finished - job.started
+                self._average_duration = 0.8 * self._average_duration + 0.2 * duration
+        return job
+
+    def _forget_finished(self):
+        finished = len(self.jobs) - self._active
+        if finished <= MAX_FINISHED_JOBS:
+            return
+        for job_id in list(self.jobs):
+            if finished <= MAX_FINISHED_JOBS:
+                break
+            if self.jobs[job_id].finished is not None:
+                del self.jobs[job_id]
+                finished -= 1
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,215 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+# Where blobs and workspaces live; both must be on one filesystem for reflinks
+STORE_DIR = os.environ.get(
+    "META_LOOP_STORE_DIR", os.path.join(tempfile.gettempdir(), "meta_loop_store")
+)
+# Workspaces kept before the least recently used ones are removed
+MAX_WORKSPACES = int(os.environ.get("META_LOOP_MAX_WORKSPACES", 256))
+# Seconds after its last use that a workspace expires
+WORKSPACE_TTL = float(os.environ.get("META_LOOP_WORKSPACE_TTL", 3600))
+# Seconds after its last write or materialization that a blob is pruned
+BLOB_TTL = float(os.environ.get("META_LOOP_BLOB_TTL", 86400))
+# Linux ioctl cloning a file's extents (copy-on-write on btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def blob_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """
+    Content-addressed files: `<root>/<hash[:2]>/<hash>`, written once.
+
+    Blobs are materialized into workspaces as reflinks where the filesystem
+    supports them, else as copies. Either way a workspace file is its own
+    inode, so a job writing to or chmodding it never alters the blob.
+
+    Args:
+        root (str): Directory of the blobs.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Invalid blob hash {digest!r}")
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def missing(self, digests: list[str]) -> list[str]:
+        return [d for d in dict.fromkeys(digests) if not self.has(d)]
+
+    def put(self, data: bytes) -> str:
+        """Store `data` unless an identical blob exists; return its hash."""
+        digest = blob_hash(data)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, path)
+        return digest
+
+    def materialize(self, digest: str, dest: str):
+        """Make `dest` a writable file with the blob's content, sharing extents if possible."""
+        src = self.path(digest)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            try:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            except OSError:
+                shutil.copyfileobj(s, d)
+        # Marks the blob as used for `prune`
+        os.utime(src)
+
+    def prune(self, max_age: float) -> int:
+        """Remove blobs neither written nor materialized for `max_age` seconds."""
+        removed = 0
+        cutoff = time.time() - max_age
+        for root, _, files in os.walk(self.root):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+def safe_join(directory: str, filename: str) -> str:
+    """Join a client-supplied relative path, refusing anything outside `directory`."""
+    path = os.path.normpath(os.path.join(directory, filename))
+    if os.path.isabs(filename) or not path.startswith(os.path.join(directory, "")):
+        raise ValueError(f"Invalid filename {filename!r}")
+    return path
+
+
+@dataclass
+class Workspace:
+    path: str
+    last_used: float = field(default_factory=time.monotonic)
+    pins: int = 0
+
+
+class WorkspaceRegistry:
+    """
+    Agent workspaces built from blobs, with LRU and TTL eviction.
+
+    Workspaces are removed once more than `max_workspaces` exist or when
+    unused for `ttl` seconds, unless a running job pins them.
+
+    Args:
+        store (BlobStore): Source of the files.
+        root (str): Directory of the workspaces.
+        max_workspaces (int): Workspaces kept (default: MAX_WORKSPACES).
+        ttl (float): Seconds a workspace is kept after its last use (default: WORKSPACE_TTL).
+        blob_ttl (float, optional): Seconds a blob is kept after its last use;
+            `evict` prunes the store at most every `blob_ttl / 2` seconds.
+            None keeps every blob (default: BLOB_TTL).
+    """
+
+    def __init__(
+        self,
+        store: BlobStore,
+        root: str,
+        max_workspaces: int = MAX_WORKSPACES,
+        ttl: float = WORKSPACE_TTL,
+        blob_ttl: float | None = BLOB_TTL,
+    ):
+        self.store = store
+        self.root = root
+        self.max_workspaces = max_workspaces
+        self.ttl = ttl
+        self.blob_ttl = blob_ttl
+        self.workspaces: OrderedDict[str, Workspace] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned = time.monotonic()
+        os.makedirs(root, exist_ok=True)
+
+    def create(self, files: dict[str, str]) -> tuple[str, dict[str, str]]:
+        """
+        Build a workspace from {filename: blob hash}.
+
+        Returns the agent id and the location of every file.
+        """
+        agent_id = f"agent_{uuid4()}"
+        path = tempfile.mkdtemp(prefix=f"{agent_id}_", dir=self.root)
+        try:
+            locations = {}
+            for filename, digest in files.items():
+                locations[filename] = safe_join(path, filename)
+                self.store.materialize(digest, locations[filename])
+        except BaseException:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        with self._lock:
+            self.workspaces[agent_id] = Workspace(path)
+        self.evict()
+        return agent_id, locations
+
+    def get(self, agent_id: str) -> str | None:
+        """Path of a workspace, marking it as used."""
+        with self._lock:
+            workspace = self.workspaces.get(agent_id)
+            if workspace is None:
+                return None
+            workspace.last_used = time.monotonic()
+            self.workspaces.move_to_end(agent_id)
+            return workspace.path
+
+    def pin(self, agent_id: str):
+        with self._lock:
+            if agent_id in self.workspaces:
+                self.workspaces[agent_id].pins += 1
+
+    def unpin(self, agent_id: str):
+        with self._lock:
+            if agent_id in self.workspaces:
+                self.workspaces[agent_id].pins -= 1
+
+    def evict(self):
+        """Remove expired and excess workspaces, and blobs unused for `blob_ttl`."""
+        now = time.monotonic()
+        victims = []
+        with self._lock:
+            # Walking the store is slow, so it is pruned only now and then
+            prune = (
+                self.blob_ttl is not None and now - self._pruned >= self.blob_ttl / 2
+            )
+            if prune:
+                self._pruned = now
+            excess = len(self.workspaces) - self.max_workspaces
+            # Least recently used first, so the scan stops at the first keeper
+            for agent_id, workspace in self.workspaces.items():
+                expired = now - workspace.last_used > self.ttl
+                if not (expired or excess > 0):
+                    break
+                if not workspace.pins:
+                    victims.append(agent_id)
+                    excess -= 1
+            paths = [self.workspaces.pop(agent_id).path for agent_id in victims]
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+        if prune:
+            # Workspace files are copies, so no workspace needs its blobs
+            self.store.prune(self.blob_ttl)
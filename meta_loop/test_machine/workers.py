@@ -0,0 +1,385 @@
+import atexit
+import gc
+import importlib
+import os
+import queue
+import runpy
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections.abc import Iterator
+from importlib.metadata import entry_points
+from multiprocessing.connection import Connection
+
+# Warm worker processes; 0 starts a fresh interpreter per job instead
+WARM_WORKERS = int(
+    os.environ.get("META_LOOP_WARM_WORKERS", min(4, os.cpu_count() or 1))
+)
+# Modules imported once per worker, before any job
+PRELOAD = ("pytest", "json", "asyncio", "unittest")
+# A worker is replaced after this many jobs
+MAX_JOBS = 200
+# Bytes read from a job's stdout or stderr at a time
+CHUNK_SIZE = 64 * 1024
+# Lets `python -m meta_loop.test_machine.workers` import the package
+_PACKAGE_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+def _preload(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    if "pytest" in sys.modules:
+        # Plugins are what makes pytest slow to start
+        for entry in entry_points(group="pytest11"):
+            try:
+                entry.load()
+            except Exception:
+                pass
+        _warm_pytest()
+    # Every job's gc passes skip the preloaded objects, which also keeps
+    # their pages shared with the forked children
+    gc.freeze()
+
+
+def _warm_pytest():
+    """Run pytest once over an empty directory, loading what it imports lazily."""
+    import pytest
+
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        with tempfile.TemporaryDirectory() as empty:
+            pytest.main(["-q", empty])
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+def _exec_job(kind: str, target: str, timeout: float | None) -> int:
+    """Run one job in the forked child and return its exit code."""
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    if kind == "pytest":
+        import pytest
+
+        return int(pytest.main([target]))
+    sys.argv = [target]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(target)))
+    try:
+        runpy.run_path(target, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def _pump(
+    fds: dict[int, str], timeout: float | None = None
+) -> Iterator[tuple[str, bytes]]:
+    """Yield (stream name, chunk) from pipes as data arrives, until all are closed."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with selectors.DefaultSelector() as selector:
+        for fd, name in fds.items():
+            selector.register(fd, selectors.EVENT_READ, name)
+        while selector.get_map():
+            wait = None if deadline is None else deadline - time.monotonic()
+            if wait is not None and wait <= 0:
+                raise subprocess.TimeoutExpired(list(fds.values()), timeout)
+            for key, _ in selector.select(wait):
+                data = os.read(key.fd, CHUNK_SIZE)
+                if data:
+                    yield key.data, data
+                else:
+                    selector.unregister(key.fd)
+
+
+def _fork_job(job: tuple, conn: Connection) -> int:
+    """
+    Run a job in a fork of this warm process and return its exit code.
+
+    Its stdout and stderr are sent over `conn` as ("stdout" | "stderr",
+    chunk) messages while it runs.
+    """
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        code = 70
+        try:
+            # The code under test must not write into the job protocol
+            conn.close()
+            signal.signal(signal.SIGALRM, signal.SIG_DFL)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(out_w, 1)
+            os.dup2(err_w, 2)
+            for fd in (devnull, out_r, out_w, err_r, err_w):
+                os.close(fd)
+            code = _exec_job(*job)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    os.close(out_w)
+    os.close(err_w)
+    try:
+        for message in _pump({out_r: "stdout", err_r: "stderr"}):
+            conn.send(message)
+    finally:
+        os.close(out_r)
+        os.close(err_r)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+def _collect(args: list[str], events: Iterator[tuple]) -> subprocess.CompletedProcess:
+    output = {"stdout": bytearray(), "stderr": bytearray()}
+    returncode = None
+    for name, data in events:
+        if name == "exit":
+            returncode = data
+        else:
+            output[name] += data
+    return subprocess.CompletedProcess(
+        args,
+        returncode,
+        output["stdout"].decode("utf-8", "replace"),
+        output["stderr"].decode("utf-8", "replace"),
+    )
+
+
+def _worker_main(conn, preload):
+    _preload(preload)
+    conn.send("ready")
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        code = _fork_job(job, conn)
+        conn.send(("exit", code))
+
+
+class Worker:
+    """One warm interpreter serving jobs over a pipe."""
+
+    def __init__(self, preload=PRELOAD):
+        parent_sock, child_sock = socket.socketpair()
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [_PACKAGE_ROOT, env.get("PYTHONPATH")])
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", __spec__.name, str(child_sock.fileno())]
+            + list(preload),
+            pass_fds=(child_sock.fileno(),),
+            stdin=subprocess.DEVNULL,
+            env=env,
+        )
+        child_sock.close()
+        self.conn = Connection(parent_sock.detach())
+        self.jobs = 0
+        self.busy = False
+        self.ready = False
+        # Of the running job, for `drain`
+        self._job: tuple | None = None
+        self._timeout: float | None = None
+        self._deadline: float | None = None
+
+    def stream(self, job: tuple, timeout: float | None = None) -> Iterator[tuple]:
+        """Send a job and yield its output chunks, then ("exit", returncode)."""
+        if not self.ready:
+            # Sent once the preload is done
+            self.conn.recv()
+            self.ready = True
+        self.conn.send(job)
+        self.busy = True
+        self._job = job
+        self._timeout = timeout
+        # The child enforces the timeout; this only guards a stuck worker
+        self._deadline = None if timeout is None else time.monotonic() + timeout + 5
+        while True:
+            message = self._receive()
+            yield message
+            if message[0] == "exit":
+                return
+
+    def drain(self):
+        """Discard the rest of the running job's output, up to its exit."""
+        while self.busy:
+            self._receive()
+
+    def _receive(self) -> tuple:
+        """The running job's next message; its exit also frees the worker."""
+        deadline = self._deadline
+        wait = None if deadline is None else max(deadline - time.monotonic(), 0)
+        if not self.conn.poll(wait):
+            self.close()
+            raise subprocess.TimeoutExpired(self._job[1], self._timeout)
+        message = self.conn.recv()
+        if message[0] == "exit":
+            self.busy = False
+            self.jobs += 1
+            return message
+        return message
+
+    def worn_out(self, max_jobs: int) -> bool:
+        return self.jobs >= max_jobs
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+        try:
+            self.process.wait(1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class WorkerPool:
+    """
+    Pool of pre-imported interpreters running `python <file>` and `pytest <dir>` jobs.
+
+    Each job runs in a fork of a warm worker, so it starts with pytest and
+    the PRELOAD modules already imported yet cannot affect later jobs. The
+    memory a job allocates goes with its fork, so a worker does not grow
+    with the jobs it serves; it is still replaced after `max_jobs` jobs.
+    Blocking: call it from a thread in async code.
+
+    Args:
+        size (int): Number of workers (default: WARM_WORKERS).
+        max_jobs (int): Jobs before a worker is replaced (default: MAX_JOBS).
+        preload (tuple[str, ...]): Modules to import in every worker (default: PRELOAD).
+    """
+
+    def __init__(
+        self,
+        size: int = WARM_WORKERS,
+        max_jobs: int = MAX_JOBS,
+        preload: tuple[str, ...] = PRELOAD,
+    ):
+        self.max_jobs = max_jobs
+        self.preload = preload
+        self._idle: queue.Queue[Worker] = queue.Queue()
+        for _ in range(size):
+            self._idle.put(Worker(preload))
+
+    def stream(
+        self, kind: str, target: str, timeout: float | None = None
+    ) -> Iterator[tuple]:
+        """
+        Run `python target` (kind "python") or `pytest target` (kind "pytest").
+
+        Yields ("stdout" | "stderr", chunk) as the job writes, then
+        ("exit", returncode). Closing the stream early discards the rest of
+        the output and returns once the job exits, so the worker is reused.
+        """
+        worker = self._idle.get()
+        events = worker.stream((kind, target, timeout), timeout)
+        try:
+            yield from events
+        finally:
+            if worker.busy:
+                # The consumer stopped early or the worker broke. Closing
+                # `events` ended it, so the rest is read off the connection
+                try:
+                    worker.drain()
+                except (EOFError, OSError, subprocess.TimeoutExpired):
+                    pass
+            if worker.busy or worker.worn_out(self.max_jobs):
+                worker.close()
+                worker = Worker(self.preload)
+            self._idle.put(worker)
+
+    def run(
+        self, kind: str, target: str, timeout: float | None = None
+    ) -> subprocess.CompletedProcess:
+        """Run a job and wait for its whole output."""
+        return _collect([kind, target], self.stream(kind, target, timeout))
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool: WorkerPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> WorkerPool:
+    """The process-wide pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def stream_job(kind: str, target: str, timeout: float | None = None) -> Iterator[tuple]:
+    """
+    Stream a job from the warm pool, or from a fresh interpreter if it is disabled.
+
+    Yields ("stdout" | "stderr", chunk) as the job writes, then
+    ("exit", returncode).
+    """
+    if WARM_WORKERS > 0:
+        yield from get_pool().stream(kind, target, timeout)
+        return
+    args = ["python", target] if kind == "python" else ["pytest", target]
+    proc = subprocess.Popen(
+        args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        yield from _pump(
+            {proc.stdout.fileno(): "stdout", proc.stderr.fileno(): "stderr"}, timeout
+        )
+        yield "exit", proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def run_job(
+    kind: str, target: str, timeout: float | None = None
+) -> subprocess.CompletedProcess:
+    """Run a job and wait for its whole output."""
+    args = ["python", target] if kind == "python" else ["pytest", target]
+    return _collect(args, stream_job(kind, target, timeout))
+
+
+if __name__ == "__main__":
+    _worker_main(Connection(int(sys.argv[1])), sys.argv[2:])
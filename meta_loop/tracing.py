@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+import numpy as np
+from pydantic_ai.models.wrapper import WrapperModel
+
+# Spans buffered before they are appended to the JSONL file
+FLUSH_EVERY = 64
+
+
+@dataclass
+class Span:
+    """One timed stage of a sweep; `attributes` holds sizes and token counts."""
+
+    stage: str
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: uuid4().hex[:16])
+    parent_id: str | None = None
+    start: float = field(default_factory=time.time)
+    duration: float | None = None
+    status: str = "ok"
+    attributes: dict = field(default_factory=dict)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        """OTLP-style record of the span."""
+        start = int(self.start * 1e9)
+        return {
+            "name": self.name,
+            "stage": self.stage,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": start,
+            "end_time_unix_nano": start + int((self.duration or 0) * 1e9),
+            "duration": self.duration,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _DisabledSpan:
+    """Stands in for a span while no tracer is active."""
+
+    def set(self, **attributes):
+        pass
+
+
+_DISABLED = _DisabledSpan()
+
+
+class Tracer:
+    """
+    Collects the spans of a sweep and summarizes their durations per stage.
+
+    Activate it with `with tracer:`; `trace()` then records spans from any
+    task or thread. Spans are appended to `path` as JSON lines, in batches
+    of `flush_every`.
+
+    Args:
+        path (str, optional): JSONL file the spans are written to.
+        flush_every (int): Spans buffered before a write (default: FLUSH_EVERY).
+    """
+
+    def __init__(self, path: str | None = None, flush_every: int = FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+        self._previous: list[Tracer | None] = []
+
+    def record(self, span: Span):
+        with self._lock:
+            self.durations[span.stage].append(span.duration)
+            if self.path is None:
+                return
+            self._buffer.append(json.dumps(span.to_dict(), default=str))
+            if len(self._buffer) >= self.flush_every:
+                self._write()
+
+    def flush(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        if self._buffer and self.path is not None:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Count, total, p50 and p95 of the span durations by stage, in seconds."""
+        return {
+            stage: {
+                "count": len(durations),
+                "total": float(np.sum(durations)),
+                "p50": float(np.percentile(durations, 50)),
+                "p95": float(np.percentile(durations, 95)),
+            }
+            for stage, durations in self.durations.items()
+        }
+
+    def format_summary(self) -> str:
+        lines = [f"{'stage':<10} {'count':>6} {'total s':>9} {'p50 s':>8} {'p95 s':>8}"]
+        for stage, s in sorted(self.summary().items()):
+            lines.append(
+                f"{stage:<10} {s['count']:>6} {s['total']:>9.2f} "
+                f"{s['p50']:>8.3f} {s['p95']:>8.3f}"
+            )
+        return "\n".join(lines)
+
+    def __enter__(self):
+        global _active
+        self._previous.append(_active)
+        _active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        _active = self._previous.pop()
+        self.flush()
+
+
+# Process-wide, so tools run in executor threads are traced too
+_active: Tracer | None = None
+_parent: ContextVar[Span | None] = ContextVar("meta_loop_span", default=None)
+
+
+def active_tracer() -> Tracer | None:
+    return _active
+
+
+@contextmanager
+def trace(stage: str, name: str | None = None, **attributes) -> Iterator[Span]:
+    """
+    Time a block as a span of `stage`, nested under the enclosing span.
+
+    Does nothing but yield a placeholder when no tracer is active. A block
+    that raises gives a span with status "error".
+    """
+    tracer = _active
+    if tracer is None:
+        yield _DISABLED
+        return
+    parent = _parent.get()
+    span = Span(
+        stage,
+        name or stage,
+        trace_id=parent.trace_id if parent else uuid4().hex,
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes,
+    )
+    token = _parent.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        span.duration = time.perf_counter() - start
+        _parent.reset(token)
+        tracer.record(span)
+
+
+class TracedModel(WrapperModel):
+    """Model recording every request as a "model" span with its token usage."""
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        with trace("model", self.wrapped.model_name, messages=len(messages)) as span:
+            response, usage = await self.wrapped.request(
+                messages, model_settings, model_request_parameters
+            )
+            span.set(
+                request_tokens=usage.request_tokens,
+                response_tokens=usage.response_tokens,
+                parts=len(response.parts),
+            )
+            return response, usage
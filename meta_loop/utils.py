@@ -1,16 +1,228 @@
+import asyncio
+import atexit
+import hashlib
+import inspect
+import os
+import random
+import reprlib
+import subprocess
+import sys
+import time
+import weakref
 from functools import wraps
 
 from loguru import logger
 
+from meta_loop.tracing import trace
+
+# Upper bound on child processes started by tools, per event loop
+MAX_PROCESSES = int(os.environ.get("META_LOOP_MAX_PROCESSES", os.cpu_count() or 4))
+_process_slots = weakref.WeakKeyDictionary()
+# Tool call logging: "sizes" logs argument and result sizes and durations,
+# "payloads" also their text cut to LOG_FIELD_CHARS, "off" only failures
+LOG_MODE = os.environ.get("META_LOOP_LOG_MODE", "sizes")
+LOG_FIELD_CHARS = int(os.environ.get("META_LOOP_LOG_FIELD_CHARS", 200))
+# Fraction of successful tool calls logged
+LOG_SAMPLE_RATE = float(os.environ.get("META_LOOP_LOG_SAMPLE_RATE", 1.0))
+_log_handler: int | None = None
+# Directories that do not change what the code in a tree does
+IGNORED_DIRS = {"__pycache__", ".pytest_cache", ".git"}
+
+
+class _Truncating(reprlib.Repr):
+    """`repr` cut to `max_chars` per string and per field."""
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.maxstring = self.maxother = self.maxlong = max_chars
+
+
+def _describe(value, payloads: bool) -> str:
+    """Type and size of a logged value, plus its truncated repr in "payloads" mode."""
+    kind = type(value).__name__
+    if isinstance(value, (str, bytes, list, tuple, dict, set)):
+        kind = f"{kind}[{len(value)}]"
+    if not payloads:
+        return kind
+    return f"{kind} {_Truncating(LOG_FIELD_CHARS).repr(value)}"
+
+
+def _format_call(name: str, args, kwargs, outcome, duration: float) -> str:
+    payloads = LOG_MODE == "payloads"
+    params = [_describe(value, payloads) for value in args]
+    params += [f"{key}={_describe(value, payloads)}" for key, value in kwargs.items()]
+    if isinstance(outcome, BaseException):
+        result = f"raised {type(outcome).__name__}: {outcome}"
+    else:
+        result = f"-> {_describe(outcome, payloads)}"
+    return f"{name}({', '.join(params)}) {result} in {duration:.3f}s"
+
+
+def _log_call(name: str, args, kwargs, outcome, start: float):
+    duration = time.perf_counter() - start
+    if isinstance(outcome, BaseException):
+        level = "WARNING"
+    elif LOG_MODE == "off" or random.random() >= LOG_SAMPLE_RATE:
+        return
+    else:
+        level = "INFO"
+    # Formatted only if a handler takes the level
+    logger.opt(lazy=True).log(
+        level, "{}", lambda: _format_call(name, args, kwargs, outcome, duration)
+    )
+
+
+def _size(value) -> int:
+    return len(value) if isinstance(value, (str, bytes, list, tuple, dict)) else 0
+
+
+def _payload_sizes(args, kwargs) -> int:
+    return sum(map(_size, args)) + sum(map(_size, kwargs.values()))
+
 
 def verbose_decorator(func):
+    """
+    Log each call of a tool with the size of its arguments and result and
+    its duration, or their truncated text with LOG_MODE "payloads".
+
+    Successful calls are sampled at LOG_SAMPLE_RATE; failures are always
+    logged, as warnings. Every call is also a "tool" span of the active
+    tracer. Sync functions become coroutine functions running in a thread,
+    as pydantic-ai would run them, but in the caller's context so their
+    spans nest under the probe's.
+    """
+    name = func.__name__
+    if inspect.iscoroutinefunction(func):
+        call = func
+    else:
+
+        async def call(*args, **kwargs):
+            # Unlike run_in_executor, to_thread copies the context
+            return await asyncio.to_thread(func, *args, **kwargs)
+
     @wraps(func)
-    def wrapper(*args, **kwargs):
-        # run_context = args[0]
-        pargs = args[1:]
-        logger.info(f"Running {func.__name__} with args {pargs} and kwargs {kwargs}")
-        r = func(*args, **kwargs)
-        logger.info(f"Result: {r}")
+    async def wrapper(*args, **kwargs):
+        # args[0] is the run context
+        start = time.perf_counter()
+        with trace("tool", name) as span:
+            try:
+                r = await call(*args, **kwargs)
+            except Exception as e:
+                _log_call(name, args[1:], kwargs, e, start)
+                raise
+            span.set(args_size=_payload_sizes(args[1:], kwargs), size=_size(r))
+        _log_call(name, args[1:], kwargs, r, start)
         return r
 
     return wrapper
+
+
+def enqueue_logging(
+    sink=sys.stderr, level: str = "INFO", replace_default: bool = False
+) -> int:
+    """
+    Add a loguru handler writing from a background thread, so tool logs
+    never block the event loop. Idempotent.
+
+    Args:
+        sink: Where the logs go (default: stderr).
+        level (str): Lowest level written (default: "INFO").
+        replace_default (bool): Also remove loguru's default handler, which
+            belongs to the application; only set it when it is yours.
+
+    Returns:
+        int: The loguru handler id.
+    """
+    global _log_handler
+    if replace_default:
+        try:
+            logger.remove(0)
+        except ValueError:
+            # Already removed
+            pass
+    if _log_handler is None:
+        _log_handler = logger.add(sink, level=level, enqueue=True)
+        # Flush what is queued on exit
+        atexit.register(logger.complete)
+    return _log_handler
+
+
+def process_slots() -> asyncio.Semaphore:
+    """Semaphore bounding concurrent child processes on the running loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _process_slots:
+        _process_slots[loop] = asyncio.Semaphore(MAX_PROCESSES)
+    return _process_slots[loop]
+
+
+async def run_command(
+    args: list[str],
+    timeout: float | None = None,
+    check: bool = False,
+    cwd: str | None = None,
+    input: bytes | None = None,
+) -> subprocess.CompletedProcess:
+    """
+    Async counterpart of `subprocess.run(args, capture_output=True)`.
+
+    Raises `subprocess.TimeoutExpired` (after killing the child) when it runs
+    longer than `timeout`, and `subprocess.CalledProcessError` when `check` is
+    set and it exits non-zero.
+    """
+    async with process_slots():
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=None if input is None else subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(input), timeout)
+        except BaseException as e:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            if isinstance(e, asyncio.TimeoutError):
+                raise subprocess.TimeoutExpired(args, timeout) from None
+            raise
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+
+
+def hash_tree(path: str) -> str:
+    """sha256 over the relative paths and contents of the files under `path`."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+        for file in sorted(files):
+            if file.endswith(".pyc"):
+                continue
+            file_path = os.path.join(root, file)
+            digest.update(os.path.relpath(file_path, path).encode())
+            digest.update(b"\0")
+            with open(file_path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def read_file(file_path: str) -> str:
+    with open(file_path) as f:
+        return f.read()
+
+
+def list_markdown_files(directory_path: str) -> list[str]:
+    """Paths of the .md and .mdx files in a directory; empty if it does not exist."""
+    if not os.path.exists(directory_path):
+        return []
+    return [
+        os.path.join(directory_path, f)
+        for f in os.listdir(directory_path)
+        if f.endswith(".md") or f.endswith(".mdx")
+    ]
+
+
+def write_file(file_path: str, content: str):
+    with open(file_path, "w") as f:
+        f.write(content)
@@ -0,0 +1,15 @@
+import pytest
+
+from meta_loop import kb_index
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    Run in an empty directory, so the builder's tools never write
+    `kb.index.json` or sandboxes into the repository.
+    """
+    monkeypatch.chdir(tmp_path)
+    # The index of "kb" is cached per process, whatever the directory
+    monkeypatch.setattr(kb_index, "_knowledge_bases", {})
+    return tmp_path
@@ -0,0 +1,308 @@
+import asyncio
+
+import pytest
+from pydantic_ai.messages import (
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from meta_loop.agent import (
+    CACHED_NOTE,
+    ProbeDeps,
+    ProbeResult,
+    agent_tree,
+    builder,
+    evaluate_probes,
+    iter_probes,
+)
+from meta_loop.instructions import ENTRY_POINT_PROMPT
+from meta_loop.result_cache import ResultCache
+from meta_loop.scheduler import ProbeScheduler
+from meta_loop.search import SuccessiveHalving
+
+# Probes call the real kb tools
+pytestmark = pytest.mark.usefixtures("workdir")
+
+
+def fake_model(messages, info: AgentInfo) -> ModelResponse:
+    if info.result_tools:
+        return ModelResponse(
+            parts=[
+                ToolCallPart(
+                    info.result_tools[0].name,
+                    {"original": "calculator", "optimized": "Build a calculator"},
+                )
+            ]
+        )
+    if len(messages) == 1:
+        return ModelResponse(parts=[ToolCallPart("get_frameworks", {})])
+    return ModelResponse(parts=[TextPart("Agent created successfully.")])
+
+
+async def test_iter_probes_streams_every_probe():
+    scheduler = ProbeScheduler(max_in_flight=2)
+    probes = [
+        probe
+        async for probe in iter_probes(
+            "calculator",
+            probe_count=3,
+            scheduler=scheduler,
+            llm=FunctionModel(fake_model),
+        )
+    ]
+
+    assert sorted(probe.revision for probe in probes) == ["v0", "v1", "v2"]
+    for probe in probes:
+        assert probe.error is None
+        assert probe.prompt.optimized == "Build a calculator"
+        score, cycles, coverage, tool_usage = probe.metrics
+        assert tool_usage == {"get_frameworks": 1}
+    assert set(scheduler.report()) == {"v0", "v1", "v2"}
+
+
+async def test_iter_probes_cleans_up_after_an_early_exit():
+    probes = iter_probes(
+        "calculator",
+        probe_count=4,
+        scheduler=ProbeScheduler(max_in_flight=1),
+        llm=FunctionModel(fake_model),
+    )
+    async for _ in probes:
+        break
+    await probes.aclose()
+    # The remaining probes were cancelled and awaited, not left pending
+    assert asyncio.all_tasks() == {asyncio.current_task()}
+
+
+async def test_iter_probes_with_search():
+    search = SuccessiveHalving(rungs=(1,), keep=1.0)
+    probes = [
+        probe
+        async for probe in iter_probes(
+            "calculator", probe_count=2, llm=FunctionModel(fake_model), search=search
+        )
+    ]
+
+    assert [probe.pruned for probe in probes] == [False, False]
+    assert all(probe.error is None for probe in probes)
+    assert len(search.scores[1]) == 2
+
+
+async def test_search_rungs_above_the_score_cap():
+    def busy_model(messages, info: AgentInfo) -> ModelResponse:
+        if info.result_tools:
+            return fake_model(messages, info)
+        # One message per tool call and one per return: 13 calls
+        if len(messages) < 27:
+            return ModelResponse(parts=[ToolCallPart("get_frameworks", {})])
+        return ModelResponse(parts=[TextPart("done")])
+
+    search = SuccessiveHalving(rungs=(12,), keep=1.0)
+    probes = [
+        probe
+        async for probe in iter_probes(
+            "calculator", probe_count=2, llm=FunctionModel(busy_model), search=search
+        )
+    ]
+
+    assert all(probe.error is None for probe in probes)
+    assert len(search.scores[12]) == 2
+    assert dict(search.passed) == {"v0": 1, "v1": 1}
+
+
+async def test_builder_is_shared_and_uses_deps(tmp_path):
+    assert builder() is builder()
+
+    def workdir_model(messages, info: AgentInfo) -> ModelResponse:
+        if len(messages) == 1:
+            return ModelResponse(
+                parts=[ToolCallPart("create_agent_workdir", {"agent_name": "calc"})]
+            )
+        return ModelResponse(parts=[TextPart("done")])
+
+    for revision in ("v0", "v1"):
+        await builder().run(
+            "Create a calculator agent",
+            model=FunctionModel(workdir_model),
+            deps=ProbeDeps(revision, sandbox_dir=str(tmp_path)),
+        )
+    assert (tmp_path / "v0" / "calc").is_dir()
+    assert (tmp_path / "v1" / "calc").is_dir()
+
+
+async def test_builder_has_no_system_prompt_without_entry_point():
+    system_prompts = []
+
+    def recording_model(messages, info: AgentInfo) -> ModelResponse:
+        system_prompts.extend(
+            part
+            for message in messages
+            for part in message.parts
+            if isinstance(part, SystemPromptPart)
+        )
+        return fake_model(messages, info)
+
+    await builder().run(
+        "Create a calculator agent",
+        model=FunctionModel(recording_model),
+        deps=ProbeDeps("v0"),
+    )
+    assert system_prompts == []
+    assert builder(entry_point=True) is not builder()
+
+
+async def test_evaluate_probes(tmp_path):
+    agent_dir = tmp_path / "v0" / "calc"
+    agent_dir.mkdir(parents=True)
+    seen = []
+
+    async def runner(candidate, value):
+        seen.append(candidate.path)
+        return value * 2
+
+    probes = [
+        ProbeResult("v0", agent_dir=str(agent_dir)),
+        ProbeResult("v1"),
+        ProbeResult("v2", error=OSError(), agent_dir=str(agent_dir)),
+    ]
+    reports = await evaluate_probes(probes, [(1, 2), (2, 5)], runner)
+
+    assert list(reports) == ["v0"]
+    assert reports["v0"].accuracy == 0.5
+    assert seen == [str(agent_dir)] * 2
+
+
+async def test_probe_agents_are_evaluated_with_main_py(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    main_py = "import sys\nprint(2 * int(sys.stdin.read()))\n"
+    system_prompts = []
+
+    def agent_model(messages, info: AgentInfo) -> ModelResponse:
+        if info.result_tools:
+            return fake_model(messages, info)
+        if len(messages) == 1:
+            system_prompts.extend(
+                part.content
+                for part in messages[0].parts
+                if isinstance(part, SystemPromptPart)
+            )
+            return ModelResponse(
+                parts=[ToolCallPart("create_agent_workdir", {"agent_name": "calc"})]
+            )
+        if len(messages) == 3:
+            agent_dir = messages[-1].parts[0].content
+            return ModelResponse(
+                parts=[
+                    ToolCallPart(
+                        "write_code",
+                        {"file_path": f"{agent_dir}/main.py", "code": main_py},
+                    )
+                ]
+            )
+        return ModelResponse(parts=[TextPart("done")])
+
+    probes = [
+        probe
+        async for probe in iter_probes(
+            "calculator",
+            probe_count=1,
+            llm=FunctionModel(agent_model),
+            entry_point=True,
+        )
+    ]
+    assert system_prompts == [ENTRY_POINT_PROMPT]
+    assert probes[0].agent_dir == "sandbox/v0/calc"
+
+    reports = await evaluate_probes(probes, [(1, 2), (4, 8), (5, 11)])
+    assert [r.output for r in reports["v0"].results] == [2, 8, 10]
+    assert reports["v0"].accuracy == 2 / 3
+
+
+async def test_pytest_results_are_memoized(tmp_path):
+    test_file = tmp_path / "v0" / "calc" / "test_calc.py"
+    test_file.parent.mkdir(parents=True)
+    test_file.write_text("def test_add():\n    assert 1 + 1 == 2\n")
+    calls = [{"file_path": str(test_file)}] * 2 + [
+        {"file_path": str(test_file), "no_cache": True}
+    ]
+
+    def pytest_model(messages, info: AgentInfo) -> ModelResponse:
+        step = (len(messages) - 1) // 2
+        if step < len(calls):
+            return ModelResponse(
+                parts=[ToolCallPart("run_pytest_test_code", calls[step])]
+            )
+        return ModelResponse(parts=[TextPart("done")])
+
+    result = await builder().run(
+        "Test the calculator",
+        model=FunctionModel(pytest_model),
+        deps=ProbeDeps(
+            "v0", sandbox_dir=str(tmp_path), results=ResultCache(str(tmp_path / "memo"))
+        ),
+    )
+    outputs = [
+        part.content
+        for message in result.all_messages()
+        for part in message.parts
+        if part.part_kind == "tool-return"
+    ]
+
+    assert len(outputs) == 3
+    assert all("1 passed" in output for output in outputs)
+    assert [output.startswith(CACHED_NOTE) for output in outputs] == [
+        False,
+        True,
+        False,
+    ]
+
+
+async def test_pytest_memo_covers_the_whole_agent_tree(tmp_path):
+    agent_dir = tmp_path / "v0" / "calc"
+    (agent_dir / "tests").mkdir(parents=True)
+    (agent_dir / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+    test_file = agent_dir / "tests" / "test_calc.py"
+    test_file.write_text(
+        "import pathlib, sys\n"
+        "sys.path.insert(0, str(pathlib.Path(__file__).parents[1]))\n"
+        "from calc import add\n"
+        "def test_add():\n    assert add(1, 1) == 2\n"
+    )
+    outside = tmp_path / "elsewhere" / "test_other.py"
+    outside.parent.mkdir()
+    outside.write_text("def test_ok():\n    pass\n")
+    calls = [str(test_file), str(test_file), str(outside), str(outside)]
+
+    def pytest_model(messages, info: AgentInfo) -> ModelResponse:
+        step = (len(messages) - 1) // 2
+        if step == 1:
+            # A module outside the test's own directory changes
+            (agent_dir / "calc.py").write_text("def add(a, b):\n    return a - b\n")
+        if step < len(calls):
+            return ModelResponse(
+                parts=[ToolCallPart("run_pytest_test_code", {"file_path": calls[step]})]
+            )
+        return ModelResponse(parts=[TextPart("done")])
+
+    deps = ProbeDeps(
+        "v0", sandbox_dir=str(tmp_path), results=ResultCache(str(tmp_path / "memo"))
+    )
+    result = await builder().run(
+        "Test the calculator", model=FunctionModel(pytest_model), deps=deps
+    )
+    outputs = [
+        part.content
+        for message in result.all_messages()
+        for part in message.parts
+        if part.part_kind == "tool-return"
+    ]
+
+    assert "1 passed" in outputs[0]
+    assert outputs[1].startswith("Pytest failed")
+    # Tests outside the probe's sandbox are never answered from the memo
+    assert not any(output.startswith(CACHED_NOTE) for output in outputs)
+    assert agent_tree(deps, test_file) == str(agent_dir)
+    assert agent_tree(deps, outside) is None
@@ -1,3 +1,5 @@
+from uuid import uuid4
+
 from fastapi.testclient import TestClient
 
 from meta_loop.test_machine.app import app
@@ -44,3 +46,17 @@ def test_run_tests():
     data = response.json()
     assert "stdout" in data
     assert "1 passed" in data["stdout"]
+
+
+def test_run_tests_is_memoized():
+    # Unique content, so no earlier run is in the memo
+    source = f"def test_example():\n    assert True  # {uuid4()}\n".encode()
+    results = []
+    for no_cache in (False, False, True):
+        files = {"files": ("test_file.py", source)}
+        agent_id = client.post("/upload/", files=files).json()["agent_id"]
+        response = client.post(f"/test/?agent_id={agent_id}&no_cache={no_cache}")
+        results.append(response.json())
+
+    assert [r["cached"] for r in results] == [False, True, False]
+    assert all("1 passed" in r["stdout"] for r in results)
@@ -1,5 +1,8 @@
 import ast
 
+from loguru import logger
+
+from meta_loop import ast_parser
 from meta_loop.ast_parser import (
     extract_definitions_with_signatures,
     get_class_signature,
@@ -59,3 +62,80 @@ class Bar:
 
     # Check extracted class signatures
     assert classes == [("Bar", str(file_path))]
+
+
+def test_nested_functions_are_skipped(tmp_path):
+    code = """
+def outer():
+    def inner():
+        pass
+
+async def fetch(url: str) -> bytes:
+    pass
+
+class Foo(Base):
+    def method(self, x):
+        pass
+"""
+    file_path = tmp_path / "nested.py"
+    file_path.write_text(code)
+
+    functions, classes = extract_definitions_with_signatures(str(tmp_path))
+
+    assert [sig for sig, _ in functions] == [
+        "outer()",
+        "fetch(url: str) -> bytes",
+        "method(self, x)",
+    ]
+    assert classes == [("Foo(Base)", str(file_path))]
+
+
+def test_only_changed_files_are_reparsed(tmp_path, monkeypatch):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.py").write_text(f"def {name}(): pass\n")
+    extract_definitions_with_signatures(str(tmp_path))
+
+    parsed = []
+    original = ast_parser.parse_file
+    monkeypatch.setattr(
+        ast_parser, "parse_file", lambda path: parsed.append(path) or original(path)
+    )
+    (tmp_path / "b.py").write_text("def b(x): pass\n")
+
+    functions, _ = extract_definitions_with_signatures(str(tmp_path))
+
+    assert parsed == [str(tmp_path / "b.py")]
+    assert sorted(sig for sig, _ in functions) == ["a()", "b(x)"]
+
+
+def test_parallel_scan_streams_definitions(tmp_path, monkeypatch):
+    monkeypatch.setattr(ast_parser, "PARALLEL_THRESHOLD", 2)
+    for i in range(4):
+        (tmp_path / f"mod{i}.py").write_text(f"class C{i}: pass\n")
+    (tmp_path / "broken.py").write_text("def (:\n")
+
+    definitions = ast_parser.iter_definitions(str(tmp_path), workers=2)
+    first = next(definitions)
+    rest = list(definitions)
+
+    assert sorted(sig for _, sig, _ in [first, *rest]) == ["C0", "C1", "C2", "C3"]
+
+
+def test_positional_only_defaults():
+    node = ast.parse("def foo(a, b=1, /, c=2): pass").body[0]
+    assert get_function_signature(node) == "foo(a, b = 1, c = 2)"
+
+
+def test_syntax_error_is_reported_once(tmp_path):
+    (tmp_path / "broken.py").write_text("def (:\n")
+    messages = []
+    handler = logger.add(messages.append, format="{level} {message}")
+    try:
+        for _ in range(3):
+            extract_definitions_with_signatures(str(tmp_path))
+    finally:
+        logger.remove(handler)
+
+    assert messages == [
+        f"WARNING Skipping {tmp_path / 'broken.py'} due to syntax error\n"
+    ]
@@ -0,0 +1,60 @@
+from benchmarks.fake_model import scripted_model
+from benchmarks.run import (
+    bench_ast_parser,
+    bench_evaluate,
+    bench_sweep,
+    bench_test_machine,
+    compare,
+)
+from meta_loop.agent import ProbeDeps, builder
+
+
+async def test_scripted_model_follows_the_script(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result = await builder().run(
+        "Build a calculator agent",
+        model=scripted_model(latency=0.01),
+        deps=ProbeDeps("v0"),
+    )
+    calls = [
+        part.tool_name
+        for message in result.all_messages()
+        for part in message.parts
+        if part.part_kind == "tool-call"
+    ]
+    assert calls == [
+        "get_frameworks",
+        "create_agent_workdir",
+        "write_code",
+        "write_test_code",
+    ]
+    assert (tmp_path / "calculator.py").exists()
+    assert (tmp_path / "sandbox" / "v0" / "calculator").is_dir()
+
+
+async def test_benchmarks_run():
+    sweep = await bench_sweep(2, latency=0)
+    assert sweep["failed"] == 0
+    assert sweep["probes_per_sec"] > 0
+
+    evaluate = await bench_evaluate(iterations=10, turns=1)
+    assert evaluate["messages"] == 10
+
+    ast = bench_ast_parser("meta_loop")
+    assert ast["files"] > 10
+
+    machine = await bench_test_machine(requests=2, concurrency=2)
+    assert set(machine) == {
+        "blobs_missing_rps",
+        "execute_rps",
+        "test_rps",
+        "cached_test_rps",
+    }
+
+
+def test_compare():
+    before = {"results": {"sweep": {"16": {"seconds": 2.0}}, "evaluate": {}}}
+    after = {"results": {"sweep": {"16": {"seconds": 1.0}}, "ast_parser": {}}}
+    table = compare(before, after).splitlines()
+    assert len(table) == 2
+    assert table[1].split() == ["sweep.16.seconds", "2.000", "1.000", "0.50"]
@@ -0,0 +1,75 @@
+import asyncio
+import os
+from uuid import uuid4
+
+import httpx
+
+from meta_loop.box_client import AsyncSandbox
+from meta_loop.test_machine.app import app, blobs, workspaces
+
+PASSING = b"def test_ok():\n    assert True\n"
+FAILING = b"def test_bad():\n    assert False\n"
+
+
+def sandbox() -> AsyncSandbox:
+    return AsyncSandbox("http://testserver", transport=httpx.ASGITransport(app=app))
+
+
+async def test_upload_execute_and_test():
+    async with sandbox() as box:
+        data = await box.upload_files({"main.py": b"print('hi')", "test_a.py": PASSING})
+        agent_id = data["agent_id"]
+        assert (await box.execute_code(agent_id, "main.py"))["stdout"] == "hi\n"
+        result = await box.run_tests(agent_id)
+        assert result["returncode"] == 0
+        assert "1 passed" in result["stdout"]
+
+
+async def test_upload_and_test():
+    async with sandbox() as box:
+        result = await box.upload_and_test({"test_a.py": PASSING, "test_b.py": FAILING})
+    assert result["agent_id"].startswith("agent_")
+    assert result["returncode"] == 1
+    assert "1 failed, 1 passed" in result["stdout"]
+
+
+async def test_batch_and_shared_client():
+    async with sandbox() as box:
+        # Probes share one client concurrently
+        uploads = await asyncio.gather(
+            box.sync_files({"test_a.py": PASSING + b"# " + uuid4().hex.encode()}),
+            box.sync_files({"test_b.py": FAILING}),
+        )
+        agent_ids = [upload["agent_id"] for upload in uploads]
+        results = await box.run_tests_batch([*agent_ids, "agent_unknown"])
+
+    assert [results[agent_id]["returncode"] for agent_id in agent_ids] == [0, 1]
+    assert results["agent_unknown"] == {"error": "Test directory not found"}
+
+
+async def test_stream_tests():
+    async with sandbox() as box:
+        agent_id = (await box.upload_files({"test_a.py": PASSING}))["agent_id"]
+        events = [event async for event in box.stream_tests(agent_id)]
+    assert events[-1] == {"event": "exit", "returncode": 0}
+    assert "1 passed" in "".join(event.get("data", "") for event in events)
+
+
+async def test_sync_files_uploads_a_pruned_blob_again(monkeypatch):
+    content = PASSING + b"# " + uuid4().hex.encode()
+    async with sandbox() as box:
+        await box.sync_files({"test_a.py": content})
+        create = workspaces.create
+        pruned = []
+
+        def create_after_prune(files):
+            # Pruned after the client was told the server has it
+            if not pruned:
+                pruned.extend(files.values())
+                os.remove(blobs.path(pruned[0]))
+            return create(files)
+
+        monkeypatch.setattr(workspaces, "create", create_after_prune)
+        agent_id = (await box.sync_files({"test_a.py": content}))["agent_id"]
+        assert (await box.run_tests(agent_id))["returncode"] == 0
+    assert blobs.has(pruned[0])
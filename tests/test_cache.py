@@ -0,0 +1,137 @@
+import asyncio
+import os
+import threading
+import time
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from meta_loop.cache import CachedModel, DiskCache, cache_scope
+
+
+def counting_model():
+    calls = []
+
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        calls.append(messages)
+        await asyncio.sleep(0.01)
+        return ModelResponse(parts=[TextPart(f"answer {len(calls)}")])
+
+    return FunctionModel(respond), calls
+
+
+def test_disk_cache_roundtrip(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    key = DiskCache.key("model", [{"content": "hi"}])
+    assert cache.get(key) is None
+    cache.set(key, b"value")
+    assert cache.get(key) == b"value"
+    assert DiskCache(str(tmp_path)).get(key) == b"value"
+
+
+def test_disk_cache_lru_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=150)
+    cache.set("a" * 64, b"x" * 40)
+    cache.set("b" * 64, b"x" * 40)
+    old = time.time() - 60
+    os.utime(cache._path("a" * 64), (old, old))
+    os.utime(cache._path("b" * 64), (old - 60, old - 60))
+    # A new process orders the entries by their mtimes
+    cache = DiskCache(str(tmp_path), max_bytes=150)
+    cache.set("c" * 64, b"x" * 40)
+    assert cache.get("b" * 64) is None
+    assert cache.get("a" * 64) is not None
+    assert cache.get("c" * 64) is not None
+
+
+def test_disk_cache_tracks_recency_in_memory(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=150)
+    cache.set("a" * 64, b"x" * 40)
+    cache.set("b" * 64, b"x" * 40)
+    assert cache.get("a" * 64) is not None
+    # Eviction no longer stats every entry
+    monkeypatch.setattr(os.path, "getmtime", None)
+    cache.set("c" * 64, b"x" * 40)
+    assert list(cache._sizes) == [cache._path("a" * 64), cache._path("c" * 64)]
+    assert not os.path.exists(cache._path("b" * 64))
+    assert cache._total == sum(cache._sizes.values())
+
+
+def test_disk_cache_hit_survives_a_concurrent_eviction(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+    cache.set("a" * 64, b"x" * 40)
+    utime = os.utime
+
+    def evict_then_touch(path, *args):
+        # Another thread's `set` evicts the entry between the read and the touch
+        other = DiskCache(str(tmp_path), max_bytes=100)
+        other.set("b" * 64, b"x" * 40)
+        utime(path, *args)
+
+    monkeypatch.setattr(os, "utime", evict_then_touch)
+    assert cache.get("a" * 64) == b"x" * 40
+    assert not os.path.exists(cache._path("a" * 64))
+
+
+def test_disk_cache_ttl(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=0)
+    cache.set("a" * 64, b"value")
+    time.sleep(0.01)
+    assert cache.get("a" * 64) is None
+
+
+async def test_cached_model_skips_repeated_requests(tmp_path):
+    model, calls = counting_model()
+    cached = CachedModel(model, DiskCache(str(tmp_path)))
+    agent = Agent(cached)
+
+    first = await agent.run("Refine prompt: calculator")
+    second = await agent.run("Refine prompt: calculator")
+    other = await agent.run("Refine prompt: weather")
+
+    assert first.data == second.data == "answer 1"
+    assert other.data == "answer 2"
+    assert len(calls) == 2
+
+
+async def test_cached_model_shares_concurrent_requests(tmp_path):
+    model, calls = counting_model()
+    agent = Agent(CachedModel(model, DiskCache(str(tmp_path))))
+
+    results = await asyncio.gather(*(agent.run("same") for _ in range(4)))
+
+    assert {result.data for result in results} == {"answer 1"}
+    assert len(calls) == 1
+
+
+async def test_cached_model_keeps_probes_apart(tmp_path):
+    model, calls = counting_model()
+    agent = Agent(CachedModel(model, DiskCache(str(tmp_path))))
+
+    async def probe(revision):
+        cache_scope.set(revision)
+        return (await agent.run("Refine prompt: calculator")).data
+
+    results = [await probe(revision) for revision in ("v0", "v1", "v0")]
+
+    assert results == ["answer 1", "answer 2", "answer 1"]
+    assert len(calls) == 2
+
+
+async def test_cached_model_keeps_disk_io_off_the_loop(tmp_path):
+    model, _ = counting_model()
+    cache = DiskCache(str(tmp_path))
+    threads = []
+    for name in ("get", "set"):
+        method = getattr(cache, name)
+
+        def record(*args, method=method):
+            threads.append(threading.current_thread())
+            return method(*args)
+
+        setattr(cache, name, record)
+
+    await Agent(CachedModel(model, cache)).run("hello")
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
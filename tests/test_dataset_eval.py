@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from meta_loop.cache import DiskCache
+from meta_loop.core import dataset
+from meta_loop.dataset_eval import (
+    Candidate,
+    command_runner,
+    default_score,
+    evaluate_dataset,
+)
+
+
+def make_candidate(tmp_path, name, code="print(0.5)"):
+    path = tmp_path / name
+    path.mkdir()
+    (path / "main.py").write_text(code)
+    return Candidate(name, str(path))
+
+
+def test_fingerprint(tmp_path):
+    candidate = make_candidate(tmp_path, "v0")
+    before = candidate.fingerprint()
+    (tmp_path / "v0" / "__pycache__").mkdir()
+    (tmp_path / "v0" / "__pycache__" / "main.cpython-311.pyc").write_bytes(b"x")
+    assert candidate.fingerprint() == before
+
+    (tmp_path / "v0" / "main.py").write_text("print(1)")
+    assert candidate.fingerprint() != before
+
+
+def test_default_score():
+    assert default_score("0.85", 0.9) == 1.0
+    assert default_score(0.5, 0.9) == 0.0
+    assert default_score("not a number", 0.9) == 0.0
+    assert default_score("positive", "positive") == 1.0
+
+
+async def test_accuracy_latency_and_bounded_workers(tmp_path):
+    candidates = [make_candidate(tmp_path, f"v{i}") for i in range(3)]
+    in_flight = peak = 0
+
+    async def runner(candidate, value):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if candidate.name == "v2":
+            raise RuntimeError("agent crashed")
+        return 0.9 if candidate.name == "v0" else 0.2
+
+    pairs = dataset(("great", 0.9), ("awful", 0.2), ("fine", 0.9), ("meh", 0.9))
+    reports = await evaluate_dataset(candidates, pairs, runner, max_workers=2)
+
+    assert peak == 2
+    assert reports["v0"].accuracy == 0.75
+    assert reports["v1"].accuracy == 0.25
+    assert reports["v2"].accuracy == 0.0
+    assert reports["v2"].results[0].error == "RuntimeError: agent crashed"
+    assert reports["v2"].p50 is None
+    assert 0.01 <= reports["v0"].p50 <= reports["v0"].p95
+
+
+async def test_only_new_pairs_run(tmp_path):
+    candidate = make_candidate(tmp_path, "v0")
+    cache = DiskCache(str(tmp_path / "cache"))
+    calls = []
+
+    async def runner(candidate, value):
+        calls.append(value)
+        return 0.5
+
+    pairs = dataset(("a", 0.5), ("b", 0.5))
+    await evaluate_dataset([candidate], pairs, runner, cache=cache)
+    reports = await evaluate_dataset(
+        [candidate], pairs + dataset(("c", 0.1)), runner, cache=cache
+    )
+
+    assert calls == ["a", "b", "c"]
+    assert [r.cached for r in reports["v0"].results] == [True, True, False]
+    assert reports["v0"].accuracy == pytest.approx(2 / 3)
+
+    # A changed agent is evaluated again
+    (tmp_path / "v0" / "main.py").write_text("print(0.1)")
+    await evaluate_dataset([candidate], pairs, runner, cache=cache)
+    assert calls == ["a", "b", "c", "a", "b"]
+
+
+async def test_command_runner(tmp_path):
+    candidate = make_candidate(
+        tmp_path, "v0", "import sys\nprint(0.9 if 'love' in sys.stdin.read() else 0.2)"
+    )
+    reports = await evaluate_dataset(
+        [candidate],
+        dataset(("Great product, love it!", 0.9), ("Terrible service.", 0.2)),
+        command_runner(),
+    )
+    assert [r.output for r in reports["v0"].results] == [0.9, 0.2]
+    assert reports["v0"].accuracy == 1.0
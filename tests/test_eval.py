@@ -1,5 +1,10 @@
+import random
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 from typing import Any
 
+import numpy as np
+import pytest
 from inline_snapshot import snapshot
 
 from meta_loop import eval
@@ -78,3 +83,113 @@ def test_repeated():
         make_result(given), max_tools=7
     )
     assert score == snapshot(5.32)
+
+
+def test_batch_matches_scalar():
+    rng = random.Random(0)
+    runs = []
+    for _ in range(2000):
+        cycles = rng.randint(1, 10)
+        max_tools = rng.randint(1, 11)
+        coverage = rng.randint(1, min(cycles, max_tools))
+        max_repeats = rng.randint(1, cycles - coverage + 1)
+        duration = rng.choice([None, 0.0, rng.uniform(0, 240)])
+        runs.append(
+            (
+                cycles,
+                coverage,
+                max_tools,
+                max_repeats,
+                rng.random(),
+                duration,
+                rng.choice([0.5, 1.0]),
+            )
+        )
+    cycles, coverage, max_tools, max_repeats, success, duration, quality = zip(*runs)
+
+    scores, breakdown = eval.heuristic_function_batch(
+        np.array(cycles),
+        np.array(coverage),
+        np.array(max_tools),
+        np.array(max_repeats),
+        np.array(success),
+        np.array([np.nan if d is None else d for d in duration]),
+        output_quality=np.array(quality),
+    )
+
+    expected = [
+        eval.heuristic_function(c, cov, mt, {"tool": r}, sr, d, output_quality=q)
+        for c, cov, mt, r, sr, d, q in runs
+    ]
+    assert scores.tolist() == expected
+    assert set(breakdown) == {
+        "cycle_score",
+        "coverage_score",
+        "repetition_penalty",
+        "success_score",
+        "time_score",
+        "quality_bonus",
+    }
+
+
+def test_batch_validation():
+    with pytest.raises(ValueError, match="Run 1: Number of cycles"):
+        eval.heuristic_function_batch(
+            np.array([3, 11]), np.array([1, 1]), 7, np.array([1, 1]), np.ones(2)
+        )
+
+
+def test_contains_error():
+    assert eval.contains_error("Traceback: ValueError")
+    assert not eval.contains_error("all good")
+    assert not eval.contains_error(None)
+    assert eval.contains_error(["a.md", {"status": "ERROR"}])
+    # A match straddling two scan chunks is still found
+    boundary = "x" * (eval.ERROR_SCAN_CHUNK - 2) + "ErRoR" + "y" * 100
+    assert eval.contains_error(boundary)
+    assert not eval.contains_error("x" * (3 * eval.ERROR_SCAN_CHUNK))
+
+
+def test_contains_error_walks_nested_content():
+    records = [{"name": f"doc{i}", "size": i, "ok": True} for i in range(1000)]
+    assert not eval.contains_error(records)
+    assert eval.contains_error(records + [{"log": ("Error", 3)}])
+    assert eval.contains_error({"stdout": "ok", "details": {"Error": None}})
+    assert not eval.contains_error({"stdout": "x" * 200_000, "code": 1})
+    assert eval.contains_error([SimpleNamespace(message="ERROR")])
+    # Nested objects read as their repr, like str() of the container shows them
+    assert eval.contains_error([ValueError("bad")])
+    assert eval.contains_error({"exc": KeyError("k")})
+    assert eval.contains_error((1, [OSError(2, "gone")]))
+    # Items are never joined into one another
+    assert not eval.contains_error(["err", "or"] * 100)
+
+
+def test_trace_summary():
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    call = SimpleNamespace(part_kind="tool-call", tool_name="write_code")
+    ok = SimpleNamespace(part_kind="tool-return", content="written", timestamp=start)
+    failed = SimpleNamespace(
+        part_kind="tool-return",
+        content="Error: no such file",
+        timestamp=start + timedelta(seconds=30),
+    )
+    summary = eval.TraceSummary()
+    summary.add_message(MockMessage([call, ok]))
+    summary.add_part(call)
+    summary.add_part(failed)
+
+    assert summary.tool_calls == 2
+    assert summary.tool_usage == {"write_code": 2}
+    assert summary.success_rate == 0.5
+    assert summary.duration == 30.0
+    assert summary.evaluate(max_tools=7) == eval.evaluate_run_result(
+        make_result([MockMessage([call, ok]), MockMessage([call, failed])])
+    )
+
+    breakdown = summary.breakdown("done successfully", max_tools=7)
+    assert breakdown["success_score"] == 1.25
+    assert breakdown["quality_bonus"] == 0.5
+    total = sum(breakdown.values()) - 2 * breakdown["repetition_penalty"]
+    assert round(total, 2) == summary.evaluate("done successfully", max_tools=7)[0]
+    assert eval.TraceSummary().breakdown() == {}
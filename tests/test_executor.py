@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+from meta_loop.executor import EvalError, EvalExecutor, io_bound
+from meta_loop.primitives import Trial
+
+
+def prompt_length(trial: Trial) -> int:
+    return len(trial.prompt)
+
+
+def worker_pid(item) -> int:
+    return os.getpid()
+
+
+def slow_or_fail(item):
+    if item == "slow":
+        time.sleep(10)
+    if item == "fail":
+        raise ValueError("bad output")
+    return item
+
+
+@io_bound
+def thread_name(item) -> str:
+    return threading.current_thread().name
+
+
+async def test_process_pool_in_batches():
+    with EvalExecutor(prompt_length, max_workers=2, batch_size=3) as executor:
+        assert not executor.io_bound
+        scores = await executor.map(Trial("x" * n) for n in range(7))
+    with EvalExecutor(worker_pid, max_workers=2, batch_size=3) as executor:
+        pids = await executor.map(range(6))
+    assert scores == list(range(7))
+    # A batch runs in a single worker
+    assert len(set(pids[:3])) == 1 and len(set(pids[3:])) == 1
+    assert os.getpid() not in pids
+
+
+async def test_per_call_timeout_and_errors():
+    with EvalExecutor(slow_or_fail, batch_size=3, timeout=0.2) as executor:
+        start = time.monotonic()
+        results = await executor.map(["ok", "slow", "fail"])
+    assert time.monotonic() - start < 5
+    assert results[0] == "ok"
+    assert isinstance(results[1], TimeoutError)
+    assert isinstance(results[2], EvalError)
+    assert str(results[2]) == "ValueError: bad output"
+
+
+async def test_threads_for_io_bound_and_unpicklable():
+    with EvalExecutor(thread_name) as executor:
+        assert executor.io_bound
+        names = await executor.map(range(3))
+    assert all(name != "MainThread" for name in names)
+
+    offset = 10
+    with EvalExecutor(lambda item: item + offset) as executor:
+        assert executor.io_bound
+        assert await executor.map([1, 2]) == [11, 12]
+
+
+async def test_thread_timeout():
+    @io_bound
+    def sleepy(item):
+        time.sleep(item)
+        return item
+
+    with EvalExecutor(sleepy, timeout=0.2) as executor:
+        results = await executor.map([0, 1])
+    assert results[0] == 0
+    assert isinstance(results[1], TimeoutError)
+
+
+async def test_queued_batches_do_not_time_out():
+    @io_bound
+    def sleepy(item):
+        time.sleep(0.3)
+        return item
+
+    # Three rounds of two calls: the last ones start 0.6s after submission
+    with EvalExecutor(sleepy, max_workers=2, timeout=0.5) as executor:
+        results = await executor.map(range(6))
+    assert results == list(range(6))
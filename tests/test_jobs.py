@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from meta_loop.test_machine import app as app_module
+from meta_loop.test_machine import jobs as jobs_module
+from meta_loop.test_machine.jobs import TRUNCATION_MARKER, JobQueue, QueueFullError
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Jobs block until the gate is set; returns (gate, running counter)."""
+    gate = threading.Event()
+    running = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fake_stream_job(kind, target, timeout=None):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        gate.wait(5)
+        with lock:
+            running["now"] -= 1
+        yield "stdout", f"ran {target}".encode()
+        yield "exit", 0
+
+    monkeypatch.setattr(jobs_module, "stream_job", fake_stream_job)
+    return gate, running
+
+
+def test_concurrency_cap_and_backpressure(gate):
+    gate, running = gate
+    queue = JobQueue(max_concurrent=2, max_queued=1)
+    submitted = [queue.submit("python", f"f{i}.py") for i in range(3)]
+    with pytest.raises(QueueFullError) as exc_info:
+        queue.submit("python", "f3.py")
+    assert exc_info.value.retry_after >= 1
+
+    gate.set()
+    for job in submitted:
+        job.future.result(5)
+    assert running["peak"] == 2
+    assert [job.status for job in submitted] == ["done"] * 3
+    assert submitted[2].stdout == "ran f2.py"
+    # Slots are free again
+    queue.submit("python", "f4.py").future.result(5)
+    queue.close()
+
+
+def test_failed_job(monkeypatch):
+    def broken(kind, target, timeout=None):
+        raise OSError("worker died")
+
+    monkeypatch.setattr(jobs_module, "stream_job", broken)
+    queue = JobQueue(max_concurrent=1)
+    job = queue.submit("pytest", "tests")
+    job.future.result(5)
+    assert job.to_dict()["status"] == "failed"
+    assert job.error == "OSError: worker died"
+    queue.close()
+
+
+def test_hung_job_is_killed_and_frees_its_slot(tmp_path):
+    assert JobQueue().timeout == jobs_module.JOB_TIMEOUT
+    hung = tmp_path / "hung.py"
+    hung.write_text("import time\ntime.sleep(60)")
+    queue = JobQueue(max_concurrent=1, max_queued=0, timeout=0.5)
+    job = queue.submit("python", str(hung))
+    with pytest.raises(QueueFullError):
+        queue.submit("python", str(hung))
+
+    job.future.result(10)
+    assert job.status == "failed" or job.returncode < 0
+    ok = tmp_path / "ok.py"
+    ok.write_text("print('ok')")
+    assert queue.submit("python", str(ok)).future.result(10).stdout == "ok\n"
+    queue.close()
+
+
+def test_submit_and_poll():
+    client = TestClient(app_module.app)
+    files = {"files": ("test_file.py", b"def test_example():\n    assert True")}
+    agent_id = client.post("/upload/", files=files).json()["agent_id"]
+
+    response = client.post(f"/jobs/test/?agent_id={agent_id}")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    deadline = time.monotonic() + 60
+    while (job := client.get(f"/jobs/{job_id}").json())["status"] in (
+        "queued",
+        "running",
+    ):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert job["status"] == "done"
+    assert job["returncode"] == 0
+    assert "1 passed" in job["stdout"]
+
+    assert client.get("/jobs/job_unknown").status_code == 404
+    response = client.post(f"/jobs/execute/?agent_id={agent_id}&filename=nope.py")
+    assert response.status_code == 404
+
+
+def test_queue_full_is_429(gate, monkeypatch):
+    gate, _ = gate
+    monkeypatch.setattr(app_module, "jobs", JobQueue(max_concurrent=1, max_queued=0))
+    client = TestClient(app_module.app)
+    files = {"files": ("main.py", b"print(1)")}
+    agent_id = client.post("/upload/", files=files).json()["agent_id"]
+
+    first = client.post(f"/jobs/execute/?agent_id={agent_id}&filename=main.py")
+    second = client.post(f"/execute/?agent_id={agent_id}&filename=main.py")
+    assert first.status_code == 202
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) >= 1
+    gate.set()
+    app_module.jobs.close()
+
+
+def test_output_cap(monkeypatch):
+    def chatty(kind, target, timeout=None):
+        for _ in range(5):
+            yield "stdout", b"0123456789"
+        yield "exit", 0
+
+    monkeypatch.setattr(jobs_module, "stream_job", chatty)
+    events = []
+    queue = JobQueue(max_concurrent=1, max_output=25)
+    job = queue.submit("python", "main.py", events.append)
+    job.future.result(5)
+    queue.close()
+
+    assert job.truncated
+    assert job.stdout == "0123456789" * 2 + "01234" + TRUNCATION_MARKER.format(limit=25)
+    assert events[-3:] == [("truncated", 25), ("exit", 0), None]
+    assert [e for e in events if e and e[0] == "stdout"][-1] == ("stdout", "01234")
+
+
+def test_output_cap_marks_the_stream_that_overflowed(monkeypatch):
+    def noisy(kind, target, timeout=None):
+        yield "stdout", b"ok\n"
+        for _ in range(5):
+            yield "stderr", b"warning\n"
+        yield "stdout", b"done\n"
+        yield "exit", 1
+
+    monkeypatch.setattr(jobs_module, "stream_job", noisy)
+    events = []
+    queue = JobQueue(max_concurrent=1, max_output=20)
+    job = queue.submit("python", "main.py", events.append)
+    job.future.result(5)
+    queue.close()
+
+    marker = TRUNCATION_MARKER.format(limit=20)
+    assert job.truncated
+    assert job.stderr == "warning\n" * 2 + "w" + marker
+    # stdout lost its last chunk once stderr used up the budget
+    assert job.stdout == "ok\n" + marker
+    assert events.count(("truncated", 20)) == 1
+
+
+def test_stream_endpoint():
+    client = TestClient(app_module.app)
+    files = [
+        ("files", ("test_a.py", b"def test_fail():\n    assert False\n")),
+        ("files", ("test_b.py", b"def test_ok():\n    assert True\n")),
+    ]
+    agent_id = client.post("/upload/", files=files).json()["agent_id"]
+
+    with client.stream("POST", f"/stream/test/?agent_id={agent_id}") as response:
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+
+    output = "".join(line.get("data", "") for line in lines)
+    assert "1 failed, 1 passed" in output
+    assert lines[-1] == {"event": "exit", "returncode": 1}
+    assert client.post("/stream/test/?agent_id=agent_unknown").status_code == 404
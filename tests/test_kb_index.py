@@ -0,0 +1,109 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from meta_loop import kb_index
+from meta_loop.kb_index import KnowledgeBase, chunk_markdown, format_chunks
+
+
+def make_kb(tmp_path):
+    root = tmp_path / "kb"
+    root.mkdir(exist_ok=True)
+    (root / "crewAI").mkdir()
+    (root / "pydantic-ai").mkdir()
+    (root / "crewAI" / "agents.mdx").write_text(
+        "---\ntitle: Agents\n---\n\n## Agent Attributes\nrole goal backstory\n\n"
+        "## Memory\nAgents keep short term memory.\n"
+    )
+    (root / "pydantic-ai" / "tools.md").write_text(
+        "# Function Tools\nRegister tools with the agent.tool decorator.\n\n"
+        "```python\n# not a heading\n@agent.tool\n```\n"
+    )
+    (root / "notes.txt").write_text("ignored")
+    return KnowledgeBase.from_directory(str(root))
+
+
+def test_chunk_markdown_ignores_code_fences():
+    data = b"intro\n# A\nx\n```\n# comment\n```\n## B\ny\n"
+    sections = chunk_markdown(data)
+    assert [heading for heading, _, _ in sections] == ["", "A", "B"]
+    _, start, end = sections[1]
+    assert data[start:end] == b"# A\nx\n```\n# comment\n```\n"
+
+
+def test_search_ranks_matching_section(tmp_path):
+    kb = make_kb(tmp_path)
+    assert kb.frameworks == ["crewAI", "pydantic-ai"]
+
+    chunks = kb.search("agent memory", k=1)
+    assert [(chunk.framework, chunk.heading) for chunk in chunks] == [
+        ("crewAI", "Memory")
+    ]
+
+    chunks = kb.search("tool decorator", framework="pydantic-ai")
+    assert [chunk.heading for chunk in chunks] == ["Function Tools"]
+    assert kb.search("tool decorator", framework="crewai") == []
+    assert kb.search("unknownterm") == []
+
+
+def test_format_chunks_truncates(tmp_path):
+    kb = make_kb(tmp_path)
+    text = format_chunks(kb.search("agent memory", k=1), max_chars=10)
+    assert text.startswith("### ")
+    assert text.endswith("[...truncated]")
+
+
+def test_manifest_rechunks_only_changed_files(tmp_path, monkeypatch):
+    make_kb(tmp_path)
+    root = tmp_path / "kb"
+    assert os.path.exists(str(root) + ".index.json")
+
+    indexed = []
+    original = kb_index.index_file
+    monkeypatch.setattr(
+        kb_index, "index_file", lambda data: indexed.append(data) or original(data)
+    )
+    kb = KnowledgeBase.from_directory(str(root))
+    assert indexed == []
+    assert kb.files("crewAI") == [str(root / "crewAI" / "agents.mdx")]
+
+    (root / "pydantic-ai" / "tools.md").write_text("# Result Validators\nvalidate\n")
+    kb = KnowledgeBase.from_directory(str(root))
+    assert len(indexed) == 1
+    assert [chunk.heading for chunk in kb.search("validate")] == ["Result Validators"]
+    assert kb.search("memory")[0].text.startswith("## Memory")
+
+
+def test_manifest_is_not_private(tmp_path):
+    make_kb(tmp_path)
+    mode = os.stat(kb_index.manifest_path(str(tmp_path / "kb"))).st_mode & 0o777
+    assert mode == 0o644
+
+
+def test_concurrent_loads_build_once(tmp_path, monkeypatch):
+    make_kb(tmp_path)
+    root = str(tmp_path / "kb")
+    builds = []
+    original = KnowledgeBase.from_directory.__func__
+
+    def slow_build(cls, root):
+        builds.append(root)
+        time.sleep(0.05)
+        return original(cls, root)
+
+    monkeypatch.setattr(KnowledgeBase, "from_directory", classmethod(slow_build))
+    monkeypatch.setattr(kb_index, "_knowledge_bases", {})
+    with ThreadPoolExecutor(16) as pool:
+        kbs = list(pool.map(kb_index.load_knowledge_base, [root] * 16))
+
+    assert builds == [root]
+    assert all(kb is kbs[0] for kb in kbs)
+
+
+def test_chunk_text_survives_edits(tmp_path):
+    kb = make_kb(tmp_path)
+    (chunk,) = kb.search("short term memory", k=1)
+    path = tmp_path / "kb" / "crewAI" / "agents.mdx"
+    path.write_text("## Intro\nA longer preamble than before.\n\n" + path.read_text())
+
+    assert chunk.text == "## Memory\nAgents keep short term memory.\n"
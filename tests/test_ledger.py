@@ -0,0 +1,227 @@
+import json
+import sqlite3
+import threading
+
+import pytest
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from meta_loop.agent import build_agent
+from meta_loop.ledger import Ledger
+from meta_loop.live import LiveEvaluator
+
+from .test_agent import fake_model
+
+MESSAGES = [
+    ModelRequest(parts=[UserPromptPart("Build a calculator")]),
+    ModelResponse(parts=[ToolCallPart("get_frameworks", {}, "call_0")]),
+    ModelRequest(parts=[ToolReturnPart("get_frameworks", "pydantic-ai", "call_0")]),
+]
+
+
+def count(path, table):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_probes_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    with Ledger(path, batch_size=2) as ledger:
+        sweep = ledger.start_sweep("calculator", {"probe_count": 3})
+        ledger.record_probe(sweep, "v0", "p0", (7.5, 3, 2, {"a": 2}), messages=MESSAGES)
+        assert count(path, "probes") == 0
+        ledger.record_probe(sweep, "v1", error=ValueError("boom"))
+        assert count(path, "probes") == 2
+        ledger.record_probe(sweep, "v2", error=ValueError("cut"), pruned=True)
+    assert count(path, "probes") == 3
+
+    with Ledger(path) as ledger:
+        rows = list(ledger.probes(sweep))
+        assert [r["status"] for r in rows] == ["ok", "failed", "pruned"]
+        assert rows[0]["score"] == 7.5
+        assert rows[0]["tool_usage"] == '{"a": 2}'
+        assert rows[1]["error"] == "ValueError: boom"
+        assert ledger.trace(sweep, "v0") == MESSAGES
+        assert ledger.trace(sweep, "v1") is None
+
+
+def test_update_probes(tmp_path):
+    with Ledger(str(tmp_path / "ledger.db")) as ledger:
+        sweep = ledger.start_sweep("calculator")
+        ledger.record_probe(sweep, "v0", metrics=(5.0, 1, 1, {}))
+        ledger.update_probes(
+            sweep, {"v0": {"queue_wait": 0.5, "eval_score": 0.9, "accuracy": 1.0}}
+        )
+        (row,) = ledger.probes(sweep)
+        assert (row["queue_wait"], row["eval_score"], row["accuracy"]) == (
+            0.5,
+            "0.9",
+            1.0,
+        )
+        with pytest.raises(ValueError):
+            ledger.update_probes(sweep, {"v0": {"score": 10}})
+
+
+def test_recording_a_revision_again_replaces_its_trace(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    with Ledger(path) as ledger:
+        sweep = ledger.start_sweep("calculator")
+        ledger.record_probe(sweep, "v0", metrics=(1.0, 1, 1, {}), messages=MESSAGES)
+        ledger.update_probes(sweep, {"v0": {"accuracy": 0.5}})
+        (first,) = ledger.probes(sweep)
+
+        ledger.record_probe(sweep, "v0", metrics=(2.0, 1, 1, {}), messages=MESSAGES[:1])
+        (second,) = ledger.probes(sweep)
+        assert second["id"] == first["id"]
+        assert (second["score"], second["accuracy"]) == (2.0, None)
+        assert ledger.trace(sweep, "v0") == MESSAGES[:1]
+        assert count(path, "traces") == 1
+
+        ledger.record_probe(sweep, "v0", error=ValueError("boom"))
+        assert ledger.trace(sweep, "v0") is None
+    assert count(path, "probes") == 1
+    assert count(path, "traces") == 0
+
+
+def test_reads_while_another_thread_writes(tmp_path):
+    with Ledger(str(tmp_path / "ledger.db"), batch_size=1) as ledger:
+        sweep = ledger.start_sweep("calculator")
+
+        def record():
+            for i in range(200):
+                ledger.record_probe(sweep, f"v{i}", messages=MESSAGES)
+
+        writer = threading.Thread(target=record)
+        writer.start()
+        while writer.is_alive():
+            rows = list(ledger.probes(sweep))
+            if rows:
+                assert ledger.trace(sweep, rows[-1]["revision"]) == MESSAGES
+        writer.join()
+        assert len(list(ledger.probes(sweep))) == 200
+
+
+BREAKDOWN = {
+    "cycle_score": 0.62,
+    "coverage_score": 0.21,
+    "repetition_penalty": 1.0,
+    "success_score": 2.5,
+    "time_score": 2.5,
+    "quality_bonus": 0.5,
+}
+
+
+def test_score_breakdown_is_queryable(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    with Ledger(path) as ledger:
+        sweep = ledger.start_sweep("calculator")
+        ledger.record_probe(sweep, "v0", metrics=(5.33, 2, 1, {}), breakdown=BREAKDOWN)
+        slow = dict(BREAKDOWN, time_score=0.5)
+        ledger.record_probe(sweep, "v1", metrics=(3.33, 2, 1, {}), breakdown=slow)
+        ledger.record_probe(sweep, "v2", error=ValueError("boom"))
+
+        averages = ledger.breakdown_averages("calculator")
+        assert averages["time_score"] == pytest.approx(1.5)
+        assert averages["success_score"] == 2.5
+        assert ledger.breakdown_averages("weather") == {}
+
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute(
+            "SELECT revision FROM probes "
+            "WHERE json_extract(breakdown, '$.time_score') < 1 ORDER BY revision"
+        ).fetchall()
+    assert rows == [("v1",)]
+
+
+def test_queries_across_sweeps(tmp_path):
+    with Ledger(str(tmp_path / "ledger.db")) as ledger:
+        for instruction, scores in (
+            ("calculator", [2.0, 8.5]),
+            ("calculator", [6.0]),
+            ("weather", [3.2, None]),
+        ):
+            sweep = ledger.start_sweep(instruction)
+            for i, score in enumerate(scores):
+                metrics = None if score is None else (score, 1, 1, {})
+                ledger.record_probe(sweep, f"v{i}", f"{instruction} {i}", metrics)
+            ledger.finish_sweep(sweep)
+
+        best = ledger.best_per_instruction()
+        assert [(b["instruction"], b["sweep_id"], b["score"]) for b in best] == [
+            ("calculator", 1, 8.5),
+            ("weather", 3, 3.2),
+        ]
+        assert ledger.score_distribution() == [(2.0, 1), (3.0, 1), (6.0, 1), (8.0, 1)]
+        assert ledger.score_distribution("calculator", bin_width=5.0) == [
+            (0.0, 1),
+            (5.0, 2),
+        ]
+
+
+def trace_length(trial):
+    return len(trial.stack)
+
+
+def test_build_agent_records_the_sweep(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "ledger.db")
+    build_agent(
+        "calculator",
+        probe_count=2,
+        llm=FunctionModel(fake_model),
+        eval_fn=trace_length,
+        ledger_path=path,
+    )
+
+    with Ledger(path) as ledger:
+        rows = list(ledger.probes(1))
+        assert sorted(r["revision"] for r in rows) == ["v0", "v1"]
+        for row in rows:
+            assert row["status"] == "ok"
+            assert row["prompt"] == "Build a calculator"
+            assert row["execution"] > 0
+            # The trial's stack is the probe's four-message trace
+            assert row["eval_score"] == "4"
+            assert len(ledger.trace(1, row["revision"])) == 4
+            breakdown = json.loads(row["breakdown"])
+            assert set(breakdown) >= {"cycle_score", "success_score", "time_score"}
+
+
+def test_build_agent_records_what_cut_off_probes_did(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "ledger.db")
+
+    def looping_model(messages, info: AgentInfo) -> ModelResponse:
+        if info.result_tools:
+            return fake_model(messages, info)
+        return ModelResponse(parts=[ToolCallPart("get_frameworks", {})])
+
+    build_agent(
+        "calculator",
+        probe_count=1,
+        llm=FunctionModel(looping_model),
+        live=LiveEvaluator(max_repeats=3),
+        ledger_path=path,
+    )
+
+    with Ledger(path) as ledger:
+        (row,) = ledger.probes(1)
+        assert row["status"] == "pruned"
+        assert json.loads(row["tool_usage"]) == {"get_frameworks": 4}
+        assert row["score"] is not None
+        assert json.loads(row["breakdown"])
+        # The trace runs up to the call that got the probe cut off
+        calls = [
+            part
+            for message in ledger.trace(1, "v0")
+            for part in message.parts
+            if isinstance(part, ToolCallPart)
+        ]
+        assert len(calls) == 4
+        assert ledger.score_distribution()
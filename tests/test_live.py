@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from meta_loop.agent import builder, iter_probes
+from meta_loop.eval import evaluate_messages, evaluate_run_result
+from meta_loop.live import LiveEvaluator, ProbeCutoffError
+from tests.test_agent import fake_model
+
+# Probes call the real kb tools
+pytestmark = pytest.mark.usefixtures("workdir")
+
+
+def call(tool_name):
+    return SimpleNamespace(parts=[ToolCallPart(tool_name, {})])
+
+
+def test_scores_and_leaderboard():
+    live = LiveEvaluator(max_tools=7)
+    messages = [call("write_code"), call("write_test_code"), call("run_pre_commit")]
+    for message in messages:
+        live.add_message("v0", message)
+    live.add_message("v1", call("write_code"))
+
+    assert live.scores["v0"] == evaluate_messages(messages, max_tools=7)[0]
+    assert [probe for probe, _ in live.leaderboard()] == ["v0", "v1"]
+    assert live.leaderboard(1) == [("v0", live.scores["v0"])]
+
+
+def test_more_distinct_tools_than_scored_cycles():
+    live = LiveEvaluator(max_tools=12)
+    messages = [call(f"tool_{i}") for i in range(11)]
+    for message in messages:
+        live.add_message("v0", message)
+
+    # Coverage is capped like the cycles, so the probe is never failed
+    score, cycles, coverage, tool_usage = live.finish("v0")
+    assert (cycles, coverage, len(tool_usage)) == (10, 10, 11)
+    assert live.scores["v0"] == score
+    assert live.summaries["v0"].breakdown(max_tools=12)
+    # Tools the builder does not have count up to max_tools
+    assert evaluate_messages(messages, max_tools=7)[2] == 7
+
+
+def test_cutoff_on_repeats():
+    live = LiveEvaluator(max_repeats=2)
+    live.add_message("v0", call("write_code"))
+    live.add_message("v0", call("write_code"))
+    with pytest.raises(ProbeCutoffError, match="write_code more than 2 times"):
+        live.add_message("v0", call("write_code"))
+
+
+def test_cutoff_on_duration():
+    live = LiveEvaluator(max_duration=0)
+    with pytest.raises(ProbeCutoffError, match="still running"):
+        live.add_message("v0", call("write_code"))
+
+
+async def test_iter_probes_live():
+    live = LiveEvaluator(max_tools=12)
+    probes = [
+        probe
+        async for probe in iter_probes(
+            "calculator", probe_count=2, llm=FunctionModel(fake_model), live=live
+        )
+    ]
+
+    for probe in probes:
+        assert probe.error is None
+        assert probe.metrics[3] == {"get_frameworks": 1}
+        assert live.scores[probe.revision] == probe.metrics[0]
+    assert live.finished == {"v0", "v1"}
+
+
+async def test_live_scores_use_the_builder_tools():
+    live = LiveEvaluator()
+    probes = [
+        probe
+        async for probe in iter_probes(
+            "calculator", probe_count=1, llm=FunctionModel(fake_model), live=live
+        )
+    ]
+
+    assert live.max_tools == len(builder()._function_tools)
+    assert probes[0].metrics == evaluate_run_result(
+        probes[0].result, max_tools=live.max_tools
+    )
+
+
+async def test_looping_probe_is_cut_off():
+    def looping_model(messages, info: AgentInfo) -> ModelResponse:
+        if info.result_tools:
+            return fake_model(messages, info)
+        if len(messages) < 20:
+            return ModelResponse(parts=[ToolCallPart("get_frameworks", {})])
+        return ModelResponse(parts=[TextPart("done")])
+
+    live = LiveEvaluator(max_repeats=3)
+    probes = [
+        probe
+        async for probe in iter_probes(
+            "calculator", probe_count=1, llm=FunctionModel(looping_model), live=live
+        )
+    ]
+
+    assert probes[0].pruned
+    assert isinstance(probes[0].error, ProbeCutoffError)
+    assert live.summaries["v0"].tool_usage == {"get_frameworks": 4}
@@ -0,0 +1,50 @@
+from meta_loop.result_cache import ResultCache, environment_fingerprint
+
+
+def test_environment_fingerprint_is_stable():
+    assert environment_fingerprint() == environment_fingerprint()
+    assert len(environment_fingerprint()) == 64
+
+
+def test_key_follows_the_files(tmp_path):
+    results = ResultCache(str(tmp_path / "memo"))
+    root = tmp_path / "agent"
+    root.mkdir()
+    (root / "test_a.py").write_text("def test_a():\n    assert True\n")
+    key = results.key(str(root))
+
+    # Bytecode and pytest's own cache do not change what the tests do
+    (root / "__pycache__").mkdir()
+    (root / "__pycache__" / "test_a.cpython-312.pyc").write_bytes(b"\0")
+    (root / ".pytest_cache").mkdir()
+    assert results.key(str(root)) == key
+    assert results.key(str(root), str(root / "test_a.py")) != key
+
+    (root / "helper.py").write_text("X = 1\n")
+    assert results.key(str(root)) != key
+
+
+def test_get_and_set(tmp_path):
+    results = ResultCache(str(tmp_path / "memo"))
+    assert results.get("a" * 64) is None
+
+    assert results.set("a" * 64, 1, "1 failed", "")
+    assert results.get("a" * 64) == {
+        "returncode": 1,
+        "stdout": "1 failed",
+        "stderr": "",
+    }
+    assert (results.hits, results.misses) == (1, 1)
+
+    # Killed or crashed runs may well pass next time
+    assert not results.set("b" * 64, -9, "", "")
+    assert results.get("b" * 64) is None
+
+
+def test_size_is_bounded(tmp_path):
+    results = ResultCache(str(tmp_path / "memo"), max_bytes=1000)
+    for i in range(20):
+        results.set(f"{i:064x}", 0, "x" * 200, "")
+    sizes = results.cache._index().values()
+    assert sum(sizes) <= 1000
+    assert results.get(f"{19:064x}") is not None
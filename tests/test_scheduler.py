@@ -0,0 +1,169 @@
+import asyncio
+import time
+
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models import Model
+from pydantic_ai.usage import Usage
+
+from meta_loop.scheduler import (
+    REFINE,
+    RUN,
+    ProbeScheduler,
+    TokenBucket,
+    current_stage,
+    endpoint_key,
+)
+
+
+async def test_max_in_flight():
+    scheduler = ProbeScheduler(max_in_flight=2)
+    running = 0
+    peak = 0
+
+    async def stage():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    await asyncio.gather(
+        *(scheduler.submit(f"v{i}", "run", RUN, stage) for i in range(6))
+    )
+    assert peak == 2
+    assert scheduler.in_flight == 0
+    assert len(scheduler.timings) == 6
+    assert set(scheduler.report()) == {f"v{i}" for i in range(6)}
+
+
+async def test_priority_order():
+    scheduler = ProbeScheduler(max_in_flight=1)
+    gate = asyncio.Event()
+    order = []
+
+    async def stage(name):
+        order.append(name)
+        await gate.wait()
+
+    blocker = asyncio.create_task(
+        scheduler.submit("v0", "refine", REFINE, lambda: stage("first"))
+    )
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(
+            scheduler.submit("v1", "refine", REFINE, lambda: stage("refine"))
+        ),
+        asyncio.create_task(scheduler.submit("v2", "run", RUN, lambda: stage("run"))),
+    ]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(blocker, *tasks)
+    assert order == ["first", "run", "refine"]
+
+
+async def test_cancelled_waiter_releases_nothing():
+    scheduler = ProbeScheduler(max_in_flight=1)
+    gate = asyncio.Event()
+    holder = asyncio.create_task(scheduler.submit("v0", "run", RUN, gate.wait))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(
+        scheduler.submit("v1", "run", RUN, lambda: asyncio.sleep(0))
+    )
+    await asyncio.sleep(0)
+    waiter.cancel()
+    gate.set()
+    await holder
+    assert scheduler.in_flight == 0
+
+
+async def test_token_bucket_rate():
+    bucket = TokenBucket(rate=100, capacity=1)
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    # One token is available up front, the other four refill at 100/s.
+    assert time.monotonic() - started >= 0.035
+
+
+class SlowModel(Model):
+    """Records concurrent requests; each takes `latency` seconds."""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.running = 0
+        self.peak = 0
+        self.order = []
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        self.order.append(current_stage.get()[1])
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.latency)
+        self.running -= 1
+        return ModelResponse(parts=[TextPart("ok")]), Usage()
+
+    @property
+    def model_name(self) -> str:
+        return "slow"
+
+    @property
+    def system(self) -> str:
+        return "test"
+
+
+async def test_slots_are_held_per_request_not_per_probe():
+    scheduler = ProbeScheduler(max_in_flight=1)
+    slow = SlowModel(latency=0.02)
+    llm = scheduler.throttle(slow)
+
+    async def probe(revision):
+        current_stage.set((revision, "run", RUN))
+        await llm.request([], None, None)
+        # A long tool call between two requests
+        await asyncio.sleep(0.2)
+        await llm.request([], None, None)
+
+    started = time.monotonic()
+    await asyncio.gather(*(probe(f"v{i}") for i in range(4)))
+    # The tool calls overlap even though only one request runs at a time
+    assert time.monotonic() - started < 0.5
+    assert slow.peak == 1
+    assert len(scheduler.timings) == 8
+    assert scheduler.in_flight == 0
+
+
+async def test_running_probes_requests_go_first():
+    scheduler = ProbeScheduler(max_in_flight=1)
+    slow = SlowModel(latency=0.01)
+    llm = scheduler.throttle(slow)
+
+    async def request(stage, priority):
+        current_stage.set((stage, stage, priority))
+        await llm.request([], None, None)
+
+    first = asyncio.create_task(request("first", REFINE))
+    await asyncio.sleep(0)
+    await asyncio.gather(
+        first, request("refine", REFINE), request("run", RUN), request("run", RUN)
+    )
+    assert slow.order == ["first", "run", "run", "refine"]
+
+
+async def test_rate_limit_wait_is_not_execution():
+    scheduler = ProbeScheduler(max_in_flight=1, requests_per_second=20)
+    slow = SlowModel(latency=0.01)
+    scheduler.buckets[endpoint_key(slow)] = TokenBucket(rate=20, capacity=1)
+    llm = scheduler.throttle(slow)
+
+    async def request(revision):
+        current_stage.set((revision, "run", RUN))
+        await llm.request([], None, None)
+
+    await asyncio.gather(*(request(f"v{i}") for i in range(5)))
+    report = scheduler.report()
+    # One token up front, then one every 50ms: v4 waits ~200ms for its own
+    assert report["v4"]["rate_wait"] >= 0.15
+    for timing in report.values():
+        assert timing["execution"] < 0.05
+        # Requests waiting for a token hold no slot, so none queue for one
+        assert timing["queue_wait"] < 0.05
@@ -0,0 +1,26 @@
+from meta_loop.search import SuccessiveHalving
+
+
+def test_grace_until_min_reports():
+    search = SuccessiveHalving(rungs=(3,), keep=0.5, min_reports=3)
+    assert search.report("v0", 3, 1.0)
+    assert search.report("v1", 3, 5.0)
+    assert not search.report("v2", 4, 0.5)
+    assert search.pruned == {"v2"}
+
+
+def test_each_rung_counted_once():
+    search = SuccessiveHalving(rungs=(3, 6), keep=0.5, min_reports=2)
+    assert search.report("v0", 1, 9.0)
+    assert search.report("v0", 3, 9.0)
+    assert search.report("v0", 4, 1.0)
+    assert search.scores == {3: [9.0]}
+    # Jumping past both rungs in one cycle records both
+    assert search.report("v1", 7, 9.5)
+    assert search.scores == {3: [9.0, 9.5], 6: [9.5]}
+
+
+def test_top_fraction_survives():
+    search = SuccessiveHalving(rungs=(3,), keep=0.5)
+    results = [search.report(f"v{i}", 3, score) for i, score in enumerate([4, 8, 2, 6])]
+    assert results == [True, True, False, True]
@@ -0,0 +1,147 @@
+import os
+import time
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from meta_loop.test_machine import app as app_module
+from meta_loop.test_machine.store import (
+    BlobStore,
+    WorkspaceRegistry,
+    blob_hash,
+    safe_join,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"))
+
+
+def test_put_dedups(store):
+    digest = store.put(b"print(1)")
+    assert digest == blob_hash(b"print(1)")
+    mtime = os.stat(store.path(digest)).st_mtime_ns
+    assert store.put(b"print(1)") == digest
+    assert os.stat(store.path(digest)).st_mtime_ns == mtime
+    assert store.missing([digest, blob_hash(b"other")]) == [blob_hash(b"other")]
+    with pytest.raises(ValueError):
+        store.path("../../etc/passwd")
+
+
+def test_materialize_never_shares_the_blob(store, tmp_path):
+    digest = store.put(b"x = 1\n")
+    dest = tmp_path / "ws" / "pkg" / "mod.py"
+    store.materialize(digest, str(dest))
+    assert dest.read_bytes() == b"x = 1\n"
+    # Cloned or copied: a job editing its file leaves the blob intact
+    blob = os.stat(store.path(digest))
+    assert blob.st_nlink == 1 and os.stat(dest).st_ino != blob.st_ino
+    os.chmod(dest, 0o644)
+    dest.write_bytes(b"x = 2\n")
+    with open(store.path(digest), "rb") as f:
+        assert f.read() == b"x = 1\n"
+    assert oct(os.stat(store.path(digest)).st_mode & 0o777) == oct(0o444)
+
+
+def test_safe_join(tmp_path):
+    assert safe_join(str(tmp_path), "a/b.py") == str(tmp_path / "a" / "b.py")
+    for bad in ("../x.py", "/etc/passwd", "a/../../x.py"):
+        with pytest.raises(ValueError):
+            safe_join(str(tmp_path), bad)
+
+
+def test_lru_and_ttl_eviction(store, tmp_path):
+    digest = store.put(b"print(1)")
+    registry = WorkspaceRegistry(store, str(tmp_path / "ws"), max_workspaces=2)
+    first, _ = registry.create({"main.py": digest})
+    second, _ = registry.create({"main.py": digest})
+    registry.get(first)
+    registry.pin(second)
+    third, _ = registry.create({"main.py": digest})
+
+    # second is least recently used but pinned, so first goes
+    assert registry.get(first) is None
+    assert registry.get(second) and registry.get(third)
+
+    registry.unpin(second)
+    registry.ttl = 0
+    time.sleep(0.01)
+    registry.evict()
+    assert registry.workspaces == {}
+    assert os.listdir(tmp_path / "ws") == []
+    # Materializing counts as a use of the blob
+    assert store.prune(max_age=60) == 0
+    assert store.prune(max_age=-1) == 1
+
+
+def test_evict_prunes_unused_blobs(store, tmp_path):
+    old = store.put(b"print(1)")
+    registry = WorkspaceRegistry(store, str(tmp_path / "ws"), blob_ttl=60)
+    registry.create({"main.py": old})
+    new = store.put(b"print(2)")
+    past = time.time() - 120
+    os.utime(store.path(old), (past, past))
+
+    # Pruned at most every blob_ttl / 2 seconds
+    registry.evict()
+    assert store.has(old)
+    registry._pruned -= 30
+    registry.evict()
+    assert not store.has(old) and store.has(new)
+
+    registry = WorkspaceRegistry(store, str(tmp_path / "ws"), blob_ttl=None)
+    os.utime(store.path(new), (past, past))
+    registry._pruned -= 10**6
+    registry.evict()
+    assert store.has(new)
+
+
+def test_workspace_of_a_pruned_blob_is_a_conflict(monkeypatch):
+    client = TestClient(app_module.app)
+    content = b"print(1)  # " + uuid4().hex.encode()
+    response = client.post("/blobs/", files=[("files", ("blob", content))])
+    digest = response.json()["hashes"][0]
+    create = app_module.workspaces.create
+
+    def create_after_prune(files):
+        # Pruned after `/workspaces/` checked for it
+        os.remove(app_module.blobs.path(digest))
+        return create(files)
+
+    monkeypatch.setattr(app_module.workspaces, "create", create_after_prune)
+    response = client.post("/workspaces/", json={"files": {"main.py": digest}})
+    assert response.status_code == 409
+    assert response.json()["detail"]["missing"] == [digest]
+
+
+def test_delta_upload():
+    client = TestClient(app_module.app)
+    # The app's store outlives test runs, so contents must be new
+    token = uuid4().hex.encode()
+    shared = b"import os  # " + token
+    new = b"def test_ok():\n    assert True  # " + token
+    first = client.post(
+        "/upload/", files=[("files", ("util.py", shared)), ("files", ("a.py", b""))]
+    ).json()
+    assert first["info"][0]["hash"] == blob_hash(shared)
+
+    hashes = [blob_hash(shared), blob_hash(new)]
+    missing = client.post("/blobs/missing/", json={"hashes": hashes}).json()
+    assert missing == {"missing": [blob_hash(new)]}
+
+    files = {"util.py": blob_hash(shared), "test_new.py": blob_hash(new)}
+    response = client.post("/workspaces/", json={"files": files})
+    assert response.status_code == 409
+    assert response.json()["detail"]["missing"] == [blob_hash(new)]
+
+    client.post("/blobs/", files=[("files", ("blob", new))])
+    agent_id = client.post("/workspaces/", json={"files": files}).json()["agent_id"]
+    assert "1 passed" in client.post(f"/test/?agent_id={agent_id}").json()["stdout"]
+
+    response = client.post("/workspaces/", json={"files": {"../x.py": hashes[0]}})
+    assert response.status_code == 400
+    assert client.post("/test/?agent_id=agent_unknown").json() == {
+        "error": "Test directory not found"
+    }
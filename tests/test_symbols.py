@@ -0,0 +1,77 @@
+from meta_loop.symbols import Symbol, SymbolTable
+
+CODE = """
+import functools
+
+
+class Base:
+    pass
+
+
+class Repo(Base):
+    @functools.cache
+    def get(self, key):
+        pass
+
+    async def fetch(self):
+        pass
+
+    class Meta:
+        def options(self):
+            pass
+
+
+def get(x):
+    pass
+"""
+
+
+def make_table(tmp_path):
+    (tmp_path / "repo.py").write_text(CODE)
+    return SymbolTable.from_project(str(tmp_path))
+
+
+def test_lookup(tmp_path):
+    table = make_table(tmp_path)
+    path = str(tmp_path / "repo.py")
+
+    [method] = table.lookup("Repo.get")
+    assert method == Symbol(
+        "Repo.get", "method", "get(self, key)", path, 11, 12, False,
+        ("functools.cache",), "Repo",
+    )  # fmt: skip
+    assert [s.qualname for s in table.lookup("get")] == ["Repo.get", "get"]
+    assert table.lookup("Repo.fetch")[0].is_async
+    assert table.lookup("Repo.Meta.options")[0].parent == "Repo.Meta"
+    assert table.lookup("missing") == []
+
+
+def test_prefix(tmp_path):
+    table = make_table(tmp_path)
+    assert [s.qualname for s in table.prefix("Repo.")] == [
+        "Repo.Meta",
+        "Repo.Meta.options",
+        "Repo.fetch",
+        "Repo.get",
+    ]
+    assert table.prefix("Zzz") == []
+
+
+def test_save_and_load(tmp_path):
+    table = make_table(tmp_path)
+    table.save(str(tmp_path / "symbols.json"))
+
+    loaded = SymbolTable.load(str(tmp_path / "symbols.json"))
+
+    assert loaded.symbols == table.symbols
+    assert len(loaded) == 7
+
+
+def test_from_dict_leaves_its_input_alone(tmp_path):
+    data = make_table(tmp_path).to_dict()
+    paths = list(data["columns"]["path"])
+
+    first = SymbolTable.from_dict(data)
+
+    assert data["columns"]["path"] == paths
+    assert SymbolTable.from_dict(data).symbols == first.symbols
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from meta_loop.agent import iter_probes
+from meta_loop.tracing import Tracer, active_tracer, trace
+
+from .test_agent import fake_model
+
+# Probes call the real kb tools
+pytestmark = pytest.mark.usefixtures("workdir")
+
+
+def test_trace_without_tracer_is_a_no_op():
+    assert active_tracer() is None
+    with trace("tool", "read_file") as span:
+        span.set(size=3)
+
+
+def test_spans_nest_and_export(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    with Tracer(str(path), flush_every=2) as tracer:
+        with trace("probe", "v0"):
+            with trace("tool", "write_code", args_size=10) as span:
+                span.set(size=2)
+        with pytest.raises(ValueError):
+            with trace("evaluate"):
+                raise ValueError
+    assert active_tracer() is None
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    tool, probe, evaluate = spans
+    assert tool["parent_span_id"] == probe["span_id"]
+    assert tool["trace_id"] == probe["trace_id"]
+    assert tool["attributes"] == {"args_size": 10, "size": 2}
+    assert tool["end_time_unix_nano"] >= tool["start_time_unix_nano"]
+    assert probe["parent_span_id"] is None
+    assert evaluate["trace_id"] != probe["trace_id"]
+    assert evaluate["status"] == "error"
+    assert set(tracer.summary()) == {"probe", "tool", "evaluate"}
+
+
+def test_summary():
+    tracer = Tracer()
+    tracer.durations["model"] = [float(i) for i in range(1, 101)]
+    summary = tracer.summary()["model"]
+    assert summary["count"] == 100
+    assert summary["total"] == 5050
+    assert summary["p50"] == pytest.approx(50.5)
+    assert summary["p95"] == pytest.approx(95.05)
+    assert tracer.format_summary().splitlines()[1].startswith("model")
+
+
+async def test_probes_are_traced(tmp_path):
+    with Tracer(str(tmp_path / "spans.jsonl")) as tracer:
+        async for probe in iter_probes(
+            "calculator", probe_count=2, llm=FunctionModel(fake_model)
+        ):
+            assert probe.error is None
+    summary = tracer.summary()
+
+    assert summary["probe"]["count"] == 2
+    assert summary["refine"]["count"] == 2
+    assert summary["evaluate"]["count"] == 2
+    assert summary["tool"]["count"] == 2
+    # One refinement and two builder turns per probe
+    assert summary["model"]["count"] == 6
+
+    spans = [
+        json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()
+    ]
+    model = next(s for s in spans if s["stage"] == "model")
+    assert model["attributes"]["request_tokens"] > 0
+
+
+async def test_sync_tool_spans_nest_under_their_probe(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def workdir_model(messages, info: AgentInfo) -> ModelResponse:
+        if info.result_tools:
+            return fake_model(messages, info)
+        if len(messages) == 1:
+            return ModelResponse(
+                parts=[ToolCallPart("create_agent_workdir", {"agent_name": "calc"})]
+            )
+        return ModelResponse(parts=[TextPart("done")])
+
+    path = tmp_path / "spans.jsonl"
+    with Tracer(str(path)):
+        async for probe in iter_probes(
+            "calculator", probe_count=2, llm=FunctionModel(workdir_model)
+        ):
+            assert probe.error is None
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    probes = {s["span_id"]: s["name"] for s in spans if s["stage"] == "probe"}
+    tools = [s for s in spans if s["name"] == "create_agent_workdir"]
+    assert len(tools) == 2
+    assert {probes[tool["parent_span_id"]] for tool in tools} == {"v0", "v1"}
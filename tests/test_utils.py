@@ -0,0 +1,131 @@
+import asyncio
+import subprocess
+import sys
+import time
+
+import pytest
+from loguru import logger
+
+from meta_loop import utils
+from meta_loop.utils import run_command, verbose_decorator
+
+
+async def test_run_command_captures_output():
+    result = await run_command([sys.executable, "-c", "print('hi')"])
+    assert result.returncode == 0
+    assert result.stdout == b"hi\n"
+
+
+async def test_run_command_check():
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        await run_command(
+            [sys.executable, "-c", "import sys; sys.exit('boom')"], check=True
+        )
+    assert e.value.returncode == 1
+    assert b"boom" in e.value.stderr
+
+
+async def test_run_command_timeout_does_not_block_loop():
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        await run_command(
+            [sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.3
+        )
+    task.cancel()
+    assert time.monotonic() - started < 5
+    assert ticks > 5
+
+
+async def test_verbose_decorator_async():
+    @verbose_decorator
+    async def tool(ctx, value):
+        return value * 2
+
+    assert asyncio.iscoroutinefunction(tool)
+    assert await tool(None, 2) == 4
+
+
+@pytest.fixture
+def logs():
+    messages = []
+    handler = logger.add(messages.append, format="{level} {message}")
+    yield messages
+    logger.remove(handler)
+
+
+async def test_verbose_decorator_logs_sizes(logs):
+    @verbose_decorator
+    def write_code(ctx, file_path, content):
+        return content
+
+    await write_code(None, "a.py", content="x" * 50_000)
+
+    assert len(logs) == 1
+    assert "write_code(str[4], content=str[50000]) -> str[50000] in" in logs[0]
+    assert "xxx" not in logs[0]
+
+
+async def test_verbose_decorator_truncates_payloads(logs, monkeypatch):
+    monkeypatch.setattr(utils, "LOG_MODE", "payloads")
+    monkeypatch.setattr(utils, "LOG_FIELD_CHARS", 20)
+
+    @verbose_decorator
+    async def read_file(ctx, file_path):
+        return "y" * 10_000
+
+    await read_file(None, "doc.md")
+
+    assert "str[6] 'doc.md'" in logs[0]
+    assert "str[10000] 'yyy" in logs[0]
+    assert "...yyy" in logs[0]
+    assert len(logs[0]) < 200
+
+
+async def test_verbose_decorator_sampling_keeps_failures(logs, monkeypatch):
+    monkeypatch.setattr(utils, "LOG_SAMPLE_RATE", 0.0)
+
+    @verbose_decorator
+    def tool(ctx, value):
+        return 1 / value
+
+    for _ in range(10):
+        await tool(None, 1)
+    with pytest.raises(ZeroDivisionError):
+        await tool(None, 0)
+
+    assert len(logs) == 1
+    assert logs[0].startswith("WARNING tool(int) raised ZeroDivisionError")
+
+
+def test_enqueue_logging_keeps_the_default_handler(monkeypatch):
+    monkeypatch.setattr(utils, "_log_handler", None)
+    messages = []
+    handler = utils.enqueue_logging(messages.append)
+    try:
+        assert utils.enqueue_logging(messages.append) == handler
+        # Loguru's default handler is the application's to remove
+        assert 0 in logger._core.handlers
+        logger.info("queued")
+        logger.complete()
+        assert [m.record["message"] for m in messages] == ["queued"]
+    finally:
+        logger.remove(handler)
+
+
+def test_list_markdown_files(tmp_path):
+    for name in ("a.md", "b.mdx", "c.py"):
+        (tmp_path / name).write_text("")
+    assert sorted(utils.list_markdown_files(str(tmp_path))) == [
+        str(tmp_path / "a.md"),
+        str(tmp_path / "b.mdx"),
+    ]
+    assert utils.list_markdown_files(str(tmp_path / "missing")) == []
@@ -0,0 +1,135 @@
+import os
+import time
+
+import pytest
+
+from meta_loop.test_machine import workers
+from meta_loop.test_machine.workers import WorkerPool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = WorkerPool(size=1)
+    yield pool
+    pool.close()
+
+
+def write(tmp_path, name, code):
+    path = tmp_path / name
+    path.write_text(code)
+    return str(path)
+
+
+def test_python_job(pool, tmp_path):
+    write(tmp_path, "helper.py", "NAME = 'helper'")
+    script = write(
+        tmp_path,
+        "main.py",
+        "import sys\nimport helper\nprint(helper.NAME)\n"
+        "print('oops', file=sys.stderr)\nsys.exit(3)",
+    )
+    result = pool.run("python", script)
+    assert (result.returncode, result.stdout, result.stderr) == (
+        3,
+        "helper\n",
+        "oops\n",
+    )
+
+    result = pool.run("python", write(tmp_path, "bad.py", "raise ValueError('x')"))
+    assert result.returncode == 1
+    assert "ValueError: x" in result.stderr
+
+
+def test_jobs_are_isolated(pool, tmp_path):
+    code = "import json\nprint(hasattr(json, 'leak'))\njson.leak = True"
+    script = write(tmp_path, "leak.py", code)
+    assert pool.run("python", script).stdout == "False\n"
+    assert pool.run("python", script).stdout == "False\n"
+
+
+def test_pytest_job(pool, tmp_path):
+    write(tmp_path, "test_ok.py", "def test_ok():\n    assert True\n")
+    result = pool.run("pytest", str(tmp_path))
+    assert result.returncode == 0
+    assert "1 passed" in result.stdout
+
+    write(tmp_path, "test_bad.py", "def test_bad():\n    assert False\n")
+    result = pool.run("pytest", str(tmp_path))
+    assert result.returncode == 1
+    assert "1 failed, 1 passed" in result.stdout
+
+
+def test_timeout(pool, tmp_path):
+    script = write(tmp_path, "slow.py", "import time\ntime.sleep(30)")
+    assert pool.run("python", script, timeout=0.2).returncode < 0
+    # The worker is still usable
+    assert pool.run("python", write(tmp_path, "ok.py", "print(1)")).stdout == "1\n"
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_jobs_cannot_reach_the_worker_connection(pool, tmp_path):
+    code = """import os
+links = []
+for fd in os.listdir("/proc/self/fd"):
+    try:
+        links.append(os.readlink(f"/proc/self/fd/{fd}"))
+    except OSError:
+        pass
+print(any(link.startswith("socket:") for link in links))
+"""
+    assert pool.run("python", write(tmp_path, "fds.py", code)).stdout == "False\n"
+
+
+def test_recycle_after_max_jobs(tmp_path):
+    script = write(tmp_path, "ppid.py", "import os\nprint(os.getppid())")
+    pool = WorkerPool(size=1, max_jobs=2, preload=())
+    try:
+        pids = [pool.run("python", script).stdout for _ in range(3)]
+    finally:
+        pool.close()
+    assert pids[0] == pids[1] != pids[2]
+
+
+def test_run_job_without_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(workers, "WARM_WORKERS", 0)
+    result = workers.run_job("python", write(tmp_path, "hi.py", "print('hi')"))
+    assert result.stdout == "hi\n"
+
+
+def test_stream_yields_output_while_running(pool, tmp_path):
+    script = write(
+        tmp_path,
+        "slow_print.py",
+        "import time\nprint('first', flush=True)\ntime.sleep(1)\nprint('second')",
+    )
+    start = time.monotonic()
+    events = pool.stream("python", script)
+    assert next(events)[1].startswith(b"first")
+    assert time.monotonic() - start < 0.9
+    rest = list(events)
+    assert rest[-1] == ("exit", 0)
+    assert b"".join(data for _, data in rest[:-1]).strip() == b"second"
+
+
+def test_abandoned_stream_keeps_worker_usable(pool, tmp_path):
+    script = write(
+        tmp_path, "chatty.py", "for i in range(3):\n    print(i, flush=True)"
+    )
+    pid = pool._idle.queue[0].process.pid
+    events = pool.stream("python", script)
+    next(events)
+    events.close()
+    # Drained rather than replaced
+    assert pool._idle.queue[0].process.pid == pid
+    assert pool.run("python", script).stdout == "0\n1\n2\n"
+
+
+def test_stream_job_without_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(workers, "WARM_WORKERS", 0)
+    script = write(tmp_path, "both.py", "import sys\nprint('out')\nsys.exit('err')")
+    events = list(workers.stream_job("python", script))
+    assert events[-1] == ("exit", 1)
+    output = {"stdout": b"", "stderr": b""}
+    for name, data in events[:-1]:
+        output[name] += data
+    assert output == {"stdout": b"out\n", "stderr": b"err\n"}